@@ -0,0 +1,131 @@
+import pytest
+
+from app.rag_cache import Cache, ReembedWorker, TokenBucket
+from app.rag_cache import cache as cache_module
+from app.search import search_topk_cached
+from app.vector_index import VectorIndex
+
+
+def _old(text):
+    return [1.0, 0.0]
+
+
+def _new(text):
+    return [0.0, 1.0, float(len(text))]
+
+
+def test_chunk_keys_carry_model_and_dimension():
+    c = Cache(kv=cache_module._cache().kv, embed_model="mini-lm", embed_dim=384)
+    assert c.k_chunk("abc") == "chunk:mini-lm:384:abc"
+    assert c.k_chunk("abc", "e5-large", 1024) == "chunk:e5-large:1024:abc"
+
+
+def test_worker_reembeds_hot_chunks_while_old_model_serves():
+    cache = cache_module._cache()
+    for text, uses in (("alpha", 3), ("beta", 1), ("gamma", 2)):
+        for _ in range(uses):
+            cache.cached_embed(text, embed_fn=_old)
+
+    worker = ReembedWorker(cache, _new, "v2", 3, batch=2, bucket=TokenBucket(1e9))
+    assert worker.pending() == ["alpha", "gamma", "beta"]
+    assert worker.run_once() == 2
+    assert cache.cached_embed("alpha", embed_fn=_old) == [1.0, 0.0]  # still serving v1
+    assert 0.0 < worker.progress() < 1.0
+
+    worker.run_once()
+    assert worker.pending() == []
+    worker.cutover()
+    assert cache.cached_embed("beta", embed_fn=_old) == [0.0, 1.0, 4.0]
+    # the cache owns the new embedder, so a stale caller cannot fill v2 keys with v1 vectors
+    assert cache.cached_embed("delta", embed_fn=_old) == [0.0, 1.0, 5.0]
+    with pytest.raises(ValueError):
+        cache.put_embedding("epsilon", [1.0, 0.0])
+
+
+def test_cutover_rebuilds_index_and_query_cache_with_the_new_model():
+    cache = cache_module._cache()
+    index = VectorIndex(embed_fn=_old)
+    for chunk_id, text in (("0", "alpha"), ("1", "beta gamma")):
+        index.upsert_embedding("doc", chunk_id, cache.cached_embed(text, embed_fn=_old), text=text)
+    index.upsert_embedding("doc", "2", [1.0, 0.0])  # no text: cannot be re-embedded
+    before = search_topk_cached(index, "alpha", k=3)
+    assert len(before) == 3
+
+    worker = ReembedWorker(cache, _new, "v2", 3, bucket=TokenBucket(1e9), indexes=[index])
+    worker.run_once()
+    worker.cutover()
+
+    assert index.dim == 3 and len(index) == 2
+    after = search_topk_cached(index, "alpha", k=3)
+    assert [key for key, _ in after] == ["doc:0", "doc:1"]
+
+
+def test_pending_scan_reads_each_hot_chunk_once():
+    cache = cache_module._cache()
+    for i in range(20):
+        cache.cached_embed(f"chunk {i}", embed_fn=_old)
+    kv, reads = cache.kv, []
+
+    class CountingKV:
+        def get(self, key):
+            if key.startswith("chunk:v2:"):
+                reads.append(key)
+            return kv.get(key)
+
+        def set(self, key, value, ttl=None):
+            return kv.set(key, value, ttl=ttl)
+
+    cache.kv = CountingKV()
+    worker = ReembedWorker(cache, _new, "v2", 3, batch=4, bucket=TokenBucket(1e9))
+    while worker.run_once():
+        pass
+    assert worker.progress() == 1.0
+    # one miss per chunk, instead of a full hot-set scan per batch
+    assert len(reads) == 20
+
+
+def test_cutover_embeds_index_chunks_under_the_rate_limit_before_swapping():
+    cache = cache_module._cache()
+    index = VectorIndex(embed_fn=_old)
+    texts = [f"chunk {i}" for i in range(5)]
+    for i, text in enumerate(texts):
+        index.upsert_embedding("doc", str(i), _old(text), text=text)  # never went through the cache
+
+    class CountingBucket(TokenBucket):
+        acquired = 0
+
+        def acquire(self, n=1.0):
+            CountingBucket.acquired += n
+            super().acquire(n)
+
+    calls = []
+
+    def new(text):
+        calls.append(text)
+        return _new(text)
+
+    worker = ReembedWorker(cache, new, "v2", 3, batch=2, bucket=CountingBucket(1e9), indexes=[index])
+    assert not worker.indexes_covered()
+    worker.cutover()
+    assert sorted(calls) == texts and CountingBucket.acquired == 5
+    assert cache.embed_model == "v2" and index.embed_fn is new and index.dim == 3
+    assert len(index) == 5 and index.search(_new("chunk 3"), k=1)[0][1] == pytest.approx(1.0)
+
+
+def test_reembed_computes_vectors_without_blocking_searches():
+    import threading
+
+    index = VectorIndex(embed_fn=_old)
+    index.upsert_embedding("doc", "0", _old("alpha"), text="alpha")
+    searched = []
+
+    def slow_new(text):
+        probe = threading.Thread(target=lambda: searched.append(index.search(_old(text), k=1)))
+        probe.start()
+        probe.join(timeout=5)
+        assert not probe.is_alive(), "search blocked by reembed"
+        return _new(text)
+
+    assert index.reembed(_new, slow_new) == 0
+    assert searched == [[("doc:0", pytest.approx(1.0))]]
+    assert index.dim == 3
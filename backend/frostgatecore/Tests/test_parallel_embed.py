@@ -0,0 +1,44 @@
+from app.embedding import embed_texts_cached, hash_embed
+from app.parallel_embed import ProcessPoolEmbedder
+from app.rag_cache import cache as cache_module
+from app.rag_cache.cache import Cache
+
+
+def _fractional_embed(text: str):
+    # Values float32 cannot represent exactly.
+    return [v / 3.0 + 0.1 for v in hash_embed(text, dim=16)]
+
+
+def test_process_pool_matches_serial_embeddings():
+    texts = [f"chunk {i} about ransomware containment ü" for i in range(40)]
+    with ProcessPoolEmbedder(workers=2, min_batch=4, shard_size=7) as pool:
+        parallel = pool.embed_many(hash_embed, texts)
+    assert len(parallel) == 40
+    assert parallel == [[float(v) for v in hash_embed(t)] for t in texts]
+
+
+def test_process_pool_and_serial_paths_return_identical_vectors(monkeypatch):
+    texts = [f"shard {i} lateral movement note {i * 7}" for i in range(24)]
+    serial = embed_texts_cached(texts, _fractional_embed)
+    # A fresh cache so the pool really embeds every text instead of hitting.
+    monkeypatch.setattr(cache_module, "_cache_singleton", Cache(kv=type(cache_module._cache().kv)()))
+    with ProcessPoolEmbedder(workers=2, min_batch=4, shard_size=5) as pool:
+        assert pool.embed_many(_fractional_embed, texts) == [_fractional_embed(t) for t in texts]
+        parallel = embed_texts_cached(texts, _fractional_embed, executor=pool)
+    assert parallel == serial
+
+
+def test_embed_texts_cached_embeds_only_misses_and_caches_in_parent():
+    calls = []
+
+    class CountingPool:
+        def embed_many(self, embed_fn, texts):
+            calls.append(list(texts))
+            return [embed_fn(t) for t in texts]
+
+    first = embed_texts_cached(["a  b", "c", "a b"], hash_embed, executor=CountingPool())
+    second = embed_texts_cached(["c", "d"], hash_embed, executor=CountingPool())
+
+    assert calls == [["a b", "c"], ["d"]]
+    assert first[0] == first[2] and second[0] == first[1]
+    assert cache_module._cache().get_embedding("d") == second[1]
@@ -0,0 +1,121 @@
+import random
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import vector_index as vector_index_module
+from app.embedding import hash_embed
+from app.main import app
+from app.search import search_batch_cached, search_topk_cached
+from app.vector_index import VectorIndex
+
+
+@pytest.fixture(autouse=True)
+def _fresh_default_index(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(vector_index_module, "_index_singleton", None)
+
+
+def _random_vectors(n: int, dim: int, seed: int = 1):
+    rng = random.Random(seed)
+    return [[rng.gauss(0, 1) for _ in range(dim)] for _ in range(n)]
+
+
+def test_exact_search_ranks_by_cosine_and_handles_deletes():
+    idx = VectorIndex()
+    idx.upsert_embedding("d1", "c1", [1.0, 0.0, 0.0])
+    idx.upsert_embedding("d1", "c2", [0.7, 0.7, 0.0])
+    idx.upsert_embedding("d2", "c1", [0.0, 0.0, 1.0])
+
+    hits = idx.search([1.0, 0.1, 0.0], k=2)
+    assert [key for key, _ in hits] == ["d1:c1", "d1:c2"]
+    assert hits[0][1] == pytest.approx(0.995, abs=1e-3)
+
+    assert idx.delete("d1:c1") is True
+    assert [key for key, _ in idx.search([1.0, 0.1, 0.0], k=3)] == ["d1:c2", "d2:c1"]
+    assert idx.delete_doc("d1") == 1
+    assert len(idx) == 1
+
+
+def test_ivf_matches_exact_top1_for_stored_vectors():
+    vecs = _random_vectors(200, 16)
+    exact, ivf = VectorIndex(), VectorIndex(mode="ivf", nlist=8, nprobe=3, train_threshold=50)
+    for i, v in enumerate(vecs):
+        exact.upsert(f"k{i}", v)
+        ivf.upsert(f"k{i}", v)
+
+    for i in range(0, 200, 20):
+        assert ivf.search(vecs[i], k=1)[0][0] == exact.search(vecs[i], k=1)[0][0] == f"k{i}"
+    assert ivf.trained
+    ivf.upsert("late", vecs[3])  # assigned to a cell after training
+    assert {key for key, _ in ivf.search(vecs[3], k=2)} == {"k3", "late"}
+
+
+def test_batch_search_sends_only_cache_misses_in_one_call():
+    class Store:
+        def __init__(self) -> None:
+            self.idx = VectorIndex(embed_fn=hash_embed)
+            self.batches = []
+
+        def similarity_search_batch(self, queries, top_k):
+            self.batches.append(list(queries))
+            return self.idx.similarity_search_batch(queries, top_k=top_k)
+
+    store = Store()
+    store.idx.upsert_embedding("doc", "a", hash_embed("red team playbook"))
+    store.idx.upsert_embedding("doc", "b", hash_embed("blue team runbook"))
+
+    first = search_batch_cached(store, ["red team", "blue  team"], k=1)
+    second = search_batch_cached(store, ["blue team", "red team", "purple"], k=1)
+    assert [hits[0][0] for hits in first] == ["doc:a", "doc:b"]
+    assert second[:2] == [first[1], first[0]]
+    assert store.batches == [["red team", "blue team"], ["purple"]]
+
+
+def test_dev_routes_search_the_indexed_chunks():
+    c = TestClient(app)
+    r = c.post(
+        "/dev/chunks",
+        json={"doc_id": "doc-1", "chunks": [
+            {"chunk_id": "0", "text": "lateral movement detection"},
+            {"chunk_id": "1", "text": "phishing triage checklist"},
+        ]},
+    )
+    assert r.json()["size"] == 2
+
+    hits = c.get("/dev/q", params={"q": "phishing checklist", "k": 1}).json()["hits"]
+    assert hits[0][0] == "doc-1:1"
+    batch = c.post("/dev/q/batch", json={"queries": ["lateral movement"], "k": 1}).json()["hits"]
+    assert batch[0][0][0] == "doc-1:0"
+
+
+def test_cached_hits_follow_index_writes_and_store_identity():
+    c = TestClient(app)
+    chunks = [{"chunk_id": "0", "text": "phishing triage checklist"}]
+    c.post("/dev/chunks", json={"doc_id": "doc-1", "chunks": chunks})
+    assert [hit[0] for hit in c.get("/dev/q", params={"q": "phishing", "k": 5}).json()["hits"]] == ["doc-1:0"]
+
+    # a write changes the index generation, so the cached top-k is not reused
+    c.post("/dev/chunks", json={"doc_id": "doc-2", "chunks": chunks})
+    hits = c.get("/dev/q", params={"q": "phishing", "k": 5}).json()["hits"]
+    assert sorted(hit[0] for hit in hits) == ["doc-1:0", "doc-2:0"]
+
+    other = VectorIndex(embed_fn=hash_embed)
+    other.upsert_embedding("elsewhere", "0", hash_embed("phishing"))
+    assert [hit[0] for hit in search_topk_cached(other, "phishing", k=5)] == ["elsewhere:0"]
+
+
+def test_default_index_queries_with_the_embedder_chunks_were_ingested_with():
+    from ingest import upsert_chunks_with_cache
+
+    class Embedder:
+        axes = ("phishing", "malware", "lateral")
+
+        def embed_text(self, text):
+            return [float(axis in text) for axis in self.axes]
+
+    assert search_topk_cached(query="phishing", k=1) == []  # nothing ingested, nothing bound yet
+    upsert_chunks_with_cache(
+        "doc", [("0", "phishing triage"), ("1", "malware sandboxing"), ("2", "lateral movement")], Embedder()
+    )
+    assert [hit[0] for hit in search_topk_cached(query="malware", k=1)] == ["doc:1"]
+    assert [hits[0][0] for hits in search_batch_cached(queries=["lateral", "phishing"], k=1)] == ["doc:2", "doc:0"]
@@ -1,19 +1,47 @@
 from fastapi import APIRouter, Query
 from pydantic import BaseModel
-from typing import List, Tuple
+from typing import List
+
+from app.embedding import embed_text_cached, hash_embed
+from app.search import search_batch_cached, search_topk_cached
+from app.vector_index import default_index
 
 router = APIRouter(tags=["dev"])
 
 class EmbedIn(BaseModel):
     text: str
 
+class ChunkIn(BaseModel):
+    chunk_id: str
+    text: str
+
+class ChunksIn(BaseModel):
+    doc_id: str
+    chunks: List[ChunkIn]
+
+class BatchQueryIn(BaseModel):
+    queries: List[str]
+    k: int = 10
+
 @router.post("/dev/embed")
 def dev_embed(payload: EmbedIn):
     # normalize whitespace so repeated calls are identical
     t = " ".join(payload.text.split())
     return {"ok": True, "vec": f"vec:{t}"}
 
+@router.post("/dev/chunks")
+def dev_chunks(payload: ChunksIn):
+    # same path as ingest.upsert_chunks_with_cache, with the offline hashing embedder
+    index = default_index()
+    index.bind_embedder(hash_embed)
+    for c in payload.chunks:
+        index.upsert_embedding(payload.doc_id, c.chunk_id, embed_text_cached(c.text, embed_fn=hash_embed), text=c.text)
+    return {"ok": True, "upserted": len(payload.chunks), "size": len(index)}
+
 @router.get("/dev/q")
 def dev_q(q: str = Query(...), k: int = Query(10)):
-    hits: List[Tuple[str, float]] = [(f"doc-{i}", 1.0 - i*0.01) for i in range(k)]
-    return {"ok": True, "hits": hits}
+    return {"ok": True, "hits": search_topk_cached(query=q, k=k)}
+
+@router.post("/dev/q/batch")
+def dev_q_batch(payload: BatchQueryIn):
+    return {"ok": True, "hits": search_batch_cached(queries=payload.queries, k=payload.k)}
@@ -1,6 +1,14 @@
+import hashlib
 import logging
+import re
+from typing import TYPE_CHECKING, List, Optional, Sequence
+
 from .corr import current_corr_id
-from app.rag_cache.cache import cached_embed  # direct import avoids __init__ export issues
+from app.rag_cache.cache import _cache, cached_embed  # direct import avoids __init__ export issues
+from app.rag_cache.utils import normalize_text
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .parallel_embed import ProcessPoolEmbedder
 
 LOG = logging.getLogger("rag.embed")
 
@@ -9,3 +17,38 @@ def embed_text_cached(text: str, embed_fn):
     vec = cached_embed(text, embed_fn=embed_fn)
     LOG.info("RAGCACHE embed hit corr_id=%s len=%d", cid, len(text))
     return vec
+
+def embed_texts_cached(texts: Sequence[str], embed_fn, executor: Optional["ProcessPoolEmbedder"] = None):
+    """
+    Batch form of `embed_text_cached`. Cache lookups and writes happen here in
+    the calling process; only the (deduplicated) misses are embedded, through
+    `executor.embed_many` when a `ProcessPoolEmbedder` is given.
+    """
+    cache = _cache()
+    norm = [normalize_text(t) for t in texts]
+    found = {}
+    misses: List[str] = []
+    for t in dict.fromkeys(norm):
+        hit = cache.get_embedding(t)
+        if hit is not None:
+            found[t] = hit
+        else:
+            misses.append(t)
+    if misses:
+        embed_fn = cache.serving_embed_fn(embed_fn)
+        vecs = executor.embed_many(embed_fn, misses) if executor is not None else [embed_fn(t) for t in misses]
+        for t, v in zip(misses, vecs):
+            found[t] = cache.put_embedding(t, v)
+    LOG.info("RAGCACHE embed batch corr_id=%s texts=%d misses=%d", current_corr_id(), len(norm), len(misses))
+    return [found[t] for t in norm]
+
+
+_TOKEN = re.compile(r"\w+")
+
+def hash_embed(text: str, dim: int = 256) -> List[float]:
+    """Deterministic signed feature-hashing embedder (dev/offline default)."""
+    vec = [0.0] * dim
+    for tok in _TOKEN.findall(text.lower()):
+        h = int.from_bytes(hashlib.blake2b(tok.encode("utf-8"), digest_size=8).digest(), "little")
+        vec[h % dim] += 1.0 if (h >> 63) & 1 else -1.0
+    return vec
@@ -0,0 +1,125 @@
+# backend/frostgatecore/app/parallel_embed.py
+"""Process-pool embedding for CPU-bound embedders.
+
+Texts to embed are packed (UTF-8) into one shared-memory block and each
+worker writes its float64 vectors straight into a second shared block, so
+only offsets cross the process boundary instead of pickled strings and
+lists of floats. Doubles keep the result bit-identical to embedding the
+same texts serially. Workers never touch the cache; callers
+(``embed_texts_cached``) read and write it in the parent.
+
+``embed_fn`` must be picklable (a module-level function or a method of a
+picklable object) and return vectors of one fixed dimension.
+"""
+from __future__ import annotations
+
+import multiprocessing
+import os
+import struct
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Callable, List, Optional, Sequence, Tuple
+
+EmbedFn = Callable[[str], Sequence[float]]
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    # Pool workers share the parent's resource tracker, which keeps a set of
+    # names: re-registering on attach is harmless and the parent's unlink()
+    # clears it. Never unlink or unregister here.
+    return shared_memory.SharedMemory(name=name)
+
+
+def _embed_shard(
+    embed_fn: EmbedFn,
+    text_block: str,
+    spans: List[Tuple[int, int]],
+    out_block: str,
+    first_row: int,
+    dim: int,
+) -> int:
+    texts, out = _attach(text_block), _attach(out_block)
+    try:
+        row = struct.Struct(f"<{dim}d")
+        for i, (start, end) in enumerate(spans):
+            vec = embed_fn(bytes(texts.buf[start:end]).decode("utf-8"))
+            if len(vec) != dim:
+                raise ValueError(f"embedder returned {len(vec)} dims, expected {dim}")
+            row.pack_into(out.buf, (first_row + i) * row.size, *vec)
+        return len(spans)
+    finally:
+        texts.close()
+        out.close()
+
+
+class ProcessPoolEmbedder:
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        *,
+        min_batch: int = 32,
+        shard_size: Optional[int] = None,
+        start_method: Optional[str] = None,
+    ) -> None:
+        self.workers = workers or os.cpu_count() or 1
+        self.min_batch = min_batch
+        self.shard_size = shard_size
+        self.start_method = start_method or os.getenv("RAG_EMBED_START_METHOD") or None
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            ctx = multiprocessing.get_context(self.start_method) if self.start_method else None
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=ctx)
+        return self._pool
+
+    def embed_many(self, embed_fn: EmbedFn, texts: Sequence[str]) -> List[List[float]]:
+        """Embed ``texts`` in order; small batches stay in-process."""
+        if len(texts) < max(2, self.min_batch) or self.workers <= 1:
+            return [list(embed_fn(t)) for t in texts]
+
+        # The first text is embedded here to learn the output dimension.
+        head = array("d", embed_fn(texts[0])).tolist()
+        dim, rest = len(head), texts[1:]
+        encoded = [t.encode("utf-8") for t in rest]
+        spans, pos = [], 0
+        for b in encoded:
+            spans.append((pos, pos + len(b)))
+            pos += len(b)
+
+        text_shm = shared_memory.SharedMemory(create=True, size=max(1, pos))
+        out_shm = shared_memory.SharedMemory(create=True, size=max(1, len(rest) * dim * 8))
+        try:
+            text_shm.buf[:pos] = b"".join(encoded)
+            shard = self.shard_size or max(1, -(-len(rest) // (self.workers * 4)))
+            futures = [
+                self._executor().submit(
+                    _embed_shard, embed_fn, text_shm.name, spans[i:i + shard], out_shm.name, i, dim
+                )
+                for i in range(0, len(rest), shard)
+            ]
+            for f in futures:
+                f.result()
+            flat = array("d")
+            flat.frombytes(bytes(out_shm.buf[:len(rest) * dim * 8]))
+        finally:
+            text_shm.close()
+            text_shm.unlink()
+            out_shm.close()
+            out_shm.unlink()
+        return [head] + [flat[i * dim:(i + 1) * dim].tolist() for i in range(len(rest))]
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __enter__(self) -> "ProcessPoolEmbedder":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+__all__ = ["ProcessPoolEmbedder"]
@@ -3,6 +3,9 @@ from .cache import (
     cached_embed,
     cached_doc_ingest,
     cached_query_topk,
+    cached_query_topk_many,
     Cache,
 )
-__all__ = ["cached_embed","cached_doc_ingest","cached_query_topk","Cache"]
+from .migrate import ReembedWorker, TokenBucket
+__all__ = ["cached_embed","cached_doc_ingest","cached_query_topk","cached_query_topk_many","Cache",
+           "ReembedWorker","TokenBucket"]
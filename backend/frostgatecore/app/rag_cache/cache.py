@@ -2,7 +2,9 @@
 from __future__ import annotations
 
 import os
-from typing import Any, Callable, List, Optional, Mapping, Sequence
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, List, Optional, Mapping, Sequence, Tuple
 
 from .kv import get_kv_from_env, KVBase
 from .utils import sha256_text, sha256_bytes, normalize_text
@@ -37,24 +39,62 @@ def _to_jsonable(x: Any) -> Any:
 
 EmbVector = List[float]
 
+class HotChunks:
+    """Bounded LRU use counter of normalized chunk texts (re-embedding candidates)."""
+    def __init__(self, capacity: int = 10_000) -> None:
+        self.capacity = capacity
+        self._counts: 'OrderedDict[str, int]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def touch(self, text: str) -> None:
+        with self._lock:
+            self._counts[text] = self._counts.get(text, 0) + 1
+            self._counts.move_to_end(text)
+            while len(self._counts) > self.capacity:
+                self._counts.popitem(last=False)
+
+    def hottest(self, n: Optional[int] = None) -> List[Tuple[str, int]]:
+        with self._lock:
+            items = sorted(self._counts.items(), key=lambda kv: kv[1], reverse=True)
+        return items if n is None else items[:n]
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
 class Cache:
-    __slots__ = ('kv','query_ttl_s','ns','_prefix')
+    __slots__ = ('kv','query_ttl_s','ns','_prefix','embed_model','embed_dim','embed_fn','hot')
 
     def __init__(
         self,
         kv: Optional[KVBase] = None,
         query_ttl_seconds: Optional[int] = None,
         namespace: Optional[str] = None,
+        embed_model: Optional[str] = None,
+        embed_dim: Optional[int] = None,
+        embed_fn: Optional[Callable[[str], EmbVector]] = None,
     ) -> None:
         self.kv = kv or get_kv_from_env()
         self.query_ttl_s = int(os.getenv('RAG_QUERY_TTL_SECONDS', str(query_ttl_seconds or 90)))
         self.ns = (namespace or os.getenv('RAG_CACHE_NAMESPACE', '')).strip(':')
         self._prefix = f'{self.ns}:' if self.ns else ''
+        # chunk embeddings are keyed by the model that produced them
+        self.embed_model = embed_model or os.getenv('RAG_EMBED_MODEL', 'default')
+        self.embed_dim = int(embed_dim if embed_dim is not None else os.getenv('RAG_EMBED_DIM', '0'))
+        # embedder of the serving model; when unset, callers' embed_fn is trusted to match it
+        self.embed_fn = embed_fn
+        self.hot = HotChunks(int(os.getenv('RAG_HOT_CHUNKS', '10000')))
 
     # keys
     def k_doc(self, doc_hash: str) -> str:   return f'{self._prefix}doc:{doc_hash}'
-    def k_chunk(self, chunk_hash: str) -> str: return f'{self._prefix}chunk:{chunk_hash}'
-    def k_query(self, q_hash: str) -> str:   return f'{self._prefix}q:{q_hash}'
+    def k_chunk(self, chunk_hash: str, model: Optional[str] = None, dim: Optional[int] = None) -> str:
+        m = model or self.embed_model
+        d = self.embed_dim if dim is None else dim
+        return f'{self._prefix}chunk:{m}:{d}:{chunk_hash}'
+    def k_query(self, q_hash: str, scope: str = '') -> str:
+        # query vectors come from the serving model; scope identifies the store
+        # (and its write generation) that answered
+        m = f'{self.embed_model}:{self.embed_dim}'
+        return f'{self._prefix}q:{m}:{scope}:{q_hash}' if scope else f'{self._prefix}q:{m}:{q_hash}'
 
     # KV wrappers
     def _kv_get(self, key: str) -> Optional[bytes]:
@@ -98,21 +138,49 @@ class Cache:
         return doc_id
 
     # chunk embedding
+    def serving_embed_fn(self, fallback: Callable[[str], EmbVector]) -> Callable[[str], EmbVector]:
+        """The embedder whose vectors belong under the serving model's keys."""
+        return self.embed_fn or fallback
+
     def cached_embed(self, text: str, embed_fn: Callable[[str], EmbVector]) -> EmbVector:
         t   = normalize_text(text)
-        key = self.k_chunk(sha256_text(t))
-        hit = self._kv_get(key)
-        if hit:
-            return _json_loads(hit)
-        vec = embed_fn(t)
+        hit = self.get_embedding(t)
+        if hit is not None:
+            return hit
+        return self.put_embedding(t, self.serving_embed_fn(embed_fn)(t))
+
+    # split lookup/store so batch callers can embed misses elsewhere;
+    # model/dim default to the serving version (the re-embed worker passes the new one)
+    def get_embedding(self, text: str, model: Optional[str] = None, dim: Optional[int] = None) -> Optional[EmbVector]:
+        t = normalize_text(text)
+        if model is None:
+            self.hot.touch(t)
+        hit = self._kv_get(self.k_chunk(sha256_text(t), model, dim))
+        return _json_loads(hit) if hit else None
+
+    def put_embedding(self, text: str, vec: Any, model: Optional[str] = None, dim: Optional[int] = None) -> EmbVector:
         norm_vec = _to_jsonable(vec)
-        self._kv_set(key, _json_dumps(norm_vec))
+        d = self.embed_dim if dim is None else dim
+        if d and isinstance(norm_vec, list) and len(norm_vec) != d:
+            raise ValueError(f'{model or self.embed_model} expects {d}-dimensional vectors, got {len(norm_vec)}')
+        self._kv_set(self.k_chunk(sha256_text(normalize_text(text)), model, dim), _json_dumps(norm_vec))
         return norm_vec
 
+    def switch_embed_model(self, model: str, dim: int, embed_fn: Optional[Callable[[str], EmbVector]] = None) -> None:
+        """
+        Cut chunk lookups over to another model version. With `embed_fn` the
+        cache owns the new embedder: misses are embedded with it whatever
+        function the caller passes, so the new keyspace never receives
+        vectors from the old model.
+        """
+        self.embed_model, self.embed_dim, self.embed_fn = model, dim, embed_fn
+
     # query topK
-    def cached_query_topk(self, query: str, k: int, query_fn: Callable[[str, int], List[Any]]) -> List[Any]:
+    def cached_query_topk(
+        self, query: str, k: int, query_fn: Callable[[str, int], List[Any]], scope: str = ''
+    ) -> List[Any]:
         qn  = normalize_text(query)
-        key = self.k_query(sha256_text(f'{qn}|k={k}'))
+        key = self.k_query(sha256_text(f'{qn}|k={k}'), scope)
         hit = self._kv_get(key)
         if hit:
             return _json_loads(hit)
@@ -121,6 +189,27 @@ class Cache:
         self._kv_set(key, _json_dumps(norm), ttl_s=self.query_ttl_s)
         return norm
 
+    # batch query topK: one query_fn call for all cache misses
+    def cached_query_topk_many(
+        self, queries: Sequence[str], k: int, batch_fn: Callable[[List[str], int], List[List[Any]]],
+        scope: str = '',
+    ) -> List[List[Any]]:
+        norm_qs = [normalize_text(q) for q in queries]
+        out: dict[str, Any] = {}
+        misses: List[str] = []
+        for qn in dict.fromkeys(norm_qs):
+            hit = self._kv_get(self.k_query(sha256_text(f'{qn}|k={k}'), scope))
+            if hit:
+                out[qn] = _json_loads(hit)
+            else:
+                misses.append(qn)
+        if misses:
+            for qn, results in zip(misses, batch_fn(misses, k)):
+                norm = _to_jsonable(results)
+                self._kv_set(self.k_query(sha256_text(f'{qn}|k={k}'), scope), _json_dumps(norm), ttl_s=self.query_ttl_s)
+                out[qn] = norm
+        return [out[qn] for qn in norm_qs]
+
 # module-level singleton + helpers
 _cache_singleton: Optional[Cache] = None
 def _cache() -> Cache:
@@ -135,7 +224,12 @@ def cached_doc_ingest(doc_bytes: bytes, ingest_fn: Callable[[bytes], str]) -> st
 def cached_embed(text: str, embed_fn: Callable[[str], EmbVector]) -> EmbVector:
     return _cache().cached_embed(text, embed_fn)
 
-def cached_query_topk(query: str, k: int, query_fn: Callable[[str, int], List[Any]]) -> List[Any]:
-    return _cache().cached_query_topk(query, k, query_fn)
+def cached_query_topk(query: str, k: int, query_fn: Callable[[str, int], List[Any]], scope: str = '') -> List[Any]:
+    return _cache().cached_query_topk(query, k, query_fn, scope)
+
+def cached_query_topk_many(
+    queries: Sequence[str], k: int, batch_fn: Callable[[List[str], int], List[List[Any]]], scope: str = ''
+) -> List[List[Any]]:
+    return _cache().cached_query_topk_many(queries, k, batch_fn, scope)
 
-__all__ = ['Cache','cached_doc_ingest','cached_embed','cached_query_topk']
+__all__ = ['Cache','cached_doc_ingest','cached_embed','cached_query_topk','cached_query_topk_many']
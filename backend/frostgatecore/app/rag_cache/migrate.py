@@ -0,0 +1,202 @@
+# backend/frostgatecore/app/rag_cache/migrate.py
+"""
+Background re-embedding for an embedding model swap.
+
+Chunk embeddings are cached under ``chunk:<model>:<dim>:<hash>``, so a new
+model version gets its own keyspace. ``ReembedWorker`` walks the cache's hot
+chunks (most used first), embeds the ones missing for the new version under a
+token-bucket rate limit and writes them next to the old entries. Lookups keep
+serving the old version until ``cutover()`` (or ``cutover_at`` progress) flips
+the cache, at which point the hot set is already warm. The chunks stored in
+the given vector ``indexes`` are re-embedded the same way and must all be
+covered before a cutover; the cutover then rebuilds each index from those
+vectors and hands the new embedder to the cache, so later misses are
+embedded with it and searches never mix vectors of both models.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Callable, List, Optional, Sequence, Set
+
+from .cache import Cache, EmbVector
+from .utils import normalize_text
+
+LOG = logging.getLogger("rag.migrate")
+
+
+class TokenBucket:
+    def __init__(
+        self,
+        rate_per_s: float,
+        burst: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.rate = rate_per_s
+        self.capacity = burst if burst is not None else max(1.0, rate_per_s)
+        self.tokens = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._last = clock()
+
+    def acquire(self, n: float = 1.0) -> None:
+        """Block until ``n`` tokens are available (n may exceed the burst)."""
+        while True:
+            now = self._clock()
+            self.tokens = min(self.capacity, self.tokens + (now - self._last) * self.rate)
+            self._last = now
+            if self.tokens >= min(n, self.capacity):
+                self.tokens -= n  # may go negative for oversized requests; repaid by waiting
+                return
+            self._sleep((min(n, self.capacity) - self.tokens) / self.rate)
+
+
+class ReembedWorker:
+    def __init__(
+        self,
+        cache: Cache,
+        embed_fn: Callable[[str], EmbVector],
+        model: str,
+        dim: int,
+        *,
+        rate_per_s: float = 20.0,
+        batch: int = 16,
+        executor=None,
+        cutover_at: Optional[float] = None,
+        poll_interval_s: float = 5.0,
+        bucket: Optional[TokenBucket] = None,
+        indexes: Sequence = (),
+    ) -> None:
+        self.cache = cache
+        self.embed_fn = embed_fn
+        self.model = model
+        self.dim = dim
+        self.batch = max(1, batch)
+        self.executor = executor
+        self.cutover_at = cutover_at
+        self.poll_interval_s = poll_interval_s
+        self.bucket = bucket or TokenBucket(rate_per_s)
+        self.indexes = list(indexes)
+        self.reembedded = 0
+        # texts known to have a new-version embedding; each is looked up once
+        self._done: Set[str] = set()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _index_texts(self) -> List[str]:
+        return list(dict.fromkeys(normalize_text(t) for index in self.indexes for t in index.texts()))
+
+    def pending(self, limit: Optional[int] = None) -> List[str]:
+        """
+        Hot chunk texts (hottest first), then index chunk texts, without a
+        new-version embedding, at most ``limit``. Only texts not yet seen done
+        are looked up, and the scan stops once ``limit`` are found, so a
+        whole migration costs about one KV read per chunk.
+        """
+        out: List[str] = []
+        hot = [t for t, _ in self.cache.hot.hottest()]
+        for t in dict.fromkeys(hot + self._index_texts()):
+            if t in self._done:
+                continue
+            if self.cache.get_embedding(t, self.model, self.dim) is not None:
+                self._done.add(t)
+                continue
+            out.append(t)
+            if limit is not None and len(out) >= limit:
+                break
+        return out
+
+    def progress(self) -> float:
+        """Share of the hot set known to be re-embedded (no KV reads)."""
+        hot = [t for t, _ in self.cache.hot.hottest()]
+        if not hot:
+            return 1.0
+        return sum(1 for t in hot if t in self._done) / len(hot)
+
+    def indexes_covered(self) -> bool:
+        """Whether every index chunk is known to be re-embedded (no KV reads)."""
+        return all(t in self._done for t in self._index_texts())
+
+    def run_once(self, limit: Optional[int] = None) -> int:
+        """Re-embed up to ``limit`` pending chunks (default: one batch)."""
+        return self._embed(self.pending(limit or self.batch))
+
+    def _embed(self, todo: List[str]) -> int:
+        """Embed ``todo`` with the new model in rate-limited batches."""
+        done = 0
+        for i in range(0, len(todo), self.batch):
+            if self._stop.is_set():
+                break
+            group = todo[i:i + self.batch]
+            self.bucket.acquire(len(group))
+            if self.executor is not None:
+                vecs = self.executor.embed_many(self.embed_fn, group)
+            else:
+                vecs = [self.embed_fn(t) for t in group]
+            for t, v in zip(group, vecs):
+                self.cache.put_embedding(t, v, self.model, self.dim)  # raises on a dimension mismatch
+                self._done.add(t)
+            done += len(group)
+        self.reembedded += done
+        return done
+
+    def _new_vector(self, text: str) -> EmbVector:
+        vec = self.cache.get_embedding(text, self.model, self.dim)
+        if vec is None:  # stored after coverage was checked
+            self._embed([normalize_text(text)])
+            vec = self.cache.get_embedding(text, self.model, self.dim)
+            if vec is None:
+                raise RuntimeError("re-embedding stopped before the cutover finished")
+        return vec
+
+    def cutover(self) -> None:
+        """
+        Flip the cache and indexes to the new model. Index chunks not yet
+        re-embedded are embedded first, still under the rate limit; each
+        index is then rebuilt from the new-version cache entries while it
+        keeps serving, and the cache switches when the first one swaps.
+        """
+        while not self.indexes_covered():
+            wanted = set(self._index_texts())
+            if not self._embed([t for t in self.pending() if t in wanted]):
+                break  # the rest already had new-version entries, or we were stopped
+        LOG.info("RAGCACHE embed cutover model=%s dim=%d reembedded=%d", self.model, self.dim, self.reembedded)
+
+        def switch() -> None:
+            self.cache.switch_embed_model(self.model, self.dim, self.embed_fn)
+
+        for index in self.indexes:
+            dropped = index.reembed(self.embed_fn, self._new_vector, on_swap=switch)
+            if dropped:
+                LOG.warning("RAGCACHE cutover dropped %d chunks without text model=%s", dropped, self.model)
+        switch()
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                n = self.run_once()
+                if self.cutover_at is not None and self.cache.embed_model != self.model \
+                        and self.progress() >= self.cutover_at and self.indexes_covered():
+                    self.cutover()
+            except Exception:
+                LOG.exception("RAGCACHE re-embed batch failed model=%s", self.model)
+                n = 0
+            if n == 0:
+                self._stop.wait(self.poll_interval_s)
+
+    def start(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="rag-reembed", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+
+__all__ = ["ReembedWorker", "TokenBucket"]
@@ -0,0 +1,54 @@
+# backend/frostgatecore/app/search.py
+import logging
+from typing import Any, List, Optional, Sequence
+
+from app.corr import current_corr_id
+from app.rag_cache import cached_query_topk, cached_query_topk_many
+from app.vector_index import default_index
+
+LOG = logging.getLogger("rag.search")
+
+
+def _cache_scope(store) -> str:
+    """
+    Query-cache scope for `store`: its `cache_token` (bumped on every write)
+    when it has one, otherwise its identity, so different stores never share
+    cached hits.
+    """
+    token = getattr(store, "cache_token", None)
+    if token is not None:
+        return str(token)
+    return f"{type(store).__qualname__}@{id(store):x}"
+
+
+def search_topk_cached(vector_store=None, query: str = "", k: int = 10) -> List[Any]:
+    """
+    Top-k search with the query cache in front.
+
+    `vector_store` needs `similarity_search(query, top_k=...)`; it defaults to
+    the process-wide `VectorIndex` fed by `upsert_chunks_with_cache`.
+    """
+    store = vector_store if vector_store is not None else default_index()
+    hits = cached_query_topk(
+        query, k=k, query_fn=lambda q, kk: store.similarity_search(q, top_k=kk), scope=_cache_scope(store)
+    )
+    LOG.info("RAGCACHE query corr_id=%s k=%d hits=%d", current_corr_id(), k, len(hits))
+    return hits
+
+
+def search_batch_cached(vector_store=None, queries: Sequence[str] = (), k: int = 10) -> List[List[Any]]:
+    """
+    Multi-query top-k: cached queries are answered from the cache and all
+    misses go to the store in one `similarity_search_batch` call.
+    """
+    store = vector_store if vector_store is not None else default_index()
+    if hasattr(store, "similarity_search_batch"):
+        batch_fn = lambda qs, kk: store.similarity_search_batch(qs, top_k=kk)  # noqa: E731
+    else:
+        batch_fn = lambda qs, kk: [store.similarity_search(q, top_k=kk) for q in qs]  # noqa: E731
+    results = cached_query_topk_many(list(queries), k=k, batch_fn=batch_fn, scope=_cache_scope(store))
+    LOG.info("RAGCACHE batch query corr_id=%s k=%d queries=%d", current_corr_id(), k, len(results))
+    return results
+
+
+__all__ = ["search_topk_cached", "search_batch_cached", "default_index"]
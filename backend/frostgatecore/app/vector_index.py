@@ -0,0 +1,373 @@
+# backend/frostgatecore/app/vector_index.py
+"""In-process float32 vector index for frostgatecore search.
+
+Vectors are L2-normalised on insert and kept in one contiguous float32
+buffer, so cosine similarity is a dot product. ``mode="exact"`` scans every
+row; ``mode="ivf"`` clusters rows into ``nlist`` k-means cells once
+``train_threshold`` vectors are present and only scans the ``nprobe`` cells
+closest to the query. numpy is used for the scans when installed.
+
+The index implements the ``upsert_embedding(doc_id, chunk_id, embedding)``
+store protocol used by ``upsert_chunks_with_cache``, which also binds the
+embedder it stored chunks with as the query embedder. ``cache_token`` changes
+on every write, so cached top-k results never outlive the contents they
+were computed from. Chunk texts passed to ``upsert_embedding`` are kept so
+``reembed`` can rebuild every vector after an embedding model cutover.
+"""
+from __future__ import annotations
+
+import heapq
+import math
+import operator
+import os
+import random
+import threading
+import uuid
+from array import array
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+try:
+    import numpy as _np  # type: ignore
+except Exception:  # pragma: no cover
+    _np = None
+
+Hit = Tuple[str, float]
+
+
+def chunk_key(doc_id: str, chunk_id: str) -> str:
+    return f"{doc_id}:{chunk_id}"
+
+
+def _normalised(vec: Iterable[float], dim: int) -> array:
+    row = array("f", vec)
+    if len(row) != dim:
+        raise ValueError(f"expected {dim}-dimensional vector, got {len(row)}")
+    norm = math.sqrt(sum(v * v for v in row))
+    if norm > 0.0:
+        for i in range(dim):
+            row[i] /= norm
+    return row
+
+
+def _dot(a: Sequence[float], b: Sequence[float]) -> float:
+    return sum(map(operator.mul, a, b))
+
+
+class VectorIndex:
+    def __init__(
+        self,
+        dim: Optional[int] = None,
+        *,
+        mode: str = "exact",
+        nlist: int = 64,
+        nprobe: int = 8,
+        train_threshold: Optional[int] = None,
+        seed: int = 0,
+        embed_fn: Optional[Callable[[str], Sequence[float]]] = None,
+    ) -> None:
+        if mode not in ("exact", "ivf"):
+            raise ValueError(f"unknown index mode {mode!r}")
+        self.dim = dim
+        self.mode = mode
+        self.nlist = max(1, nlist)
+        self.nprobe = max(1, nprobe)
+        self.train_threshold = train_threshold if train_threshold is not None else 8 * self.nlist
+        self.seed = seed
+        self.embed_fn = embed_fn
+        self._lock = threading.RLock()
+        self._data = array("f")
+        self._keys: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._texts: Dict[str, str] = {}
+        # IVF state: centroid per cell, cell per row, rows per cell
+        self._centroids: List[array] = []
+        self._cell_of: array = array("i")
+        self._cells: List[Set[int]] = []
+        # identity + write generation, scoped into query-cache keys
+        self._instance = uuid.uuid4().hex[:12]
+        self._generation = 0
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    @property
+    def trained(self) -> bool:
+        return bool(self._centroids)
+
+    @property
+    def cache_token(self) -> str:
+        return f"{self._instance}.{self._generation}"
+
+    # ---------- writes ----------
+    def bind_embedder(self, embed_fn: Callable[[str], Sequence[float]]) -> None:
+        """
+        Use `embed_fn` for text queries unless the index already holds vectors
+        from an earlier bound embedder, so queries are embedded by the model
+        that produced the stored chunks.
+        """
+        with self._lock:
+            if self.embed_fn is None or not self._keys:
+                self.embed_fn = embed_fn
+
+    def upsert_embedding(
+        self, doc_id: str, chunk_id: str, embedding: Iterable[float], text: Optional[str] = None
+    ) -> None:
+        self.upsert(chunk_key(doc_id, chunk_id), embedding, text=text)
+
+    def upsert(self, key: str, embedding: Iterable[float], text: Optional[str] = None) -> None:
+        vec = list(embedding)
+        with self._lock:
+            if text is not None:
+                self._texts[key] = text
+            else:
+                self._texts.pop(key, None)
+            if self.dim is None:
+                self.dim = len(vec)
+            row = _normalised(vec, self.dim)
+            idx = self._rows.get(key)
+            if idx is None:
+                idx = len(self._keys)
+                self._keys.append(key)
+                self._rows[key] = idx
+                self._data.extend(row)
+                self._cell_of.append(-1)
+            else:
+                self._data[idx * self.dim:(idx + 1) * self.dim] = row
+            if self.trained:
+                self._assign(idx, row)
+            self._generation += 1
+
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            idx = self._rows.pop(key, None)
+            if idx is None:
+                return False
+            self._texts.pop(key, None)
+            self._generation += 1
+            dim = self.dim or 0
+            last = len(self._keys) - 1
+            self._unassign(idx)
+            if idx != last:
+                # move the last row into the hole
+                moved = self._keys[last]
+                self._data[idx * dim:(idx + 1) * dim] = self._data[last * dim:(last + 1) * dim]
+                self._keys[idx] = moved
+                self._rows[moved] = idx
+                cell = self._cell_of[last]
+                self._cell_of[idx] = cell
+                if cell >= 0:
+                    self._cells[cell].discard(last)
+                    self._cells[cell].add(idx)
+            self._keys.pop()
+            self._cell_of.pop()
+            del self._data[last * dim:]
+            return True
+
+    def delete_doc(self, doc_id: str) -> int:
+        prefix = f"{doc_id}:"
+        with self._lock:
+            keys = [k for k in self._keys if k.startswith(prefix)]
+            for k in keys:
+                self.delete(k)
+        return len(keys)
+
+    def texts(self) -> List[str]:
+        """Chunk texts currently stored (the ones ``reembed`` can rebuild)."""
+        with self._lock:
+            return list(self._texts.values())
+
+    def reembed(
+        self,
+        embed_fn: Callable[[str], Sequence[float]],
+        chunk_embed_fn: Optional[Callable[[str], Sequence[float]]] = None,
+        on_swap: Optional[Callable[[], None]] = None,
+    ) -> int:
+        """
+        Rebuild the index with a new embedding model: every chunk with a known
+        text is re-embedded (via ``chunk_embed_fn``, e.g. the cache, defaulting
+        to ``embed_fn``) and ``embed_fn`` embeds queries from now on. Chunks
+        upserted without text cannot be re-embedded and are dropped rather
+        than left as old-model vectors. Returns the number dropped.
+
+        Vectors are computed and the new matrix built without holding the
+        lock, so searches and upserts keep going on the old vectors; the lock
+        is only taken to swap the new state in (and to call ``on_swap``). If
+        the index was written meanwhile, the rebuild is repeated, embedding
+        only texts it has not seen yet.
+        """
+        chunk_embed_fn = chunk_embed_fn or embed_fn
+        vectors: Dict[str, Sequence[float]] = {}
+        while True:
+            with self._lock:
+                generation = self._generation
+                keep = [(key, self._texts[key]) for key in self._keys if key in self._texts]
+                dropped = len(self._keys) - len(keep)
+                trained = self.trained
+            for _, text in keep:
+                if text not in vectors:
+                    vectors[text] = chunk_embed_fn(text)
+            fresh = VectorIndex(
+                mode=self.mode, nlist=self.nlist, nprobe=self.nprobe,
+                train_threshold=self.train_threshold, seed=self.seed, embed_fn=embed_fn,
+            )
+            for key, text in keep:
+                fresh.upsert(key, vectors[text], text=text)
+            if trained:
+                fresh.train()
+            with self._lock:
+                if self._generation != generation:
+                    continue
+                self.dim, self._data = fresh.dim, fresh._data
+                self._keys, self._rows, self._texts = fresh._keys, fresh._rows, fresh._texts
+                self._centroids, self._cell_of, self._cells = fresh._centroids, fresh._cell_of, fresh._cells
+                self.embed_fn = embed_fn
+                self._generation += 1
+                if on_swap is not None:
+                    on_swap()
+                return dropped
+
+    # ---------- IVF ----------
+    def _row(self, idx: int) -> memoryview:
+        dim = self.dim or 0
+        return memoryview(self._data)[idx * dim:(idx + 1) * dim]
+
+    def _nearest_cell(self, vec: Sequence[float]) -> int:
+        return max(range(len(self._centroids)), key=lambda c: _dot(self._centroids[c], vec))
+
+    def _assign(self, idx: int, vec: Sequence[float]) -> None:
+        self._unassign(idx)
+        cell = self._nearest_cell(vec)
+        self._cell_of[idx] = cell
+        self._cells[cell].add(idx)
+
+    def _unassign(self, idx: int) -> None:
+        cell = self._cell_of[idx]
+        if cell >= 0:
+            self._cells[cell].discard(idx)
+            self._cell_of[idx] = -1
+
+    def train(self, iterations: int = 10) -> None:
+        """(Re)build the IVF cells with spherical k-means over the stored rows."""
+        with self._lock:
+            n, dim = len(self._keys), self.dim or 0
+            if n == 0:
+                return
+            k = min(self.nlist, n)
+            rng = random.Random(self.seed)
+            centroids = [array("f", self._row(i)) for i in rng.sample(range(n), k)]
+            assign = [0] * n
+            for _ in range(iterations):
+                sums = [[0.0] * dim for _ in range(k)]
+                counts = [0] * k
+                for i in range(n):
+                    row = self._row(i)
+                    c = max(range(k), key=lambda j: _dot(centroids[j], row))
+                    assign[i] = c
+                    counts[c] += 1
+                    acc = sums[c]
+                    for d in range(dim):
+                        acc[d] += row[d]
+                for c in range(k):
+                    if counts[c]:
+                        centroids[c] = _normalised(sums[c], dim)
+            self._centroids = centroids
+            self._generation += 1  # probed cells, hence approximate hits, change
+            self._cells = [set() for _ in range(k)]
+            for i, c in enumerate(assign):
+                self._cell_of[i] = c
+                self._cells[c].add(i)
+
+    def _candidates(self, q: Sequence[float]) -> Optional[List[int]]:
+        if self.mode != "ivf":
+            return None
+        if not self.trained:
+            if len(self._keys) < self.train_threshold:
+                return None
+            self.train()
+        order = heapq.nlargest(self.nprobe, range(len(self._centroids)), key=lambda c: _dot(self._centroids[c], q))
+        rows: List[int] = []
+        for c in order:
+            rows.extend(self._cells[c])
+        return rows
+
+    # ---------- reads ----------
+    def _score_rows(self, q: array, rows: Optional[List[int]], k: int) -> List[Hit]:
+        n, dim = len(self._keys), self.dim or 0
+        if _np is not None:
+            mat = _np.frombuffer(self._data, dtype=_np.float32, count=n * dim).reshape(n, dim)
+            idx = _np.arange(n) if rows is None else _np.asarray(rows, dtype=_np.int64)
+            if idx.size == 0:
+                return []
+            scores = mat[idx] @ _np.frombuffer(q, dtype=_np.float32)
+            top = min(k, idx.size)
+            part = _np.argpartition(-scores, top - 1)[:top]
+            best = part[_np.argsort(-scores[part])]
+            return [(self._keys[int(idx[i])], float(scores[i])) for i in best]
+        view = memoryview(self._data)
+        candidates = range(n) if rows is None else rows
+        scored = ((_dot(view[i * dim:(i + 1) * dim], q), i) for i in candidates)
+        return [(self._keys[i], float(s)) for s, i in heapq.nlargest(k, scored)]
+
+    def search(self, vector: Iterable[float], k: int = 10) -> List[Hit]:
+        with self._lock:
+            if not self._keys or k <= 0:
+                return []
+            q = _normalised(vector, self.dim or 0)
+            return self._score_rows(q, self._candidates(q), k)
+
+    def search_batch(self, vectors: Sequence[Iterable[float]], k: int = 10) -> List[List[Hit]]:
+        """Top-k for several queries under one lock; one matrix product with numpy in exact mode."""
+        with self._lock:
+            if not self._keys or k <= 0:
+                return [[] for _ in vectors]
+            queries = [_normalised(v, self.dim or 0) for v in vectors]
+            if _np is None or self.mode == "ivf":
+                return [self._score_rows(q, self._candidates(q), k) for q in queries]
+            n, dim = len(self._keys), self.dim or 0
+            mat = _np.frombuffer(self._data, dtype=_np.float32, count=n * dim).reshape(n, dim)
+            qmat = _np.frombuffer(b"".join(q.tobytes() for q in queries), dtype=_np.float32).reshape(len(queries), dim)
+            scores = qmat @ mat.T
+            top = min(k, n)
+            out: List[List[Hit]] = []
+            for row in scores:
+                part = _np.argpartition(-row, top - 1)[:top]
+                best = part[_np.argsort(-row[part])]
+                out.append([(self._keys[int(i)], float(row[i])) for i in best])
+            return out
+
+    # text-query protocol used by search_topk_cached / search_batch_cached
+    def _embedder(self, embed_fn: Optional[Callable[[str], Sequence[float]]]) -> Callable[[str], Sequence[float]]:
+        fn = embed_fn or self.embed_fn
+        if fn is None:
+            raise ValueError("VectorIndex needs an embed_fn for text queries")
+        return fn
+
+    def similarity_search(self, query: str, top_k: int = 10, embed_fn=None) -> List[Hit]:
+        if not self._keys:
+            return []
+        return self.search(self._embedder(embed_fn)(query), top_k)
+
+    def similarity_search_batch(self, queries: Sequence[str], top_k: int = 10, embed_fn=None) -> List[List[Hit]]:
+        if not self._keys:
+            return [[] for _ in queries]
+        fn = self._embedder(embed_fn)
+        return self.search_batch([fn(q) for q in queries], top_k)
+
+
+# module-level singleton, like the rag cache
+_index_singleton: Optional[VectorIndex] = None
+
+
+def default_index() -> VectorIndex:
+    global _index_singleton
+    if _index_singleton is None:
+        # the query embedder is bound by the first upsert_chunks_with_cache
+        _index_singleton = VectorIndex(
+            mode=os.getenv("RAG_INDEX_MODE", "exact"),
+            nlist=int(os.getenv("RAG_INDEX_NLIST", "64")),
+            nprobe=int(os.getenv("RAG_INDEX_NPROBE", "8")),
+        )
+    return _index_singleton
+
+
+__all__ = ["VectorIndex", "chunk_key", "default_index"]
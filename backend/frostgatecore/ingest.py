@@ -4,7 +4,9 @@ from typing import Iterable, Tuple, Optional
 
 # Dockerfile copies only app/, so import from app.*
 from app.rag_cache import cached_doc_ingest
-from app.embedding import embed_text_cached
+from app.rag_cache.cache import _cache
+from app.embedding import embed_text_cached, embed_texts_cached
+from app.vector_index import VectorIndex, default_index
 
 LOG = logging.getLogger("rag.ingest")
 
@@ -39,7 +41,8 @@ def upsert_chunks_with_cache(
     doc_id: str,
     chunks: Iterable[Tuple[str, str]],
     embedder,
-    vector_store,
+    vector_store=None,
+    executor=None,
 ) -> int:
     """
     Upsert chunk embeddings with caching.
@@ -54,6 +57,13 @@ def upsert_chunks_with_cache(
         Object exposing `embed_text(text: str) -> list[float]` or similar.
     vector_store :
         Store exposing `upsert_embedding(doc_id: str, chunk_id: str, embedding) -> None`.
+        Defaults to the process-wide `app.vector_index.VectorIndex` that backs search;
+        a `VectorIndex` also keeps the chunk text so it can be re-embedded on a model cutover,
+        and gets the embedder that produced the chunks bound for its text queries.
+    executor :
+        Optional `app.parallel_embed.ProcessPoolEmbedder`. When given, all cache
+        misses are embedded in one sharded batch across its worker processes
+        (`embedder.embed_text` must be picklable); cache writes stay in this process.
 
     Returns
     -------
@@ -62,11 +72,30 @@ def upsert_chunks_with_cache(
     """
     count = 0
     cid = _safe_current_corr_id() or "local"
+    if vector_store is None:
+        vector_store = default_index()
+    keeps_text = isinstance(vector_store, VectorIndex)
+    if keeps_text:
+        # cache misses are embedded by the serving embedder, so queries must be too
+        vector_store.bind_embedder(_cache().serving_embed_fn(embedder.embed_text))
 
-    for chunk_id, chunk_text in chunks:
-        emb = embed_text_cached(chunk_text, embed_fn=embedder.embed_text)
-        vector_store.upsert_embedding(doc_id, chunk_id, emb)
-        count += 1
+    def upsert(chunk_id: str, text: str, emb) -> None:
+        if keeps_text:
+            vector_store.upsert_embedding(doc_id, chunk_id, emb, text=text)
+        else:
+            vector_store.upsert_embedding(doc_id, chunk_id, emb)
+
+    if executor is not None:
+        chunks = list(chunks)
+        embs = embed_texts_cached([text for _, text in chunks], embedder.embed_text, executor=executor)
+        for (chunk_id, chunk_text), emb in zip(chunks, embs):
+            upsert(chunk_id, chunk_text, emb)
+            count += 1
+    else:
+        for chunk_id, chunk_text in chunks:
+            emb = embed_text_cached(chunk_text, embed_fn=embedder.embed_text)
+            upsert(chunk_id, chunk_text, emb)
+            count += 1
 
     LOG.info("RAGCACHE upsert corr_id=%s doc_id=%s chunks=%d", cid, doc_id, count)
     return count
@@ -1,11 +1,4 @@
-import logging
-from frostgatecore.rag_cache import cached_query_topk
-from orchestrator.app import current_corr_id
+# Dockerfile copies only app/; the implementation lives in app.search.
+from app.search import search_batch_cached, search_topk_cached
 
-LOG = logging.getLogger("rag.search")
-
-def search_topk_cached(vector_store, query: str, k: int = 10):
-    cid = current_corr_id() or "local"
-    ids = cached_query_topk(query, query_fn=lambda q, kk: vector_store.similarity_search(q, top_k=kk), k=k)
-    LOG.info("RAGCACHE query hit corr_id=%s k=%d", cid, k)
-    return ids
+__all__ = ["search_topk_cached", "search_batch_cached"]
@@ -0,0 +1,55 @@
+"""Compare per-request SQLite connections with the pooled, WAL-tuned factory.
+
+Usage: python scripts/bench_ingestor_sessions.py [snapshots] [devices]
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from services.foundry_ingestor_common.database import (  # noqa: E402
+    create_db_engine,
+    create_session_factory,
+    initialize_database,
+)
+from services.foundry_ingestor_common.ingest import ingest_snapshot  # noqa: E402
+
+
+def payload(index: int, devices: int) -> dict:
+    return {
+        "snapshot_id": f"snap-{index}",
+        "site": {"code": "HQ", "name": "Headquarters", "metadata": {}},
+        "network_segments": [{"code": "SEG-1", "name": "Segment 1", "metadata": {}}],
+        "devices": [
+            # one device changes per snapshot so every sync writes something
+            {"code": f"DEV-{i}", "hostname": f"host-{i}-{index if i == 0 else 0}", "segment_code": "SEG-1"}
+            for i in range(devices)
+        ],
+    }
+
+
+def run(label: str, snapshots: int, devices: int, **factory_options) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{Path(tmp) / 'bench.db'}")
+        initialize_database(engine)
+        session_factory = create_session_factory(engine, **factory_options)
+        start = time.perf_counter()
+        for index in range(snapshots):
+            session = session_factory()
+            try:
+                ingest_snapshot(session, service="bench", category="bench", payload=payload(index, devices))
+                session.commit()
+            finally:
+                session.close()
+        elapsed = time.perf_counter() - start
+        session_factory.close()
+    print(f"{label:<28} {snapshots} snapshots  total={elapsed:.3f}s  per_snapshot={elapsed / snapshots * 1000:.2f}ms")
+
+
+snapshots = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+devices = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+run("connect per session", snapshots, devices, pool_size=0)
+run("pooled + WAL/NORMAL", snapshots, devices, pool_size=4)
@@ -2,20 +2,95 @@
 
 from __future__ import annotations
 
+import atexit
+import gzip
 import json
+import os
+import shutil
+import threading
+import time
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterable
+
+FSYNC_POLICIES = ("never", "batch")
 
 
 class AuditLogger:
-    """Append-only JSONL audit logger."""
+    """Append-only JSONL audit logger.
+
+    By default every entry is written (and flushed to the OS) before ``log``
+    returns. With ``flush_interval`` set, entries are buffered in memory and
+    a background thread writes them in one batch every ``flush_interval``
+    seconds, or sooner once ``max_buffer`` entries are waiting; ``close()``
+    (also registered with :mod:`atexit`) writes whatever is left.
+
+    ``fsync="batch"`` fsyncs after every write batch; ``"never"`` leaves it
+    to the OS. The file is rotated to ``<name>.<UTC timestamp>`` once it
+    reaches ``max_bytes`` or is ``rotate_interval`` seconds old, optionally
+    gzip-compressed, keeping at most ``backup_count`` rotated files. If the
+    file is moved or deleted by someone else (e.g. logrotate), the next
+    write reopens it at ``path``.
+    """
 
-    def __init__(self, path: str | Path):
+    def __init__(
+        self,
+        path: str | Path,
+        *,
+        flush_interval: float | None = None,
+        max_buffer: int = 1000,
+        fsync: str = "never",
+        max_bytes: int | None = None,
+        rotate_interval: float | None = None,
+        compress: bool = False,
+        backup_count: int | None = None,
+    ):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {', '.join(FSYNC_POLICIES)}")
         self.path = Path(path)
         self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.flush_interval = flush_interval
+        self.max_buffer = max(1, max_buffer)
+        self.fsync = fsync
+        self.max_bytes = max_bytes
+        self.rotate_interval = rotate_interval
+        self.compress = compress
+        self.backup_count = backup_count
 
-    def log(self, *, service: str, snapshot_id: str | None, status: str, details: dict[str, Any] | None = None) -> None:
+        self._handle = None
+        self._opened_at = 0.0
+        self._write_lock = threading.Lock()
+        self._buffer: list[str] = []
+        self._buffer_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._flusher: threading.Thread | None = None
+        if flush_interval is not None:
+            self._flusher = threading.Thread(target=self._run, name=f"audit-flush-{self.path.name}", daemon=True)
+            self._flusher.start()
+            atexit.register(self.close)
+
+    @classmethod
+    def from_env(cls, path: str | Path) -> "AuditLogger":
+        """Build a logger configured by ``FOUNDRY_AUDIT_*`` environment variables."""
+
+        def number(name: str, kind: type = float) -> Any:
+            value = os.getenv(name)
+            return kind(value) if value else None
+
+        return cls(
+            path,
+            flush_interval=number("FOUNDRY_AUDIT_FLUSH_INTERVAL"),
+            max_buffer=number("FOUNDRY_AUDIT_MAX_BUFFER", int) or 1000,
+            fsync=os.getenv("FOUNDRY_AUDIT_FSYNC", "never"),
+            max_bytes=number("FOUNDRY_AUDIT_MAX_BYTES", int),
+            rotate_interval=number("FOUNDRY_AUDIT_ROTATE_SECONDS"),
+            compress=os.getenv("FOUNDRY_AUDIT_COMPRESS", "0").lower() in {"1", "true", "yes"},
+            backup_count=number("FOUNDRY_AUDIT_BACKUP_COUNT", int),
+        )
+
+    @staticmethod
+    def _line(service: str, snapshot_id: str | None, status: str, details: dict[str, Any] | None) -> str:
         entry = {
             "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
             "service": service,
@@ -24,5 +99,127 @@ class AuditLogger:
         }
         if details:
             entry["details"] = details
-        with self.path.open("a", encoding="utf-8") as handle:
-            handle.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        return json.dumps(entry, ensure_ascii=False) + "\n"
+
+    def log(self, *, service: str, snapshot_id: str | None, status: str, details: dict[str, Any] | None = None) -> None:
+        self._submit([self._line(service, snapshot_id, status, details)])
+
+    def log_many(self, *, service: str, entries: Iterable[dict[str, Any]]) -> None:
+        """Append several entries (``snapshot_id``/``status``/``details`` dicts) with one write."""
+
+        self._submit(
+            [
+                self._line(service, entry.get("snapshot_id"), entry["status"], entry.get("details"))
+                for entry in entries
+            ]
+        )
+
+    def _submit(self, lines: list[str]) -> None:
+        if not lines:
+            return
+        if self._flusher is None or self._closed:
+            self._write(lines)
+            return
+        with self._buffer_lock:
+            self._buffer.extend(lines)
+            full = len(self._buffer) >= self.max_buffer
+        if full:
+            self._wakeup.set()
+
+    # writing ----------------------------------------------------------------
+    def flush(self) -> None:
+        """Write buffered entries now."""
+
+        with self._buffer_lock:
+            lines, self._buffer = self._buffer, []
+        if not lines:
+            return
+        try:
+            self._write(lines)
+        except BaseException:
+            # Put the batch back ahead of anything logged meanwhile so the
+            # next flush retries it in order.
+            with self._buffer_lock:
+                self._buffer[:0] = lines
+            raise
+
+    def _run(self) -> None:
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except OSError:  # pragma: no cover - keep buffering; retried next tick
+                pass
+
+    def _write(self, lines: list[str]) -> None:
+        with self._write_lock:
+            if self._handle is not None and self.rotate_interval is not None:
+                if time.time() - self._opened_at >= self.rotate_interval:
+                    self._rotate()
+            if self._handle is not None and self._moved():
+                self._handle.close()
+                self._handle = None
+            if self._handle is None:
+                self._handle = self.path.open("a", encoding="utf-8")
+                self._opened_at = time.time()
+            self._handle.write("".join(lines))
+            self._handle.flush()
+            if self.fsync == "batch":
+                os.fsync(self._handle.fileno())
+            if self.max_bytes is not None and self._handle.tell() >= self.max_bytes:
+                self._rotate()
+
+    def _moved(self) -> bool:
+        """Whether ``path`` no longer names the open file."""
+
+        try:
+            current = os.stat(self.path)
+        except FileNotFoundError:
+            return True
+        opened = os.fstat(self._handle.fileno())  # type: ignore[union-attr]
+        return (current.st_dev, current.st_ino) != (opened.st_dev, opened.st_ino)
+
+    # rotation ---------------------------------------------------------------
+    def _rotate(self) -> None:
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+        if not self.path.exists() or self.path.stat().st_size == 0:
+            return
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        target = self.path.with_name(f"{self.path.name}.{stamp}")
+        suffix = 1
+        while target.exists() or target.with_name(target.name + ".gz").exists():
+            target = self.path.with_name(f"{self.path.name}.{stamp}-{suffix}")
+            suffix += 1
+        os.replace(self.path, target)
+        if self.compress:
+            with target.open("rb") as source, gzip.open(target.with_name(target.name + ".gz"), "wb") as sink:
+                shutil.copyfileobj(source, sink)
+            target.unlink()
+        if self.backup_count is not None:
+            rotated = sorted(self.path.parent.glob(f"{self.path.name}.*"))
+            for old in rotated[: max(0, len(rotated) - self.backup_count)]:
+                old.unlink()
+
+    def rotated_files(self) -> list[Path]:
+        return sorted(self.path.parent.glob(f"{self.path.name}.*"))
+
+    def close(self) -> None:
+        """Stop the flusher and write everything still buffered."""
+
+        if self._closed:
+            return
+        self._closed = True
+        if self._flusher is not None:
+            self._wakeup.set()
+            self._flusher.join()
+            atexit.unregister(self.close)
+        self.flush()
+        with self._write_lock:
+            if self._handle is not None:
+                if self.fsync == "batch":
+                    os.fsync(self._handle.fileno())
+                self._handle.close()
+                self._handle = None
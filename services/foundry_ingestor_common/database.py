@@ -3,19 +3,40 @@
 from __future__ import annotations
 
 import json
+import logging
+import os
+import queue
 import sqlite3
+import threading
+from contextlib import contextmanager
 from dataclasses import dataclass
-from datetime import datetime
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Type, TypeVar
+from typing import Any, Iterable, Iterator, Type, TypeVar
 from urllib.parse import urlparse
 
 from .models import Device, NetworkSegment, Site, Snapshot
+from .payloads import SnapshotPayloadStore
 from .query import Result, SelectQuery
 
 T = TypeVar("T")
 
+logger = logging.getLogger(__name__)
+
 DEFAULT_DATABASE_URL = "sqlite:///./foundry_ingestor.db"
+DEFAULT_POOL_SIZE = int(os.getenv("FOUNDRY_DB_POOL_SIZE", "4"))
+
+# Applied once when a pooled connection is opened. WAL lets readers run
+# alongside the writer and, with synchronous=NORMAL, only fsyncs at
+# checkpoints instead of on every commit.
+DEFAULT_PRAGMAS: dict[str, Any] = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "foreign_keys": "ON",
+    "busy_timeout": 5000,
+    "cache_size": -16384,  # KiB, i.e. 16 MiB per connection
+    "mmap_size": 256 * 1024 * 1024,
+}
 
 
 @dataclass(frozen=True)
@@ -66,7 +87,8 @@ def initialize_database(engine: Engine) -> None:
                 description TEXT,
                 metadata TEXT NOT NULL,
                 created_at TEXT NOT NULL,
-                updated_at TEXT NOT NULL
+                updated_at TEXT NOT NULL,
+                content_hash TEXT
             );
 
             CREATE TABLE IF NOT EXISTS network_segments (
@@ -78,6 +100,7 @@ def initialize_database(engine: Engine) -> None:
                 metadata TEXT NOT NULL,
                 created_at TEXT NOT NULL,
                 updated_at TEXT NOT NULL,
+                content_hash TEXT,
                 UNIQUE(site_id, code),
                 FOREIGN KEY(site_id) REFERENCES sites(id) ON DELETE CASCADE
             );
@@ -93,6 +116,7 @@ def initialize_database(engine: Engine) -> None:
                 metadata TEXT NOT NULL,
                 created_at TEXT NOT NULL,
                 updated_at TEXT NOT NULL,
+                content_hash TEXT,
                 UNIQUE(site_id, code),
                 FOREIGN KEY(site_id) REFERENCES sites(id) ON DELETE CASCADE,
                 FOREIGN KEY(segment_id) REFERENCES network_segments(id) ON DELETE SET NULL
@@ -108,35 +132,281 @@ def initialize_database(engine: Engine) -> None:
                 collected_at TEXT,
                 ingested_at TEXT NOT NULL,
                 payload TEXT NOT NULL,
+                payload_encoding TEXT,
+                payload_blob BLOB,
+                base_id TEXT,
+                chain_length INTEGER,
                 UNIQUE(source, external_id),
                 FOREIGN KEY(site_id) REFERENCES sites(id)
             );
+
+            CREATE TABLE IF NOT EXISTS event_outbox (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                message_id TEXT UNIQUE NOT NULL,
+                subject TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                sent_at TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT
+            );
+
+            CREATE INDEX IF NOT EXISTS ix_event_outbox_pending
+                ON event_outbox (seq) WHERE sent_at IS NULL;
+
+            CREATE TABLE IF NOT EXISTS event_outbox_dead (
+                seq INTEGER PRIMARY KEY,
+                message_id TEXT UNIQUE NOT NULL,
+                subject TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                attempts INTEGER NOT NULL,
+                last_error TEXT,
+                dead_at TEXT NOT NULL
+            );
             """
         )
+        _migrate_columns(cursor)
+        _migrate_indexes(cursor)
         connection.commit()
 
 
+# Columns added after the first release, applied to existing databases.
+# Old rows keep NULLs: models without a content hash are hashed from their
+# current fields, and snapshots without an encoding are plain JSON.
+_ADDED_COLUMNS: dict[str, tuple[tuple[str, str], ...]] = {
+    "sites": (("content_hash", "TEXT"),),
+    "network_segments": (("content_hash", "TEXT"),),
+    "devices": (("content_hash", "TEXT"),),
+    "snapshots": (
+        ("payload_encoding", "TEXT"),
+        ("payload_blob", "BLOB"),
+        ("base_id", "TEXT"),
+        ("chain_length", "INTEGER"),
+    ),
+}
+
+
+# Secondary indexes for the query layer and the ingest lookups; created with
+# IF NOT EXISTS so existing databases pick them up on the next start. ``id``
+# trails the snapshot indexes because keyset pagination orders by it last.
+_INDEXES: tuple[tuple[str, str, str], ...] = (
+    ("ix_snapshots_site_version", "snapshots", "site_id, version, id"),
+    ("ix_devices_site_segment", "devices", "site_id, segment_id"),
+    ("ix_devices_segment", "devices", "segment_id"),
+    ("ix_event_outbox_sent", "event_outbox", "sent_at"),
+)
+
+
+# Invariants the ingest path relies on. Two snapshots of one source/site can
+# never share a version, so a version-allocation race fails the insert instead
+# of silently duplicating the version. Being unique, the index also serves
+# keyset pagination by (version, id) without a sort, so it replaces the plain
+# index it names in the last field once created.
+_UNIQUE_INDEXES: tuple[tuple[str, str, str, str], ...] = (
+    ("ux_snapshots_source_site_version", "snapshots", "source, site_id, version", "ix_snapshots_source_site_version"),
+)
+
+
+def _migrate_indexes(cursor: sqlite3.Cursor) -> None:
+    for name, table, columns in _INDEXES:
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})")
+    for name, table, columns, replaces in _UNIQUE_INDEXES:
+        try:
+            cursor.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {name} ON {table} ({columns})")
+        except sqlite3.IntegrityError:
+            # Rows written before the constraint existed already violate it;
+            # keep serving (and the old index), but make the damage visible.
+            logger.error("Cannot create %s: %s has duplicate (%s) rows", name, table, columns)
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {replaces} ON {table} ({columns}, id)")
+        else:
+            cursor.execute(f"DROP INDEX IF EXISTS {replaces}")
+
+
+def _migrate_columns(cursor: sqlite3.Cursor) -> None:
+    for table, added in _ADDED_COLUMNS.items():
+        columns = {row[1] for row in cursor.execute(f"PRAGMA table_info({table})")}
+        for name, kind in added:
+            if name not in columns:
+                cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {kind}")
+
+
+def _segment_row(segment: NetworkSegment) -> tuple[Any, ...]:
+    return (
+        segment.id,
+        segment.site_id,
+        segment.code,
+        segment.name,
+        segment.cidr,
+        json.dumps(segment.metadata_),
+        segment.created_at.isoformat(),
+        segment.updated_at.isoformat(),
+        segment.content_hash,
+    )
+
+
+def _device_row(device: Device) -> tuple[Any, ...]:
+    return (
+        device.id,
+        device.site_id,
+        device.segment_id,
+        device.code,
+        device.hostname,
+        device.ip_address,
+        device.device_type,
+        json.dumps(device.metadata_),
+        device.created_at.isoformat(),
+        device.updated_at.isoformat(),
+        device.content_hash,
+    )
+
+
+class ConnectionPool:
+    """Bounded pool of configured SQLite connections.
+
+    Connections are opened lazily up to ``size`` and handed out most recently
+    used first; :meth:`acquire` blocks for up to ``timeout`` seconds when all
+    of them are checked out.
+    """
+
+    def __init__(
+        self,
+        engine: Engine,
+        *,
+        size: int = DEFAULT_POOL_SIZE,
+        timeout: float = 30.0,
+        pragmas: dict[str, Any] | None = None,
+    ):
+        if size < 1:
+            raise ValueError("Connection pool size must be at least 1")
+        self._engine = engine
+        self._size = size
+        self._timeout = timeout
+        self._pragmas = DEFAULT_PRAGMAS if pragmas is None else pragmas
+        self._idle: queue.LifoQueue[sqlite3.Connection] = queue.LifoQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
+        self._closed = False
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @property
+    def opened(self) -> int:
+        return self._opened
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(str(self._engine.path), check_same_thread=False)
+        for name, value in self._pragmas.items():
+            connection.execute(f"PRAGMA {name} = {value}")
+        return connection
+
+    def acquire(self) -> sqlite3.Connection:
+        if self._closed:
+            raise RuntimeError("Connection pool is closed")
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            grow = self._opened < self._size
+            if grow:
+                self._opened += 1
+        if grow:
+            try:
+                return self._connect()
+            except Exception:
+                with self._lock:
+                    self._opened -= 1
+                raise
+        try:
+            return self._idle.get(timeout=self._timeout)
+        except queue.Empty as exc:
+            raise TimeoutError(
+                f"No SQLite connection available after {self._timeout:.1f}s (pool size {self._size})"
+            ) from exc
+
+    def release(self, connection: sqlite3.Connection) -> None:
+        # Never hand an open transaction or a caller's hooks to the next session.
+        try:
+            if connection.in_transaction:
+                connection.rollback()
+            connection.set_trace_callback(None)
+            connection.row_factory = None
+        except sqlite3.Error:
+            self._discard(connection)
+            return
+        if self._closed:
+            self._discard(connection)
+        else:
+            self._idle.put(connection)
+
+    def _discard(self, connection: sqlite3.Connection) -> None:
+        connection.close()
+        with self._lock:
+            self._opened -= 1
+
+    def close(self) -> None:
+        self._closed = True
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                return
+
+
 class SessionFactory:
-    """Callable factory that produces :class:`Session` instances."""
+    """Callable factory that produces :class:`Session` instances.
+
+    With ``pool_size`` set (the default) sessions borrow connections from a
+    shared :class:`ConnectionPool`; ``pool_size=0`` opens a fresh connection
+    per session.
+    """
 
-    def __init__(self, engine: Engine):
+    def __init__(
+        self,
+        engine: Engine,
+        *,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        payload_store: SnapshotPayloadStore | None = None,
+        **pool_options: Any,
+    ):
         self._engine = engine
+        self.pool = ConnectionPool(engine, size=pool_size, **pool_options) if pool_size else None
+        # Shared so reconstructed snapshot payloads are cached across sessions.
+        self.payload_store = payload_store or SnapshotPayloadStore()
 
     def __call__(self) -> "Session":
-        return Session(self._engine)
+        return Session(self._engine, pool=self.pool, payload_store=self.payload_store)
+
+    def close(self) -> None:
+        if self.pool is not None:
+            self.pool.close()
 
 
-def create_session_factory(engine: Engine) -> SessionFactory:
-    return SessionFactory(engine)
+def create_session_factory(engine: Engine, **options: Any) -> SessionFactory:
+    return SessionFactory(engine, **options)
 
 
 class Session:
     """Minimal session wrapper around sqlite3."""
 
-    def __init__(self, engine: Engine):
-        self._conn = sqlite3.connect(str(engine.path), check_same_thread=False)
+    def __init__(
+        self,
+        engine: Engine,
+        pool: ConnectionPool | None = None,
+        payload_store: SnapshotPayloadStore | None = None,
+    ):
+        self._pool = pool
+        self._payloads = payload_store or SnapshotPayloadStore()
+        if pool is not None:
+            self._conn = pool.acquire()
+        else:
+            self._conn = sqlite3.connect(str(engine.path), check_same_thread=False)
+            self._conn.execute("PRAGMA foreign_keys = ON")
         self._conn.row_factory = sqlite3.Row
-        self._conn.execute("PRAGMA foreign_keys = ON")
+        self._columns: dict[str, tuple[frozenset[str], frozenset[str]]] = {}
 
     def __enter__(self) -> "Session":  # pragma: no cover - exercised indirectly
         return self
@@ -150,14 +420,63 @@ class Session:
     def rollback(self) -> None:  # pragma: no cover - defensive
         self._conn.rollback()
 
+    def begin(self) -> None:
+        """Open a write transaction (``BEGIN IMMEDIATE``) unless one is open.
+
+        Taking the write lock before the first read makes read-then-write
+        sequences, like allocating the next snapshot version, atomic with
+        respect to other connections.
+        """
+
+        if not self._conn.in_transaction:
+            self._conn.execute("BEGIN IMMEDIATE")
+
+    @contextmanager
+    def savepoint(self, name: str = "unit") -> Iterator[None]:
+        """Undo the block's writes if it raises, keeping the outer transaction open."""
+
+        # A SAVEPOINT outside a transaction would commit on RELEASE, so make
+        # sure one is open first.
+        self.begin()
+        self._conn.execute(f"SAVEPOINT {name}")
+        try:
+            yield
+        except BaseException:
+            self._conn.execute(f"ROLLBACK TO {name}")
+            self._conn.execute(f"RELEASE {name}")
+            raise
+        self._conn.execute(f"RELEASE {name}")
+
     def close(self) -> None:
-        self._conn.close()
+        if self._pool is not None:
+            self._pool.release(self._conn)
+            self._pool = None
+        elif self._conn is not None:
+            self._conn.close()
+        self._conn = None  # type: ignore[assignment]
+
+    def _table_columns(self, table: str) -> tuple[frozenset[str], frozenset[str]]:
+        """Return the table's ``(columns, nullable columns)``."""
+
+        columns = self._columns.get(table)
+        if columns is None:
+            info = self._conn.execute(f"PRAGMA table_info({table})").fetchall()
+            columns = (
+                frozenset(row[1] for row in info),
+                frozenset(row[1] for row in info if not row[3] and not row[5]),
+            )
+            self._columns[table] = columns
+        return columns
 
     def execute(self, query: SelectQuery[T]) -> Result[T]:
         table = query.model.table_name
-        rows = self._conn.execute(f"SELECT * FROM {table}").fetchall()
+        sql, params = query.compile(*self._table_columns(table))
+        rows = self._conn.execute(sql, params).fetchall()
         objects = [self._deserialize(query.model, row) for row in rows]
-        return Result(objects)
+        next_cursor = None
+        if query.limit_ is not None and len(rows) == query.limit_:
+            next_cursor = tuple(rows[-1][key] for key in query.key_columns)
+        return Result(objects, next_cursor=next_cursor)
 
     # CRUD helpers used by the ingestion logic --------------------------------
     def get_site_by_code(self, code: str) -> Site | None:
@@ -171,10 +490,12 @@ class Session:
             description=payload.get("description"),
             metadata_=payload.get("metadata", {}),
         )
+        site.content_hash = site.compute_content_hash()
         self._conn.execute(
             """
-            INSERT INTO sites (id, code, name, description, metadata, created_at, updated_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
+            INSERT INTO sites (
+                id, code, name, description, metadata, created_at, updated_at, content_hash
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
             """,
             (
                 site.id,
@@ -184,6 +505,7 @@ class Session:
                 json.dumps(site.metadata_),
                 site.created_at.isoformat(),
                 site.updated_at.isoformat(),
+                site.content_hash,
             ),
         )
         return site
@@ -191,7 +513,8 @@ class Session:
     def update_site(self, site: Site) -> None:
         self._conn.execute(
             """
-            UPDATE sites SET name = ?, description = ?, metadata = ?, updated_at = ?
+            UPDATE sites
+            SET name = ?, description = ?, metadata = ?, updated_at = ?, content_hash = ?
             WHERE id = ?
             """,
             (
@@ -199,6 +522,7 @@ class Session:
                 site.description,
                 json.dumps(site.metadata_),
                 site.updated_at.isoformat(),
+                site.content_hash,
                 site.id,
             ),
         )
@@ -211,37 +535,50 @@ class Session:
         return self._deserialize(NetworkSegment, row) if row else None
 
     def create_segment(self, site_id: str, payload: dict[str, Any]) -> NetworkSegment:
-        segment = NetworkSegment(
-            site_id=site_id,
-            code=payload["code"],
-            name=payload["name"],
-            cidr=payload.get("cidr"),
-            metadata_=payload.get("metadata", {}),
-        )
+        segment = NetworkSegment.from_payload(site_id, payload)
         self._conn.execute(
             """
             INSERT INTO network_segments (
-                id, site_id, code, name, cidr, metadata, created_at, updated_at
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                id, site_id, code, name, cidr, metadata, created_at, updated_at,
+                content_hash
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
             """,
-            (
-                segment.id,
-                segment.site_id,
-                segment.code,
-                segment.name,
-                segment.cidr,
-                json.dumps(segment.metadata_),
-                segment.created_at.isoformat(),
-                segment.updated_at.isoformat(),
-            ),
+            _segment_row(segment),
         )
         return segment
 
+    def get_segments_by_code(self, site_id: str) -> dict[str, NetworkSegment]:
+        """Load every segment of ``site_id`` in one query, keyed by code."""
+
+        rows = self._conn.execute(
+            "SELECT * FROM network_segments WHERE site_id = ?", (site_id,)
+        ).fetchall()
+        return {row["code"]: self._deserialize(NetworkSegment, row) for row in rows}
+
+    def upsert_segments(self, segments: Iterable[NetworkSegment]) -> None:
+        """Insert or update ``segments`` with a single ``executemany``."""
+
+        self._conn.executemany(
+            """
+            INSERT INTO network_segments (
+                id, site_id, code, name, cidr, metadata, created_at, updated_at,
+                content_hash
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(site_id, code) DO UPDATE SET
+                name = excluded.name,
+                cidr = excluded.cidr,
+                metadata = excluded.metadata,
+                updated_at = excluded.updated_at,
+                content_hash = excluded.content_hash
+            """,
+            [_segment_row(segment) for segment in segments],
+        )
+
     def update_segment(self, segment: NetworkSegment) -> None:
         self._conn.execute(
             """
             UPDATE network_segments
-            SET name = ?, cidr = ?, metadata = ?, updated_at = ?
+            SET name = ?, cidr = ?, metadata = ?, updated_at = ?, content_hash = ?
             WHERE id = ?
             """,
             (
@@ -249,6 +586,7 @@ class Session:
                 segment.cidr,
                 json.dumps(segment.metadata_),
                 segment.updated_at.isoformat(),
+                segment.content_hash,
                 segment.id,
             ),
         )
@@ -261,43 +599,51 @@ class Session:
         return self._deserialize(Device, row) if row else None
 
     def create_device(self, site_id: str, payload: dict[str, Any], segment_id: str | None) -> Device:
-        device = Device(
-            site_id=site_id,
-            segment_id=segment_id,
-            code=payload["code"],
-            hostname=payload["hostname"],
-            ip_address=payload.get("ip_address"),
-            device_type=payload.get("device_type"),
-            metadata_=payload.get("metadata", {}),
-        )
+        device = Device.from_payload(site_id, payload, segment_id)
         self._conn.execute(
             """
             INSERT INTO devices (
                 id, site_id, segment_id, code, hostname, ip_address, device_type,
-                metadata, created_at, updated_at
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                metadata, created_at, updated_at, content_hash
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             """,
-            (
-                device.id,
-                device.site_id,
-                device.segment_id,
-                device.code,
-                device.hostname,
-                device.ip_address,
-                device.device_type,
-                json.dumps(device.metadata_),
-                device.created_at.isoformat(),
-                device.updated_at.isoformat(),
-            ),
+            _device_row(device),
         )
         return device
 
+    def get_devices_by_code(self, site_id: str) -> dict[str, Device]:
+        """Load every device of ``site_id`` in one query, keyed by code."""
+
+        rows = self._conn.execute("SELECT * FROM devices WHERE site_id = ?", (site_id,)).fetchall()
+        return {row["code"]: self._deserialize(Device, row) for row in rows}
+
+    def upsert_devices(self, devices: Iterable[Device]) -> None:
+        """Insert or update ``devices`` with a single ``executemany``."""
+
+        self._conn.executemany(
+            """
+            INSERT INTO devices (
+                id, site_id, segment_id, code, hostname, ip_address, device_type,
+                metadata, created_at, updated_at, content_hash
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(site_id, code) DO UPDATE SET
+                segment_id = excluded.segment_id,
+                hostname = excluded.hostname,
+                ip_address = excluded.ip_address,
+                device_type = excluded.device_type,
+                metadata = excluded.metadata,
+                updated_at = excluded.updated_at,
+                content_hash = excluded.content_hash
+            """,
+            [_device_row(device) for device in devices],
+        )
+
     def update_device(self, device: Device) -> None:
         self._conn.execute(
             """
             UPDATE devices
             SET segment_id = ?, hostname = ?, ip_address = ?, device_type = ?,
-                metadata = ?, updated_at = ?
+                metadata = ?, updated_at = ?, content_hash = ?
             WHERE id = ?
             """,
             (
@@ -307,10 +653,91 @@ class Session:
                 device.device_type,
                 json.dumps(device.metadata_),
                 device.updated_at.isoformat(),
+                device.content_hash,
                 device.id,
             ),
         )
 
+    # Transactional outbox ----------------------------------------------------
+    def add_outbox_events(self, events: Iterable[tuple[str, str, dict[str, Any]]]) -> None:
+        """Queue ``(message_id, subject, payload)`` events in the current transaction.
+
+        ``message_id`` is unique: re-adding an event is a no-op, and brokers
+        that deduplicate (JetStream's ``Nats-Msg-Id``) use it too.
+        """
+
+        now = datetime.now(timezone.utc).isoformat()
+        self._conn.executemany(
+            """
+            INSERT INTO event_outbox (message_id, subject, payload, created_at)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(message_id) DO NOTHING
+            """,
+            [(message_id, subject, json.dumps(payload), now) for message_id, subject, payload in events],
+        )
+
+    def pending_outbox_events(self, limit: int) -> list[dict[str, Any]]:
+        rows = self._conn.execute(
+            """
+            SELECT seq, message_id, subject, payload FROM event_outbox
+            WHERE sent_at IS NULL ORDER BY seq LIMIT ?
+            """,
+            (limit,),
+        ).fetchall()
+        return [{**dict(row), "payload": json.loads(row["payload"])} for row in rows]
+
+    def mark_outbox_sent(self, seqs: Iterable[int]) -> None:
+        now = datetime.now(timezone.utc).isoformat()
+        self._conn.executemany(
+            "UPDATE event_outbox SET sent_at = ?, attempts = attempts + 1, last_error = NULL WHERE seq = ?",
+            [(now, seq) for seq in seqs],
+        )
+
+    def mark_outbox_failed(self, seqs: Iterable[int], error: str, max_attempts: int | None = None) -> int:
+        """Count a rejected delivery of each event in ``seqs``.
+
+        Events that reach ``max_attempts`` move to ``event_outbox_dead`` so
+        they stop blocking the ones behind them; returns how many moved.
+        """
+
+        seqs = list(seqs)
+        self._conn.executemany(
+            "UPDATE event_outbox SET attempts = attempts + 1, last_error = ? WHERE seq = ?",
+            [(error, seq) for seq in seqs],
+        )
+        if max_attempts is None or not seqs:
+            return 0
+        placeholders = ", ".join("?" * len(seqs))
+        self._conn.execute(
+            f"""
+            INSERT INTO event_outbox_dead (
+                seq, message_id, subject, payload, created_at, attempts, last_error, dead_at
+            )
+            SELECT seq, message_id, subject, payload, created_at, attempts, last_error, ?
+            FROM event_outbox WHERE seq IN ({placeholders}) AND attempts >= ?
+            """,
+            (datetime.now(timezone.utc).isoformat(), *seqs, max_attempts),
+        )
+        cursor = self._conn.execute(
+            f"DELETE FROM event_outbox WHERE seq IN ({placeholders}) AND attempts >= ?", (*seqs, max_attempts)
+        )
+        return cursor.rowcount
+
+    def note_outbox_error(self, seqs: Iterable[int], error: str) -> None:
+        """Record why delivery failed without counting it against the events
+        (the broker was unreachable, not rejecting them)."""
+
+        self._conn.executemany(
+            "UPDATE event_outbox SET last_error = ? WHERE seq = ?", [(error, seq) for seq in seqs]
+        )
+
+    def purge_outbox(self, sent_before: datetime) -> int:
+        cursor = self._conn.execute(
+            "DELETE FROM event_outbox WHERE sent_at IS NOT NULL AND sent_at < ?",
+            (sent_before.isoformat(),),
+        )
+        return cursor.rowcount
+
     def get_snapshot(self, service: str, snapshot_id: str) -> Snapshot | None:
         row = self._conn.execute(
             "SELECT * FROM snapshots WHERE source = ? AND external_id = ?",
@@ -344,12 +771,22 @@ class Session:
             collected_at=collected_at,
             payload=payload,
         )
+        previous = self._conn.execute(
+            """
+            SELECT id, chain_length FROM snapshots
+            WHERE source = ? AND site_id = ? ORDER BY version DESC LIMIT 1
+            """,
+            (service, site_id),
+        ).fetchone()
+        encoding, blob, base_id, chain_length, keyframe = self._payloads.encode(
+            self._conn, payload, previous, (service, site_id)
+        )
         self._conn.execute(
             """
             INSERT INTO snapshots (
                 id, external_id, source, category, version, site_id, collected_at,
-                ingested_at, payload
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ingested_at, payload, payload_encoding, payload_blob, base_id, chain_length
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, '', ?, ?, ?, ?)
             """,
             (
                 snapshot.id,
@@ -360,9 +797,13 @@ class Session:
                 snapshot.site_id,
                 snapshot.collected_at.isoformat() if snapshot.collected_at else None,
                 snapshot.ingested_at.isoformat(),
-                json.dumps(snapshot.payload),
+                encoding,
+                blob,
+                base_id,
+                chain_length,
             ),
         )
+        self._payloads.written(snapshot.id, keyframe, (service, site_id))
         return snapshot
 
     def _deserialize(self, model: Type[T], row: sqlite3.Row | None) -> T:
@@ -373,5 +814,5 @@ class Session:
             raw = data["metadata"]
             data["metadata"] = json.loads(raw) if raw else {}
         if "payload" in data:
-            data["payload"] = json.loads(data["payload"]) if data["payload"] else {}
+            data["payload"] = self._payloads.load(self._conn, row)
         return model.from_row(data)  # type: ignore[return-value]
@@ -4,7 +4,7 @@ from __future__ import annotations
 
 import asyncio
 import json
-from typing import Any, Optional
+from typing import Any, Iterable, Optional, Sequence
 
 
 class EventPublisher:
@@ -13,6 +13,22 @@ class EventPublisher:
     async def publish(self, subject: str, payload: dict[str, Any]) -> None:  # pragma: no cover - interface
         raise NotImplementedError
 
+    async def publish_many(
+        self,
+        messages: Iterable[tuple[str, dict[str, Any]]],
+        *,
+        message_ids: Sequence[str] | None = None,
+    ) -> None:
+        """Publish ``(subject, payload)`` pairs; brokers may batch them.
+
+        Raises if any message was not accepted, in which case the caller
+        retries the whole batch; ``message_ids`` let brokers that support it
+        drop the duplicates.
+        """
+
+        for subject, payload in messages:
+            await self.publish(subject, payload)
+
 
 class LoggingEventPublisher(EventPublisher):
     """Fallback publisher that just stores messages in memory for inspection."""
@@ -25,10 +41,16 @@ class LoggingEventPublisher(EventPublisher):
 
 
 class NATSPublisher(EventPublisher):
-    """Publish events to a NATS broker."""
+    """Publish events to a NATS broker.
+
+    With ``jetstream=True`` batches are published to JetStream concurrently
+    and each publish awaits its ack; ``message_ids`` become ``Nats-Msg-Id``
+    headers so a retried batch is deduplicated by the stream.
+    """
 
-    def __init__(self, servers: Optional[list[str]] = None) -> None:
+    def __init__(self, servers: Optional[list[str]] = None, *, jetstream: bool = False) -> None:
         self._servers = servers or ["nats://localhost:4222"]
+        self._jetstream = jetstream
         self._client = None
         self._lock = asyncio.Lock()
 
@@ -46,3 +68,32 @@ class NATSPublisher(EventPublisher):
         client = await self._get_client()
         data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
         await client.publish(subject, data)
+
+    async def publish_many(
+        self,
+        messages: Iterable[tuple[str, dict[str, Any]]],
+        *,
+        message_ids: Sequence[str] | None = None,
+    ) -> None:
+        client = await self._get_client()
+        encoded = [
+            (subject, json.dumps(payload, ensure_ascii=False).encode("utf-8")) for subject, payload in messages
+        ]
+        if not self._jetstream:
+            # Core NATS publishes are buffered by the client; flush once per batch.
+            for subject, data in encoded:
+                await client.publish(subject, data)
+            await client.flush()
+            return
+
+        js = client.jetstream()
+        acks = await asyncio.gather(
+            *(
+                js.publish(subject, data, headers={"Nats-Msg-Id": message_ids[index]} if message_ids else None)
+                for index, (subject, data) in enumerate(encoded)
+            ),
+            return_exceptions=True,
+        )
+        for ack in acks:
+            if isinstance(ack, BaseException):
+                raise ack
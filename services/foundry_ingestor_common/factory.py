@@ -2,22 +2,32 @@
 
 from __future__ import annotations
 
+import asyncio
 import json
 import os
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Any, Iterable, Optional
+from typing import Any, AsyncIterator, Iterable, Optional
 
-from fastapi import Depends, FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
 from fastapi.responses import JSONResponse
 
 from .audit import AuditLogger
 from .database import Session, create_db_engine, create_session_factory, initialize_database
 from .events import EventPublisher, LoggingEventPublisher
 from .ingest import ingest_snapshot
+from .jobs import FAILED, SyncJob, SyncQueue, SyncWorkerPool
+from .models import Snapshot
+from .outbox import OutboxRelay
 from .validation import SnapshotValidator, ValidationError
 
 DEFAULT_AUDIT_DIR = Path(os.getenv("FOUNDRY_AUDIT_DIR", "audits"))
 DEFAULT_EVENT_SUBJECT = "snapshot.synced"
+DEFAULT_ASYNC_INGEST = os.getenv("FOUNDRY_ASYNC_INGEST", "0").lower() in {"1", "true", "yes"}
+DEFAULT_INGEST_WORKERS = int(os.getenv("FOUNDRY_INGEST_WORKERS", "4"))
+DEFAULT_BULK_BATCH_SIZE = int(os.getenv("FOUNDRY_BULK_BATCH_SIZE", "200"))
+DEFAULT_BULK_MAX_LINE_BYTES = int(os.getenv("FOUNDRY_BULK_MAX_LINE_BYTES", str(16 * 1024 * 1024)))
+DEFAULT_OUTBOX_BATCH_SIZE = int(os.getenv("FOUNDRY_OUTBOX_BATCH_SIZE", "500"))
 
 
 def load_schema(path: str | Path) -> dict[str, Any]:
@@ -34,27 +44,53 @@ def create_ingestor_app(
     database_url: str | None = None,
     audit_log_path: Path | None = None,
     event_publisher: EventPublisher | None = None,
+    async_ingest: bool | None = None,
+    queue_path: Path | None = None,
+    ingest_workers: int | None = None,
+    bulk_max_line_bytes: int | None = None,
 ) -> FastAPI:
-    """Create and configure a FastAPI application for ingestion."""
+    """Create and configure a FastAPI application for ingestion.
+
+    With ``async_ingest`` enabled ``/sync`` only validates the payload and
+    appends it to a durable :class:`SyncQueue`; a :class:`SyncWorkerPool`
+    ingests queued snapshots in the background (one at a time per site) and
+    ``GET /sync/{snapshot_id}`` reports their progress.
+    """
 
     schema = load_schema(schema_path)
     validator = SnapshotValidator(schema)
+    max_line_bytes = bulk_max_line_bytes or DEFAULT_BULK_MAX_LINE_BYTES
 
     engine = create_db_engine(database_url)
     initialize_database(engine)
     session_factory = create_session_factory(engine)
 
     audit_path = audit_log_path or DEFAULT_AUDIT_DIR / f"{service_name}.jsonl"
-    audit_logger = AuditLogger(audit_path)
+    audit_logger = AuditLogger.from_env(audit_path)
 
     publisher = event_publisher or LoggingEventPublisher()
     subjects = list(event_subjects or [DEFAULT_EVENT_SUBJECT, f"snapshot.{snapshot_category}.synced"])
 
-    app = FastAPI(title=service_name)
+    @asynccontextmanager
+    async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+        if worker_pool is not None:
+            await worker_pool.start()
+        await relay.start()
+        yield
+        if worker_pool is not None:
+            await worker_pool.stop()
+            sync_queue.close()
+        await relay.stop()
+        session_factory.close()
+        await asyncio.to_thread(audit_logger.close)
+
+    app = FastAPI(title=service_name, lifespan=lifespan)
     app.state.session_factory = session_factory
     app.state.validator = validator
     app.state.audit_logger = audit_logger
     app.state.publisher = publisher
+    relay = OutboxRelay(session_factory, publisher, batch_size=DEFAULT_OUTBOX_BATCH_SIZE)
+    app.state.outbox_relay = relay
     app.state.event_subjects = subjects
     app.state.service_name = service_name
     app.state.snapshot_category = snapshot_category
@@ -66,61 +102,269 @@ def create_ingestor_app(
         finally:
             session.close()
 
-    @app.get("/health")
-    async def health() -> dict[str, str]:
-        return {"status": "ok", "service": service_name}
+    def audit_failure(snapshot_id: str | None, exc: Exception) -> None:
+        audit_logger.log(
+            service=service_name,
+            snapshot_id=snapshot_id,
+            status="failed",
+            details={"error": str(exc)},
+        )
+
+    def audit_outcome(snapshot: Snapshot, created: bool) -> None:
+        audit_logger.log(
+            service=service_name,
+            snapshot_id=snapshot.external_id,
+            status="ingested" if created else "duplicate",
+            details={"version": snapshot.version},
+        )
 
-    @app.post("/sync", status_code=202)
-    async def sync_endpoint(payload: dict[str, Any], db: Session = Depends(get_db)) -> JSONResponse:
-        snapshot_id = payload.get("snapshot_id")
+    def record_synced(session: Session, snapshot: Snapshot) -> None:
+        """Queue the snapshot's events in the outbox, inside the ingest transaction."""
+
+        event_payload = {
+            "snapshot_id": snapshot.external_id,
+            "source": service_name,
+            "category": snapshot_category,
+            "version": snapshot.version,
+            "site_id": snapshot.site_id,
+        }
+        session.add_outbox_events(
+            (f"{service_name}:{snapshot.external_id}:{subject}", subject, event_payload) for subject in subjects
+        )
+
+    async def validate_or_422(payload: dict[str, Any]) -> None:
         try:
             validator.validate(payload)
         except ValidationError as exc:
-            audit_logger.log(
-                service=service_name,
-                snapshot_id=snapshot_id,
-                status="failed",
-                details={"error": str(exc)},
-            )
+            await asyncio.to_thread(audit_failure, payload.get("snapshot_id"), exc)
             raise HTTPException(status_code=422, detail=str(exc)) from exc
 
-        try:
-            snapshot, created = ingest_snapshot(
-                db,
-                service=service_name,
-                category=snapshot_category,
-                payload=payload,
+    @app.get("/health")
+    async def health() -> dict[str, str]:
+        return {"status": "ok", "service": service_name}
+
+    if async_ingest is None:
+        async_ingest = DEFAULT_ASYNC_INGEST
+    sync_queue: SyncQueue | None = None
+    worker_pool: SyncWorkerPool | None = None
+
+    if async_ingest:
+        sync_queue = SyncQueue(queue_path or engine.path.with_name(f"{engine.path.stem}.queue.db"))
+
+        def ingest_and_commit(payload: dict[str, Any]) -> tuple[Snapshot, bool]:
+            session = session_factory()
+            try:
+                snapshot, created = ingest_snapshot(
+                    session,
+                    service=service_name,
+                    category=snapshot_category,
+                    payload=payload,
+                )
+                if created:
+                    record_synced(session, snapshot)
+                session.commit()
+                return snapshot, created
+            finally:
+                session.close()
+
+        async def handle_job(job: SyncJob) -> None:
+            try:
+                snapshot, created = await asyncio.to_thread(ingest_and_commit, job.payload)
+            except ValueError as exc:
+                await asyncio.to_thread(audit_failure, job.snapshot_id, exc)
+                await asyncio.to_thread(sync_queue.finish, job.snapshot_id, FAILED, error=str(exc))
+                return
+            await asyncio.to_thread(audit_outcome, snapshot, created)
+            if created:
+                await relay.flush()
+            await asyncio.to_thread(
+                sync_queue.finish,
+                job.snapshot_id,
+                "ingested" if created else "duplicate",
+                version=snapshot.version,
             )
-        except ValueError as exc:
-            audit_logger.log(
-                service=service_name,
-                snapshot_id=snapshot_id,
-                status="failed",
-                details={"error": str(exc)},
+
+        worker_pool = SyncWorkerPool(
+            sync_queue, handle_job, workers=ingest_workers or DEFAULT_INGEST_WORKERS
+        )
+
+        @app.post("/sync", status_code=202)
+        async def enqueue_endpoint(payload: dict[str, Any]) -> JSONResponse:
+            await validate_or_422(payload)
+            job, _ = await asyncio.to_thread(sync_queue.enqueue, payload)
+            worker_pool.notify()
+            return JSONResponse(
+                {"status": job.status, "snapshot_id": job.snapshot_id, "version": job.version},
+                status_code=202,
             )
-            raise HTTPException(status_code=400, detail=str(exc)) from exc
 
-        db.commit()
+    else:
 
-        audit_logger.log(
+        @app.post("/sync", status_code=202)
+        async def sync_endpoint(payload: dict[str, Any], db: Session = Depends(get_db)) -> JSONResponse:
+            await validate_or_422(payload)
+
+            try:
+                snapshot, created = ingest_snapshot(
+                    db,
+                    service=service_name,
+                    category=snapshot_category,
+                    payload=payload,
+                )
+            except ValueError as exc:
+                await asyncio.to_thread(audit_failure, payload.get("snapshot_id"), exc)
+                raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+            if created:
+                record_synced(db, snapshot)
+            db.commit()
+            # The relay checks out its own connection; hand ours back first
+            # so a small pool can't deadlock on it.
+            db.close()
+
+            # Unbuffered audit writes (and rotation) block, so keep them off the loop.
+            await asyncio.to_thread(audit_outcome, snapshot, created)
+
+            if created:
+                await relay.flush()
+
+            return JSONResponse({"status": "accepted", "version": snapshot.version}, status_code=202)
+
+    def ingest_batch(lines: list[tuple[int, bytes | None]]) -> list[dict[str, Any]]:
+        """Validate and ingest NDJSON lines in one transaction.
+
+        Each snapshot runs in its own savepoint, so a bad one is reported as
+        failed without discarding the rest of the batch. ``None`` stands for
+        a line that was dropped for exceeding the size limit.
+        """
+
+        results: list[dict[str, Any]] = []
+        session = session_factory()
+        try:
+            for line_no, raw in lines:
+                snapshot_id = None
+                try:
+                    if raw is None:
+                        raise ValueError(f"line exceeds {max_line_bytes} bytes")
+                    payload = json.loads(raw)
+                    if not isinstance(payload, dict):
+                        raise ValidationError("payload must be a JSON object")
+                    snapshot_id = payload.get("snapshot_id")
+                    validator.validate(payload)
+                    with session.savepoint():
+                        snapshot, created = ingest_snapshot(
+                            session,
+                            service=service_name,
+                            category=snapshot_category,
+                            payload=payload,
+                        )
+                        if created:
+                            record_synced(session, snapshot)
+                except (ValueError, ValidationError) as exc:
+                    results.append(
+                        {"line": line_no, "snapshot_id": snapshot_id, "status": "failed", "error": str(exc)}
+                    )
+                    continue
+                results.append(
+                    {
+                        "line": line_no,
+                        "snapshot_id": snapshot.external_id,
+                        "status": "ingested" if created else "duplicate",
+                        "version": snapshot.version,
+                    }
+                )
+            session.commit()
+        finally:
+            session.close()
+        return results
+
+    def audit_results(results: list[dict[str, Any]]) -> None:
+        audit_logger.log_many(
             service=service_name,
-            snapshot_id=snapshot.external_id,
-            status="ingested" if created else "duplicate",
-            details={"version": snapshot.version},
+            entries=(
+                {
+                    "snapshot_id": result["snapshot_id"],
+                    "status": result["status"],
+                    "details": {"error": result["error"]}
+                    if result["status"] == "failed"
+                    else {"version": result["version"]},
+                }
+                for result in results
+            ),
         )
 
-        if created:
-            event_payload = {
-                "snapshot_id": snapshot.external_id,
-                "source": service_name,
-                "category": snapshot_category,
-                "version": snapshot.version,
-                "site_id": snapshot.site_id,
-            }
+    @app.post("/sync/bulk")
+    async def bulk_sync_endpoint(
+        request: Request,
+        batch_size: int = Query(DEFAULT_BULK_BATCH_SIZE, ge=1, le=10000),
+    ) -> dict[str, Any]:
+        """Ingest a streamed NDJSON body, one snapshot per line.
+
+        Lines are committed ``batch_size`` at a time together with their
+        outbox events; after each commit the batch's audit entries are
+        written and the outbox is relayed. Always ingests inline,
+        even in async mode, since backfills want the per-snapshot outcome.
+        Lines longer than ``bulk_max_line_bytes`` are discarded as they
+        stream in and reported as failed.
+        """
+
+        results: list[dict[str, Any]] = []
+        batch: list[tuple[int, bytes | None]] = []
+
+        async def flush() -> None:
+            batch_results = await asyncio.to_thread(ingest_batch, list(batch))
+            batch.clear()
+            await asyncio.to_thread(audit_results, batch_results)
+            await relay.flush()
+            results.extend(batch_results)
+
+        # Only the bytes of each new chunk are scanned for newlines, and a
+        # partial line is appended in place, so long lines stay linear.
+        buffer = bytearray()
+        scanned = 0
+        oversized = False  # discarding the rest of a line over the limit
+        line_no = 0
+        async for chunk in request.stream():
+            buffer += chunk
+            start = 0
+            while (end := buffer.find(b"\n", scanned)) >= 0:
+                line_no += 1
+                too_long = oversized or end - start > max_line_bytes
+                raw = None if too_long else bytes(buffer[start:end])
+                oversized = False
+                if raw is None or raw.strip():
+                    batch.append((line_no, raw))
+                    if len(batch) >= batch_size:
+                        await flush()
+                start = scanned = end + 1
+            del buffer[:start]
+            scanned = len(buffer)
+            if scanned > max_line_bytes:
+                oversized = True
+                buffer.clear()
+                scanned = 0
+        if oversized or buffer.strip():
+            batch.append((line_no + 1, None if oversized else bytes(buffer)))
+        if batch:
+            await flush()
+
+        counts = {"ingested": 0, "duplicate": 0, "failed": 0}
+        for result in results:
+            counts[result["status"]] += 1
+        return {"processed": len(results), **counts, "results": results}
 
-            for subject in subjects:
-                await publisher.publish(subject, event_payload)
+    app.state.sync_queue = sync_queue
+    app.state.worker_pool = worker_pool
 
-        return JSONResponse({"status": "accepted", "version": snapshot.version}, status_code=202)
+    @app.get("/sync/{snapshot_id}")
+    async def sync_status(snapshot_id: str, db: Session = Depends(get_db)) -> dict[str, Any]:
+        if sync_queue is not None:
+            job = await asyncio.to_thread(sync_queue.get, snapshot_id)
+            if job is not None:
+                return job.to_status()
+        snapshot = db.get_snapshot(service_name, snapshot_id)
+        if snapshot is None:
+            raise HTTPException(status_code=404, detail=f"Unknown snapshot '{snapshot_id}'")
+        return {"snapshot_id": snapshot_id, "status": "ingested", "version": snapshot.version}
 
     return app
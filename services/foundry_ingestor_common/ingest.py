@@ -6,7 +6,7 @@ from datetime import datetime
 from typing import Any
 
 from .database import Session
-from .models import NetworkSegment, Snapshot
+from .models import Device, NetworkSegment, Snapshot
 
 
 def _parse_datetime(value: str | None) -> datetime | None:
@@ -33,6 +33,10 @@ def ingest_snapshot(
 
     snapshot_id = payload["snapshot_id"]
 
+    # Hold the write lock from the first read: an unchanged site writes
+    # nothing before the version lookup, so a deferred transaction would let
+    # two concurrent ingests allocate the same version.
+    session.begin()
     existing = session.get_snapshot(service, snapshot_id)
     if existing:
         return existing, False
@@ -41,44 +45,50 @@ def ingest_snapshot(
     site = session.get_site_by_code(site_data["code"])
     if site is None:
         site = session.create_site(site_data)
-    else:
-        site.update_from_payload(site_data)
+    elif site.update_from_payload(site_data):
         session.update_site(site)
 
     segments_payload = {segment["code"]: segment for segment in payload.get("network_segments", [])}
 
-    segment_by_code: dict[str, NetworkSegment] = {}
+    # One query per table, then one executemany per table; the caller commits
+    # everything as a single transaction. Rows whose content hash is unchanged
+    # are left out of the upserts entirely.
+    segment_by_code = session.get_segments_by_code(site.id)
+    changed_segments: list[NetworkSegment] = []
     for code, segment_payload in segments_payload.items():
-        segment = session.get_segment(site.id, code)
+        segment = segment_by_code.get(code)
         if segment is None:
-            segment = session.create_segment(site.id, segment_payload)
-        else:
-            segment.update_from_payload(segment_payload)
-            session.update_segment(segment)
-        segment_by_code[code] = segment
-
-    devices_payload = payload.get("devices", [])
-    for device_payload in devices_payload:
+            segment = NetworkSegment.from_payload(site.id, segment_payload)
+            segment_by_code[code] = segment
+            changed_segments.append(segment)
+        elif segment.update_from_payload(segment_payload):
+            changed_segments.append(segment)
+    if changed_segments:
+        session.upsert_segments(changed_segments)
+
+    device_by_code = session.get_devices_by_code(site.id)
+    changed_devices: dict[str, Device] = {}
+    for device_payload in payload.get("devices", []):
         segment_code = device_payload.get("segment_code")
         segment_id = None
         if segment_code:
             segment = segment_by_code.get(segment_code)
             if segment is None:
-                segment = session.get_segment(site.id, segment_code)
-                if segment is None:
-                    raise ValueError(
-                        f"Segment code '{segment_code}' missing for device '{device_payload['code']}'"
-                    )
-                segment_by_code[segment_code] = segment
+                raise ValueError(
+                    f"Segment code '{segment_code}' missing for device '{device_payload['code']}'"
+                )
             segment_id = segment.id
 
-        device = session.get_device(site.id, device_payload["code"])
+        code = device_payload["code"]
+        device = device_by_code.get(code)
         if device is None:
-            session.create_device(site.id, device_payload, segment_id)
-        else:
-            device.segment_id = segment_id
-            device.update_from_payload(device_payload)
-            session.update_device(device)
+            device = Device.from_payload(site.id, device_payload, segment_id)
+            device_by_code[code] = device
+            changed_devices[code] = device
+        elif device.update_from_payload(device_payload, segment_id=segment_id):
+            changed_devices[code] = device
+    if changed_devices:
+        session.upsert_devices(changed_devices.values())
 
     collected_at = _parse_datetime(payload.get("collected_at"))
 
@@ -0,0 +1,319 @@
+"""Durable job queue and worker pool for asynchronous ``/sync`` ingestion."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Iterable
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+PROCESSING = "processing"
+FAILED = "failed"
+
+
+def _utcnow() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+@dataclass
+class SyncJob:
+    """A snapshot waiting for (or done with) background ingestion."""
+
+    seq: int
+    snapshot_id: str
+    site_code: str
+    payload: dict[str, Any] | None  # dropped once the job is finished
+    status: str
+    attempts: int
+    enqueued_at: str
+    updated_at: str
+    version: int | None = None
+    error: str | None = None
+
+    @classmethod
+    def from_row(cls, row: sqlite3.Row) -> "SyncJob":
+        data = dict(row)
+        data["payload"] = json.loads(data["payload"]) if data["payload"] else None
+        return cls(**data)
+
+    def to_status(self) -> dict[str, Any]:
+        status: dict[str, Any] = {
+            "snapshot_id": self.snapshot_id,
+            "status": self.status,
+            "enqueued_at": self.enqueued_at,
+            "updated_at": self.updated_at,
+            "attempts": self.attempts,
+        }
+        if self.version is not None:
+            status["version"] = self.version
+        if self.error:
+            status["error"] = self.error
+        return status
+
+
+class SyncQueue:
+    """SQLite-backed FIFO of sync jobs, kept in its own file.
+
+    A separate database keeps enqueues from waiting on ingestion transactions.
+    Jobs left ``processing`` by a crash are put back by :meth:`recover`;
+    re-running them is safe because ingestion is idempotent per snapshot id.
+    Finished jobs keep only their outcome (the payload is in the snapshot
+    store by then) until :meth:`purge` removes them.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS sync_jobs (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                snapshot_id TEXT UNIQUE NOT NULL,
+                site_code TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                enqueued_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL,
+                version INTEGER,
+                error TEXT
+            )
+            """
+        )
+        # Serves claim()'s per-site heads as well as the status counts.
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_sync_jobs_status_site ON sync_jobs(status, site_code, seq)"
+        )
+        self._conn.execute("DROP INDEX IF EXISTS ix_sync_jobs_status")
+        self._conn.commit()
+
+    def enqueue(self, payload: dict[str, Any]) -> tuple[SyncJob, bool]:
+        """Persist ``payload``; returns ``(job, created)``.
+
+        Re-posting a snapshot that is queued, running or done returns the
+        existing job; a failed one is queued again.
+        """
+
+        snapshot_id = payload["snapshot_id"]
+        now = _utcnow()
+        with self._lock, self._conn:
+            existing = self._get(snapshot_id)
+            if existing is not None and existing.status != FAILED:
+                return existing, False
+            self._conn.execute(
+                """
+                INSERT INTO sync_jobs (snapshot_id, site_code, payload, status, enqueued_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(snapshot_id) DO UPDATE SET
+                    site_code = excluded.site_code,
+                    payload = excluded.payload,
+                    status = excluded.status,
+                    updated_at = excluded.updated_at,
+                    error = NULL
+                """,
+                (snapshot_id, payload["site"]["code"], json.dumps(payload), QUEUED, now, now),
+            )
+            return self._get(snapshot_id), True  # type: ignore[return-value]
+
+    def _get(self, snapshot_id: str) -> SyncJob | None:
+        row = self._conn.execute("SELECT * FROM sync_jobs WHERE snapshot_id = ?", (snapshot_id,)).fetchone()
+        return SyncJob.from_row(row) if row else None
+
+    def get(self, snapshot_id: str) -> SyncJob | None:
+        with self._lock:
+            return self._get(snapshot_id)
+
+    def claim(self, busy_sites: Iterable[str], limit: int) -> list[SyncJob]:
+        """Mark up to ``limit`` jobs as processing: the oldest queued job of
+        each site that is not in ``busy_sites``."""
+
+        if limit <= 0:
+            return []
+        busy = sorted(set(busy_sites))
+        with self._lock, self._conn:
+            # Only the head of each site's queue is a candidate, and payloads
+            # are loaded for the claimed jobs alone, so a deep backlog costs
+            # one row per site here rather than every queued row.
+            heads = self._conn.execute(
+                f"""
+                SELECT MIN(seq) AS seq FROM sync_jobs
+                WHERE status = ? AND site_code NOT IN ({", ".join("?" * len(busy))})
+                GROUP BY site_code ORDER BY seq LIMIT ?
+                """,
+                (QUEUED, *busy, limit),
+            ).fetchall()
+            seqs = [row["seq"] for row in heads]
+            if not seqs:
+                return []
+            now = _utcnow()
+            self._conn.executemany(
+                "UPDATE sync_jobs SET status = ?, attempts = attempts + 1, updated_at = ? WHERE seq = ?",
+                [(PROCESSING, now, seq) for seq in seqs],
+            )
+            rows = self._conn.execute(
+                f"SELECT * FROM sync_jobs WHERE seq IN ({', '.join('?' * len(seqs))}) ORDER BY seq", seqs
+            ).fetchall()
+        return [SyncJob.from_row(row) for row in rows]
+
+    def finish(self, snapshot_id: str, status: str, *, version: int | None = None, error: str | None = None) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                UPDATE sync_jobs SET status = ?, version = ?, error = ?, updated_at = ?, payload = ''
+                WHERE snapshot_id = ?
+                """,
+                (status, version, error, _utcnow(), snapshot_id),
+            )
+
+    def purge(self, finished_before: datetime) -> int:
+        """Delete jobs that finished before ``finished_before``; returns how many."""
+
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "DELETE FROM sync_jobs WHERE status NOT IN (?, ?) AND updated_at < ?",
+                (QUEUED, PROCESSING, finished_before.isoformat()),
+            )
+            return cursor.rowcount
+
+    def recover(self) -> int:
+        """Requeue jobs interrupted mid-ingestion; returns how many."""
+
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "UPDATE sync_jobs SET status = ?, updated_at = ? WHERE status = ?",
+                (QUEUED, _utcnow(), PROCESSING),
+            )
+            return cursor.rowcount
+
+    def pending(self) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) FROM sync_jobs WHERE status IN (?, ?)", (QUEUED, PROCESSING)
+            ).fetchone()
+        return int(row[0])
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class SyncWorkerPool:
+    """Run queued jobs with at most ``workers`` in flight and one per site.
+
+    ``handler`` does the actual ingestion and must record the job outcome with
+    :meth:`SyncQueue.finish`; an exception escaping it marks the job failed.
+    Finished jobs are purged every ``purge_interval`` seconds once they are
+    ``retention`` seconds old.
+    """
+
+    def __init__(
+        self,
+        queue: SyncQueue,
+        handler: Callable[[SyncJob], Awaitable[None]],
+        *,
+        workers: int = 4,
+        poll_interval: float = 1.0,
+        retention: float = 86400.0,
+        purge_interval: float = 300.0,
+    ):
+        self.queue = queue
+        self._handler = handler
+        self._workers = max(1, workers)
+        self._poll_interval = poll_interval
+        self.retention = retention
+        self.purge_interval = purge_interval
+        self._purger: asyncio.Task[None] | None = None
+        self._busy_sites: set[str] = set()
+        self._running: set[asyncio.Task[None]] = set()
+        self._wakeup: asyncio.Event | None = None
+        self._dispatcher: asyncio.Task[None] | None = None
+
+    def notify(self) -> None:
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def start(self) -> None:
+        if self._dispatcher is not None:
+            return
+        recovered = await asyncio.to_thread(self.queue.recover)
+        if recovered:
+            logger.info("Requeued %d interrupted sync jobs", recovered)
+        self._wakeup = asyncio.Event()
+        self._dispatcher = asyncio.create_task(self._dispatch())
+        self._purger = asyncio.create_task(self._purge())
+
+    async def _purge(self) -> None:
+        while True:
+            try:
+                cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.retention)
+                purged = await asyncio.to_thread(self.queue.purge, cutoff)
+                if purged:
+                    logger.info("Purged %d finished sync jobs", purged)
+            except Exception:  # pragma: no cover - keep purging
+                logger.exception("Purging finished sync jobs failed")
+            await asyncio.sleep(self.purge_interval)
+
+    async def _dispatch(self) -> None:
+        assert self._wakeup is not None
+        while True:
+            self._wakeup.clear()
+            jobs = await asyncio.to_thread(
+                self.queue.claim, set(self._busy_sites), self._workers - len(self._running)
+            )
+            for job in jobs:
+                self._busy_sites.add(job.site_code)
+                task = asyncio.create_task(self._run(job))
+                self._running.add(task)
+                task.add_done_callback(self._running.discard)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self._poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _run(self, job: SyncJob) -> None:
+        try:
+            await self._handler(job)
+        except Exception as exc:  # pragma: no cover - handler records expected failures
+            logger.exception("Sync job %s failed", job.snapshot_id)
+            await asyncio.to_thread(self.queue.finish, job.snapshot_id, FAILED, error=str(exc))
+        finally:
+            self._busy_sites.discard(job.site_code)
+            self.notify()
+
+    async def drain(self, timeout: float | None = None) -> None:
+        """Wait until nothing is queued or running (used by tests and shutdown)."""
+
+        async def _idle() -> None:
+            while self._running or await asyncio.to_thread(self.queue.pending):
+                self.notify()
+                await asyncio.sleep(0.01)
+
+        await asyncio.wait_for(_idle(), timeout)
+
+    async def stop(self) -> None:
+        """Stop claiming jobs and let in-flight ones finish; queued jobs stay
+        on disk for the next start."""
+
+        for task in (self._dispatcher, self._purger):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._dispatcher = self._purger = None
+        if self._running:
+            await asyncio.gather(*self._running, return_exceptions=True)
@@ -9,6 +9,8 @@ SQLite backing store used by :mod:`services.foundry_ingestor_common.database`.
 
 from __future__ import annotations
 
+import hashlib
+import json
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from typing import Any, ClassVar, Dict
@@ -19,6 +21,13 @@ def _utcnow() -> datetime:
     return datetime.now(timezone.utc)
 
 
+def content_hash(content: Dict[str, Any]) -> str:
+    """Stable SHA-256 of a row's content fields (key order independent)."""
+
+    canonical = json.dumps(content, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
 @dataclass
 class TimestampMixin:
     """Mixin that adds created/updated timestamps."""
@@ -31,7 +40,33 @@ class TimestampMixin:
 
 
 @dataclass
-class Site(TimestampMixin):
+class ContentHashMixin:
+    """Mixin tracking a hash of the mutable content of a row.
+
+    ``update_from_payload`` implementations call :meth:`_apply_changes` so an
+    identical payload neither changes ``updated_at`` nor needs to be written.
+    """
+
+    content_hash: str | None = None
+
+    def content(self) -> Dict[str, Any]:  # pragma: no cover - interface
+        raise NotImplementedError
+
+    def compute_content_hash(self) -> str:
+        return content_hash(self.content())
+
+    def _apply_changes(self, previous: str) -> bool:
+        current = self.compute_content_hash()
+        if current == previous:
+            self.content_hash = current
+            return False
+        self.content_hash = current
+        self.touch()  # type: ignore[attr-defined]
+        return True
+
+
+@dataclass
+class Site(ContentHashMixin, TimestampMixin):
     """Physical or logical site definition."""
 
     table_name: ClassVar[str] = "sites"
@@ -52,17 +87,24 @@ class Site(TimestampMixin):
             metadata_=row.get("metadata", {}),
             created_at=datetime.fromisoformat(row["created_at"]),
             updated_at=datetime.fromisoformat(row["updated_at"]),
+            content_hash=row.get("content_hash"),
         )
 
-    def update_from_payload(self, payload: dict[str, Any]) -> None:
+    def content(self) -> Dict[str, Any]:
+        return {"name": self.name, "description": self.description, "metadata": self.metadata_}
+
+    def update_from_payload(self, payload: dict[str, Any]) -> bool:
+        """Apply ``payload``; returns ``False`` (and keeps ``updated_at``) when nothing changed."""
+
+        previous = self.content_hash or self.compute_content_hash()
         self.name = payload.get("name", self.name)
         self.description = payload.get("description")
         self.metadata_ = payload.get("metadata", self.metadata_)
-        self.touch()
+        return self._apply_changes(previous)
 
 
 @dataclass
-class NetworkSegment(TimestampMixin):
+class NetworkSegment(ContentHashMixin, TimestampMixin):
     """Network segment information for a site."""
 
     table_name: ClassVar[str] = "network_segments"
@@ -85,17 +127,36 @@ class NetworkSegment(TimestampMixin):
             metadata_=row.get("metadata", {}),
             created_at=datetime.fromisoformat(row["created_at"]),
             updated_at=datetime.fromisoformat(row["updated_at"]),
+            content_hash=row.get("content_hash"),
+        )
+
+    @classmethod
+    def from_payload(cls, site_id: str, payload: dict[str, Any]) -> "NetworkSegment":
+        segment = cls(
+            site_id=site_id,
+            code=payload["code"],
+            name=payload["name"],
+            cidr=payload.get("cidr"),
+            metadata_=payload.get("metadata", {}),
         )
+        segment.content_hash = segment.compute_content_hash()
+        return segment
+
+    def content(self) -> Dict[str, Any]:
+        return {"name": self.name, "cidr": self.cidr, "metadata": self.metadata_}
+
+    def update_from_payload(self, payload: dict[str, Any]) -> bool:
+        """Apply ``payload``; returns ``False`` (and keeps ``updated_at``) when nothing changed."""
 
-    def update_from_payload(self, payload: dict[str, Any]) -> None:
+        previous = self.content_hash or self.compute_content_hash()
         self.name = payload.get("name", self.name)
         self.cidr = payload.get("cidr")
         self.metadata_ = payload.get("metadata", self.metadata_)
-        self.touch()
+        return self._apply_changes(previous)
 
 
 @dataclass
-class Device(TimestampMixin):
+class Device(ContentHashMixin, TimestampMixin):
     """Device inventory entry."""
 
     table_name: ClassVar[str] = "devices"
@@ -122,14 +183,43 @@ class Device(TimestampMixin):
             metadata_=row.get("metadata", {}),
             created_at=datetime.fromisoformat(row["created_at"]),
             updated_at=datetime.fromisoformat(row["updated_at"]),
+            content_hash=row.get("content_hash"),
         )
 
-    def update_from_payload(self, payload: dict[str, Any]) -> None:
+    @classmethod
+    def from_payload(cls, site_id: str, payload: dict[str, Any], segment_id: str | None) -> "Device":
+        device = cls(
+            site_id=site_id,
+            segment_id=segment_id,
+            code=payload["code"],
+            hostname=payload["hostname"],
+            ip_address=payload.get("ip_address"),
+            device_type=payload.get("device_type"),
+            metadata_=payload.get("metadata", {}),
+        )
+        device.content_hash = device.compute_content_hash()
+        return device
+
+    def content(self) -> Dict[str, Any]:
+        return {
+            "segment_id": self.segment_id,
+            "hostname": self.hostname,
+            "ip_address": self.ip_address,
+            "device_type": self.device_type,
+            "metadata": self.metadata_,
+        }
+
+    def update_from_payload(self, payload: dict[str, Any], **changes: Any) -> bool:
+        """Apply ``payload`` (plus ``segment_id=`` if given); ``False`` when nothing changed."""
+
+        previous = self.content_hash or self.compute_content_hash()
+        if "segment_id" in changes:
+            self.segment_id = changes["segment_id"]
         self.hostname = payload.get("hostname", self.hostname)
         self.ip_address = payload.get("ip_address")
         self.device_type = payload.get("device_type")
         self.metadata_ = payload.get("metadata", self.metadata_)
-        self.touch()
+        return self._apply_changes(previous)
 
 
 @dataclass
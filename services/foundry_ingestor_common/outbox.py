@@ -0,0 +1,186 @@
+"""Relay events from the transactional outbox to the event publisher.
+
+Ingestion writes its events to ``event_outbox`` in the same SQLite
+transaction as the snapshot, so a crash between commit and publish no longer
+loses them. :class:`OutboxRelay` publishes pending rows in batches and marks
+them sent; delivery is at-least-once, with the row's ``message_id`` available
+for broker-side deduplication. An event the broker keeps rejecting while it
+accepts others is moved to ``event_outbox_dead`` after ``max_attempts``, so
+it cannot hold back everything behind it.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from .database import SessionFactory
+from .events import EventPublisher
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxRelay:
+    """Publish pending outbox rows.
+
+    Writers call :meth:`flush` right after committing; the background loop
+    started by :meth:`start` retries whatever a failed or interrupted flush
+    left behind and purges rows sent more than ``retention`` seconds ago.
+    After a failed flush, writer flushes are skipped for ``retry_backoff``
+    seconds, doubling up to ``max_backoff`` while failures continue, and
+    retrying is left to the background loop.
+    """
+
+    def __init__(
+        self,
+        session_factory: SessionFactory,
+        publisher: EventPublisher,
+        *,
+        batch_size: int = 500,
+        poll_interval: float = 5.0,
+        retention: float = 86400.0,
+        retry_backoff: float = 1.0,
+        max_backoff: float = 60.0,
+        max_attempts: int = 5,
+    ):
+        self._session_factory = session_factory
+        self._publisher = publisher
+        self.batch_size = max(1, batch_size)
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.retry_backoff = retry_backoff
+        self.max_backoff = max_backoff
+        self.max_attempts = max(1, max_attempts)
+        self._backoff = 0.0
+        self._retry_at = 0.0
+        self._lock = asyncio.Lock()
+        self._task: asyncio.Task[None] | None = None
+
+    def _run(self, method: str, *args: Any) -> Any:
+        session = self._session_factory()
+        try:
+            result = getattr(session, method)(*args)
+            session.commit()
+            return result
+        finally:
+            session.close()
+
+    def _backing_off(self) -> bool:
+        return time.monotonic() < self._retry_at
+
+    def _failed(self) -> None:
+        self._backoff = min(self.max_backoff, self._backoff * 2 or self.retry_backoff)
+        self._retry_at = time.monotonic() + self._backoff
+
+    async def flush(self, *, force: bool = False) -> int:
+        """Publish every pending event; returns how many were sent.
+
+        Broker and database errors are logged and leave the batch pending
+        for the next attempt, so callers are never failed once their own
+        commit went through. During a backoff window this returns 0 at
+        once unless ``force`` is set, as it is for the background loop.
+        """
+
+        sent = 0
+        if not force and self._backing_off():
+            return sent
+        async with self._lock:
+            # Flushes queued behind a failing one give up straight away.
+            if not force and self._backing_off():
+                return sent
+            try:
+                while True:
+                    rows = await asyncio.to_thread(self._run, "pending_outbox_events", self.batch_size)
+                    if not rows:
+                        break
+                    try:
+                        await self._publish(rows)
+                    except Exception as exc:
+                        isolated = await self._isolate(rows, exc)
+                        if not isolated:
+                            self._failed()
+                            return sent
+                        sent += isolated
+                        continue
+                    await asyncio.to_thread(self._run, "mark_outbox_sent", [row["seq"] for row in rows])
+                    sent += len(rows)
+                    if len(rows) < self.batch_size:
+                        break
+            except Exception:
+                logger.exception("Relaying the outbox failed")
+                self._failed()
+                return sent
+            self._backoff = self._retry_at = 0.0
+            return sent
+
+    async def _publish(self, rows: list[dict[str, Any]]) -> None:
+        await self._publisher.publish_many(
+            [(row["subject"], row["payload"]) for row in rows],
+            message_ids=[row["message_id"] for row in rows],
+        )
+
+    async def _isolate(self, rows: list[dict[str, Any]], exc: Exception) -> int:
+        """Tell a rejected oldest event from a broker outage after ``rows`` failed.
+
+        The oldest event is retried alone and, if that fails too, the next
+        one is tried. Only when the broker takes the next event is the
+        failure counted against the oldest one (dead-lettering it at
+        ``max_attempts``). Returns how many events got sent; 0 means the
+        broker looks unavailable and nothing was counted.
+        """
+
+        head = rows[0]
+        if len(rows) > 1:
+            try:
+                await self._publish(rows[:1])
+            except Exception as head_exc:
+                exc = head_exc
+            else:
+                await asyncio.to_thread(self._run, "mark_outbox_sent", [head["seq"]])
+                return 1
+            try:
+                await self._publish(rows[1:2])
+            except Exception:
+                pass
+            else:
+                await asyncio.to_thread(self._run, "mark_outbox_sent", [rows[1]["seq"]])
+                dead = await asyncio.to_thread(
+                    self._run, "mark_outbox_failed", [head["seq"]], str(exc), self.max_attempts
+                )
+                if dead:
+                    logger.error(
+                        "Dead-lettered outbox event %s after %d rejections: %s",
+                        head["message_id"], self.max_attempts, exc,
+                    )
+                return 1
+        logger.warning("Publishing %d outbox events failed: %s", len(rows), exc)
+        await asyncio.to_thread(self._run, "note_outbox_error", [row["seq"] for row in rows], str(exc))
+        return 0
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.flush(force=True)
+                cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.retention)
+                await asyncio.to_thread(self._run, "purge_outbox", cutoff)
+            except Exception:  # pragma: no cover - keep relaying
+                logger.exception("Outbox relay iteration failed")
+
+    async def start(self) -> None:
+        if self._task is None:
+            await self.flush(force=True)  # events left by a previous process
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush(force=True)
@@ -0,0 +1,250 @@
+"""Keyframe + delta storage for snapshot payloads.
+
+Consecutive snapshots of one source/site are mostly identical, so instead of
+the full JSON every row stores either a zlib-compressed *keyframe* (the whole
+payload) or a compressed list of JSON-patch style operations against the
+previous version. A keyframe is written every ``keyframe_interval`` versions,
+and whenever the delta would not be meaningfully smaller, which bounds the
+reconstruction chain. The compressed keyframe of the last payload written
+for each source/site is kept, up to ``head_cache_bytes`` in total, so the
+next write diffs against it without touching the database, however many
+sites are active; a separate LRU of reconstructed payloads serves reads.
+
+Rows written before this module existed keep their plain ``payload`` text and
+are read as keyframes.
+"""
+
+from __future__ import annotations
+
+import copy
+import json
+import os
+import sqlite3
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Any
+
+ENCODING_JSON = "json"
+ENCODING_KEYFRAME = "keyframe"
+ENCODING_DELTA = "delta"
+
+DEFAULT_KEYFRAME_INTERVAL = int(os.getenv("FOUNDRY_SNAPSHOT_KEYFRAME_INTERVAL", "12"))
+DEFAULT_CACHE_SIZE = int(os.getenv("FOUNDRY_SNAPSHOT_CACHE_SIZE", "8"))
+DEFAULT_HEAD_CACHE_BYTES = int(os.getenv("FOUNDRY_SNAPSHOT_HEAD_CACHE_BYTES", str(64 * 1024 * 1024)))
+
+_MISSING = object()
+
+
+def _escape(token: str) -> str:
+    return token.replace("~", "~0").replace("/", "~1")
+
+
+def _unescape(token: str) -> str:
+    return token.replace("~1", "/").replace("~0", "~")
+
+
+def diff(old: Any, new: Any, path: str = "") -> list[dict[str, Any]]:
+    """Return operations (``add``/``remove``/``replace``) turning ``old`` into ``new``.
+
+    Objects are compared key by key and arrays index by index with the tail
+    added or removed, so an unchanged element costs nothing.
+    """
+
+    if type(old) is not type(new):
+        return [{"op": "replace", "path": path, "value": new}]
+    if isinstance(new, dict):
+        ops: list[dict[str, Any]] = []
+        for key, value in old.items():
+            if key not in new:
+                ops.append({"op": "remove", "path": f"{path}/{_escape(key)}"})
+        for key, value in new.items():
+            child = f"{path}/{_escape(key)}"
+            previous = old.get(key, _MISSING)
+            if previous is _MISSING:
+                ops.append({"op": "add", "path": child, "value": value})
+            elif previous != value:
+                ops.extend(diff(previous, value, child))
+        return ops
+    if isinstance(new, list):
+        ops = []
+        common = min(len(old), len(new))
+        for index in range(common):
+            if old[index] != new[index]:
+                ops.extend(diff(old[index], new[index], f"{path}/{index}"))
+        for index in range(common, len(new)):
+            ops.append({"op": "add", "path": f"{path}/{index}", "value": new[index]})
+        for index in range(len(old) - 1, common - 1, -1):
+            ops.append({"op": "remove", "path": f"{path}/{index}"})
+        return ops
+    return [] if old == new else [{"op": "replace", "path": path, "value": new}]
+
+
+def apply(document: Any, ops: list[dict[str, Any]]) -> Any:
+    """Apply ``ops`` (as produced by :func:`diff`) to ``document`` in place."""
+
+    for op in ops:
+        path = op["path"]
+        if not path:
+            document = op["value"]
+            continue
+        *parents, last = [_unescape(token) for token in path[1:].split("/")]
+        target = document
+        for token in parents:
+            target = target[int(token)] if isinstance(target, list) else target[token]
+        if isinstance(target, list):
+            index = int(last)
+            if op["op"] == "add":
+                target.insert(index, op["value"])
+            elif op["op"] == "remove":
+                del target[index]
+            else:
+                target[index] = op["value"]
+        elif op["op"] == "remove":
+            del target[last]
+        else:
+            target[last] = op["value"]
+    return document
+
+
+def _pack(value: Any) -> bytes:
+    return zlib.compress(json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8"), 6)
+
+
+def _unpack(blob: bytes) -> Any:
+    return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+
+class SnapshotPayloadStore:
+    """Encode snapshot payloads on write and reconstruct them on read."""
+
+    def __init__(
+        self,
+        *,
+        keyframe_interval: int = DEFAULT_KEYFRAME_INTERVAL,
+        cache_size: int = DEFAULT_CACHE_SIZE,
+        head_cache_bytes: int = DEFAULT_HEAD_CACHE_BYTES,
+    ):
+        self.keyframe_interval = max(1, keyframe_interval)
+        self.cache_size = cache_size
+        self.head_cache_bytes = head_cache_bytes
+        self._cache: OrderedDict[str, Any] = OrderedDict()
+        # (source, site_id) -> (snapshot id, compressed keyframe) of the latest write
+        self._heads: OrderedDict[tuple[str, str], tuple[str, bytes]] = OrderedDict()
+        self._head_bytes = 0
+        self._lock = threading.Lock()
+
+    # cache ------------------------------------------------------------------
+    def _cached(self, snapshot_id: str) -> Any:
+        with self._lock:
+            payload = self._cache.get(snapshot_id, _MISSING)
+            if payload is not _MISSING:
+                self._cache.move_to_end(snapshot_id)
+            return payload
+
+    def _remember(self, snapshot_id: str, payload: Any) -> None:
+        if self.cache_size <= 0:
+            return
+        with self._lock:
+            self._cache[snapshot_id] = payload
+            self._cache.move_to_end(snapshot_id)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    # write ------------------------------------------------------------------
+    def _base(self, conn: sqlite3.Connection, stream: tuple[str, str] | None, snapshot_id: str) -> Any:
+        if stream is not None:
+            with self._lock:
+                head = self._heads.get(stream)
+            # A head from a rolled-back write names a row that is not the
+            # latest one; fall back to reconstructing from the database.
+            if head is not None and head[0] == snapshot_id:
+                return _unpack(head[1])
+        return self._reconstruct(conn, snapshot_id)
+
+    def encode(
+        self,
+        conn: sqlite3.Connection,
+        payload: dict[str, Any],
+        previous: sqlite3.Row | None,
+        stream: tuple[str, str] | None = None,
+    ) -> tuple[str, bytes, str | None, int, bytes]:
+        """Return ``(encoding, blob, base_id, chain_length, keyframe)`` for a new row.
+
+        ``previous`` is the latest row of the same source/site (``id`` and
+        ``chain_length`` columns), if any; ``stream`` is that
+        ``(source, site_id)``. ``keyframe`` is the compressed payload, for
+        :meth:`written` once the row is stored.
+        """
+
+        keyframe = _pack(payload)
+        chain_length = (previous["chain_length"] or 0) + 1 if previous is not None else 0
+        if previous is None or chain_length >= self.keyframe_interval:
+            return ENCODING_KEYFRAME, keyframe, None, 0, keyframe
+        delta = _pack(diff(self._base(conn, stream, previous["id"]), payload))
+        if len(delta) * 2 > len(keyframe):
+            return ENCODING_KEYFRAME, keyframe, None, 0, keyframe
+        return ENCODING_DELTA, delta, previous["id"], chain_length, keyframe
+
+    def written(self, snapshot_id: str, keyframe: bytes, stream: tuple[str, str] | None = None) -> None:
+        # The next version of this source/site will be diffed against it.
+        if stream is None:
+            return
+        with self._lock:
+            old = self._heads.pop(stream, None)
+            if old is not None:
+                self._head_bytes -= len(old[1])
+            if len(keyframe) > self.head_cache_bytes:
+                return
+            self._heads[stream] = (snapshot_id, keyframe)
+            self._head_bytes += len(keyframe)
+            while self._head_bytes > self.head_cache_bytes:
+                _, (_, evicted) = self._heads.popitem(last=False)
+                self._head_bytes -= len(evicted)
+
+    # read -------------------------------------------------------------------
+    def load(self, conn: sqlite3.Connection, row: sqlite3.Row | dict[str, Any]) -> dict[str, Any]:
+        """Return the payload of ``row`` (a ``snapshots`` row) as a fresh object."""
+
+        encoding = row["payload_encoding"] or ENCODING_JSON
+        if encoding == ENCODING_JSON:
+            return json.loads(row["payload"]) if row["payload"] else {}
+        return copy.deepcopy(self._reconstruct(conn, row["id"]))
+
+    def _reconstruct(self, conn: sqlite3.Connection, snapshot_id: str) -> Any:
+        # Walk back to a cached payload or a keyframe, then replay forwards.
+        deltas: list[tuple[str, bytes]] = []
+        current = snapshot_id
+        while True:
+            cached = self._cached(current)
+            if cached is not _MISSING:
+                document = cached
+                break
+            row = conn.execute(
+                "SELECT payload_encoding, payload_blob, payload, base_id FROM snapshots WHERE id = ?",
+                (current,),
+            ).fetchone()
+            if row is None:
+                raise LookupError(f"Snapshot {current} missing from payload chain")
+            encoding = row[0] or ENCODING_JSON
+            if encoding == ENCODING_DELTA:
+                deltas.append((current, row[1]))
+                current = row[3]
+                continue
+            document = _unpack(row[1]) if encoding == ENCODING_KEYFRAME else json.loads(row[2] or "{}")
+            self._remember(current, document)
+            break
+        for delta_id, blob in reversed(deltas):
+            document = apply(copy.deepcopy(document), _unpack(blob))
+            self._remember(delta_id, document)
+        return document
+
+
+__all__ = [
+    "ENCODING_DELTA",
+    "ENCODING_JSON",
+    "ENCODING_KEYFRAME",
+    "SnapshotPayloadStore",
+    "apply",
+    "diff",
+]
@@ -1,34 +1,243 @@
-"""Lightweight query helpers used by the ingestor tests.
+"""Lightweight query helpers used by the ingestor services.
 
-This module intentionally implements a very small subset of the SQLAlchemy
-query API so that the ingestor services can run without the external
-``sqlalchemy`` dependency. Only what is required by the tests is provided
-here: the :func:`select` helper and a result object exposing ``scalar``
-accessors.
+This module implements a very small subset of the SQLAlchemy query API so
+that the ingestor services can run without the external ``sqlalchemy``
+dependency: :func:`select` with ``where``/``filter_by``, ``order_by`` and
+``limit``, :func:`column` expressions, keyset pagination via ``after`` and a
+result object exposing ``scalar`` accessors. Queries compile to
+parameterised SQL so filtering happens in SQLite, not in Python.
+
+Keyset pagination sorts NULLs as the smallest value (``NULLS FIRST``
+ascending, ``NULLS LAST`` descending), matching SQLite's default, so
+nullable order columns page through every row.
+
+Example::
+
+    query = (
+        select(Snapshot)
+        .where(column("source") == "svc", column("version") >= 10)
+        .order_by(column("version"))
+        .limit(100)
+    )
+    page = session.execute(query)
+    next_page = session.execute(query.after(page.next_cursor))
 """
 
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Generic, Iterable, List, Sequence, Type, TypeVar
+from dataclasses import dataclass, replace
+from typing import Any, Collection, Generic, Iterable, List, Sequence, Type, TypeVar
 
 T = TypeVar("T")
 
+# Appended to every ordering so keyset cursors are unique.
+TIEBREAKER = "id"
+
+
+@dataclass(frozen=True)
+class Condition:
+    column: str
+    op: str
+    value: Any = None
+
+
+@dataclass(frozen=True)
+class Ordering:
+    column: str
+    descending: bool = False
+
+
+@dataclass(frozen=True)
+class Column:
+    """A column reference; comparisons build :class:`Condition` objects."""
+
+    name: str
+
+    def __eq__(self, value: Any) -> Condition:  # type: ignore[override]
+        return Condition(self.name, "IS NULL" if value is None else "=", value)
+
+    def __ne__(self, value: Any) -> Condition:  # type: ignore[override]
+        return Condition(self.name, "IS NOT NULL" if value is None else "!=", value)
+
+    def __lt__(self, value: Any) -> Condition:
+        return Condition(self.name, "<", value)
+
+    def __le__(self, value: Any) -> Condition:
+        return Condition(self.name, "<=", value)
+
+    def __gt__(self, value: Any) -> Condition:
+        return Condition(self.name, ">", value)
+
+    def __ge__(self, value: Any) -> Condition:
+        return Condition(self.name, ">=", value)
+
+    def __hash__(self) -> int:
+        return hash(self.name)
+
+    def in_(self, values: Iterable[Any]) -> Condition:
+        return Condition(self.name, "IN", tuple(values))
+
+    def between(self, low: Any, high: Any) -> Condition:
+        return Condition(self.name, "BETWEEN", (low, high))
+
+    def asc(self) -> Ordering:
+        return Ordering(self.name)
+
+    def desc(self) -> Ordering:
+        return Ordering(self.name, descending=True)
+
+
+def column(name: str) -> Column:
+    """Return a column reference for use in ``where`` and ``order_by``."""
+
+    return Column(name)
+
 
 @dataclass(frozen=True)
 class SelectQuery(Generic[T]):
-    """Representation of a ``select`` request for a model class."""
+    """Representation of a ``select`` request for a model class.
+
+    Every method returns a new query, so partially built queries can be
+    reused.
+    """
 
     model: Type[T]
+    conditions: tuple[Condition, ...] = ()
+    ordering: tuple[Ordering, ...] = ()
+    limit_: int | None = None
+    cursor: tuple[Any, ...] | None = None
+
+    def where(self, *conditions: Condition) -> "SelectQuery[T]":
+        for condition in conditions:
+            if not isinstance(condition, Condition):
+                raise TypeError("where() expects conditions built from column(...)")
+        return replace(self, conditions=self.conditions + conditions)
+
+    def filter_by(self, **values: Any) -> "SelectQuery[T]":
+        return self.where(*(column(name) == value for name, value in values.items()))
+
+    def order_by(self, *orderings: Ordering | Column | str) -> "SelectQuery[T]":
+        resolved = []
+        for ordering in orderings:
+            if isinstance(ordering, str):
+                ordering = Ordering(ordering.lstrip("-"), ordering.startswith("-"))
+            elif isinstance(ordering, Column):
+                ordering = ordering.asc()
+            resolved.append(ordering)
+        if len({ordering.descending for ordering in resolved}) > 1:
+            raise ValueError("Keyset pagination needs every order_by column in the same direction")
+        return replace(self, ordering=self.ordering + tuple(resolved))
+
+    def limit(self, count: int) -> "SelectQuery[T]":
+        if count < 1:
+            raise ValueError("limit must be positive")
+        return replace(self, limit_=count)
+
+    def after(self, cursor: Sequence[Any] | None) -> "SelectQuery[T]":
+        """Continue after the row identified by ``cursor`` (a ``Result.next_cursor``)."""
+
+        return replace(self, cursor=tuple(cursor) if cursor is not None else None)
+
+    @property
+    def key_columns(self) -> tuple[str, ...]:
+        columns = tuple(ordering.column for ordering in self.ordering)
+        return columns if TIEBREAKER in columns else columns + (TIEBREAKER,)
+
+    @property
+    def descending(self) -> bool:
+        return bool(self.ordering) and self.ordering[0].descending
+
+    def compile(self, columns: Collection[str], nullable: Collection[str] = ()) -> tuple[str, list[Any]]:
+        """Return ``(sql, params)``; ``columns`` are the table's real columns,
+        used to reject unknown names before they reach the SQL text.
+
+        ``nullable`` names the columns that may hold NULL. Keysets over them
+        can't use a row-value comparison, which is NULL (so false) as soon
+        as a NULL is compared, and expand to NULL-aware predicates instead.
+        """
+
+        table = self.model.table_name  # type: ignore[attr-defined]
+        for name in [c.column for c in self.conditions] + list(self.key_columns):
+            if name not in columns:
+                raise ValueError(f"Unknown column '{name}' for {table}")
+
+        clauses: list[str] = []
+        params: list[Any] = []
+        for condition in self.conditions:
+            if condition.op in ("IS NULL", "IS NOT NULL"):
+                clauses.append(f"{condition.column} {condition.op}")
+            elif condition.op == "IN":
+                if not condition.value:
+                    clauses.append("0")
+                    continue
+                clauses.append(f"{condition.column} IN ({', '.join('?' * len(condition.value))})")
+                params.extend(condition.value)
+            elif condition.op == "BETWEEN":
+                clauses.append(f"{condition.column} BETWEEN ? AND ?")
+                params.extend(condition.value)
+            else:
+                clauses.append(f"{condition.column} {condition.op} ?")
+                params.append(condition.value)
+
+        keys = self.key_columns
+        nullable_keys = {key for key in keys if key in nullable and key != TIEBREAKER}
+        direction = "DESC" if self.descending else "ASC"
+        if self.cursor is not None:
+            if len(self.cursor) != len(keys):
+                raise ValueError(f"Cursor needs {len(keys)} value(s) for {', '.join(keys)}")
+            if nullable_keys:
+                clause, values = self._keyset_nullable(keys, nullable_keys)
+                clauses.append(clause)
+                params.extend(values)
+            else:
+                clauses.append(
+                    f"({', '.join(keys)}) {'<' if self.descending else '>'} ({', '.join('?' * len(keys))})"
+                )
+                params.extend(self.cursor)
+
+        sql = f"SELECT * FROM {table}"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        if self.ordering or self.limit_ is not None or self.cursor is not None:
+            nulls = " NULLS LAST" if self.descending else " NULLS FIRST"
+            sql += " ORDER BY " + ", ".join(
+                f"{key} {direction}{nulls if key in nullable_keys else ''}" for key in keys
+            )
+        if self.limit_ is not None:
+            sql += " LIMIT ?"
+            params.append(self.limit_)
+        return sql, params
+
+
+    def _keyset_nullable(self, keys: tuple[str, ...], nullable: Collection[str]) -> tuple[str, list[Any]]:
+        """Expand ``keys`` past ``self.cursor`` into ``k1 > c1 OR (k1 = c1 AND
+        k2 > c2) OR ...`` with NULL ordered before every value."""
 
-    # The real SQLAlchemy ``Select`` object exposes ``where`` and many other
-    # methods. The ingestor tests only call ``select(Model)`` without further
-    # filtering, so ``where`` simply raises a descriptive error to make misuse
-    # obvious during development.
-    def where(self, *_, **__):  # pragma: no cover - defensive programming
-        raise NotImplementedError(
-            "Filtering is not supported by the lightweight SelectQuery stub"
-        )
+        assert self.cursor is not None
+        disjuncts: list[str] = []
+        params: list[Any] = []
+        prefix: list[str] = []
+        prefix_params: list[Any] = []
+        for key, value in zip(keys, self.cursor):
+            if not self.descending:
+                past = f"{key} IS NOT NULL" if value is None else f"{key} > ?"
+            elif value is None:
+                past = None  # nothing sorts after NULL when descending
+            elif key in nullable:
+                past = f"({key} < ? OR {key} IS NULL)"
+            else:
+                past = f"{key} < ?"
+            if past is not None:
+                disjuncts.append("(" + " AND ".join(prefix + [past]) + ")")
+                params.extend(prefix_params)
+                if value is not None:
+                    params.append(value)
+            if value is None:
+                prefix.append(f"{key} IS NULL")
+            else:
+                prefix.append(f"{key} = ?")
+                prefix_params.append(value)
+        return "(" + (" OR ".join(disjuncts) or "0") + ")", params
 
 
 def select(model: Type[T]) -> SelectQuery[T]:
@@ -40,8 +249,10 @@ def select(model: Type[T]) -> SelectQuery[T]:
 class Result(Generic[T]):
     """Container for rows returned from :meth:`Session.execute`."""
 
-    def __init__(self, items: Sequence[T]):
+    def __init__(self, items: Sequence[T], next_cursor: tuple[Any, ...] | None = None):
         self._items: List[T] = list(items)
+        # Keyset of the last row of a full page; ``None`` once exhausted.
+        self.next_cursor = next_cursor
 
     # The tests rely on ``scalar_one``/``scalar_one_or_none`` and ``scalars``.
     def scalar_one(self) -> T:
@@ -60,4 +271,4 @@ class Result(Generic[T]):
         return list(self._items)
 
 
-__all__ = ["Result", "SelectQuery", "select"]
+__all__ = ["Column", "Condition", "Ordering", "Result", "SelectQuery", "column", "select"]
@@ -1,87 +1,465 @@
-"""Simplified JSON validation for ingestor payloads."""
+"""JSON Schema validation for ingestor payloads.
+
+A schema is compiled twice when the validator is built:
+
+* :func:`generate_predicate` emits Python source for a single function that
+  inlines every check (one ``dict.get`` per declared property, a key count
+  for ``additionalProperties: false``, plain loops for ``items``) and only
+  answers valid / invalid. This is the path every payload takes.
+* :func:`compile_schema` builds nested closures that report *where* a payload
+  failed. It only runs after the predicate rejected a payload, so valid
+  payloads never pay for error paths.
+"""
 
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Any
+from typing import Any, Callable, Optional
 
 
 class ValidationError(Exception):
     """Raised when a payload fails structural validation."""
 
 
+class _Failure:
+    __slots__ = ("parts", "message")
+
+    def __init__(self, message: str) -> None:
+        self.parts: list[str] = []  # innermost first
+        self.message = message
+
+    def at(self, part: str) -> "_Failure":
+        self.parts.append(part)
+        return self
+
+    def path(self) -> str:
+        return "".join(reversed(self.parts)).lstrip(".") or "payload"
+
+
+Check = Callable[[Any], Optional[_Failure]]
+
+_MISSING = object()
+
+# Keywords that only annotate a schema and never affect validation.
+_ANNOTATIONS = frozenset({"$schema", "$id", "$comment", "title", "description", "default", "examples"})
+_SUPPORTED = frozenset(
+    {
+        "type",
+        "enum",
+        "required",
+        "properties",
+        "additionalProperties",
+        "items",
+        "minItems",
+        "maxItems",
+        "minLength",
+        "maxLength",
+        "minimum",
+        "maximum",
+        "format",
+    }
+)
+
+_TYPE_CHECKS: dict[str, Callable[[Any], bool]] = {
+    "object": lambda value: isinstance(value, dict),
+    "array": lambda value: isinstance(value, list),
+    "string": lambda value: isinstance(value, str),
+    "integer": lambda value: isinstance(value, int) and not isinstance(value, bool),
+    "number": lambda value: isinstance(value, (int, float)) and not isinstance(value, bool),
+    "boolean": lambda value: isinstance(value, bool),
+    "null": lambda value: value is None,
+}
+
+# Python types that satisfy a JSON type exactly, for the common fast path.
+_EXACT_TYPES: dict[str, tuple[type, ...]] = {
+    "object": (dict,),
+    "array": (list,),
+    "string": (str,),
+    "integer": (int,),
+    "number": (int, float),
+    "boolean": (bool,),
+    "null": (type(None),),
+}
+
+
+def _is_date_time(value: str) -> bool:
+    # RFC 3339 needs a full date and time; fromisoformat covers the rest.
+    if len(value) < 16 or value[10] not in "Tt ":
+        return False
+    try:
+        datetime.fromisoformat(value.replace("Z", "+00:00").replace("z", "+00:00"))
+    except ValueError:
+        return False
+    return True
+
+
+_FORMATS: dict[str, tuple[Callable[[str], bool], str]] = {
+    "date-time": (_is_date_time, "an ISO-8601 timestamp"),
+}
+
+
+def _compile_type(spec: str | list[str]) -> Check:
+    names = [spec] if isinstance(spec, str) else list(spec)
+    unknown = [name for name in names if name not in _TYPE_CHECKS]
+    if unknown:
+        raise ValueError(f"Unsupported JSON schema type(s): {', '.join(unknown)}")
+    exact = tuple({kind for name in names for kind in _EXACT_TYPES[name]})
+    checks = [_TYPE_CHECKS[name] for name in names]
+    message = f"must be of type {' or '.join(names)}"
+
+    def check(value: Any) -> _Failure | None:
+        if type(value) in exact:  # type(True) is bool, so it never passes as an int
+            return None
+        if any(test(value) for test in checks):
+            return None
+        return _Failure(message)
+
+    return check
+
+
+def _compile_object(schema: dict[str, Any]) -> Check:
+    required = tuple(schema.get("required", ()))
+    properties = {name: compile_schema(sub) for name, sub in schema.get("properties", {}).items()}
+    additional = schema.get("additionalProperties", True)
+    extra: Check | None = compile_schema(additional) if isinstance(additional, dict) else None
+    closed = additional is False
+
+    def check(value: Any) -> _Failure | None:
+        if not isinstance(value, dict):
+            return None  # left to "type"
+        for name in required:
+            if name not in value:
+                missing = sorted(field for field in required if field not in value)
+                return _Failure(f"missing required field(s): {', '.join(missing)}")
+        for name, item in value.items():
+            sub = properties.get(name)
+            if sub is None:
+                if closed:
+                    return _Failure(f"has unexpected property '{name}'")
+                sub = extra
+                if sub is None:
+                    continue
+            failure = sub(item)
+            if failure is not None:
+                return failure.at(f".{name}")
+        return None
+
+    return check
+
+
+def _compile_array(schema: dict[str, Any]) -> Check:
+    items = compile_schema(schema["items"]) if isinstance(schema.get("items"), dict) else None
+    min_items = schema.get("minItems")
+    max_items = schema.get("maxItems")
+
+    def check(value: Any) -> _Failure | None:
+        if not isinstance(value, list):
+            return None
+        if min_items is not None and len(value) < min_items:
+            return _Failure(f"must contain at least {min_items} item(s)")
+        if max_items is not None and len(value) > max_items:
+            return _Failure(f"must contain at most {max_items} item(s)")
+        if items is not None:
+            for index, item in enumerate(value):
+                failure = items(item)
+                if failure is not None:
+                    return failure.at(f"[{index}]")
+        return None
+
+    return check
+
+
+def _compile_string(schema: dict[str, Any]) -> Check:
+    min_length = schema.get("minLength")
+    max_length = schema.get("maxLength")
+    fmt = _FORMATS.get(schema.get("format", ""))  # unknown formats are annotations
+
+    def check(value: Any) -> _Failure | None:
+        if not isinstance(value, str):
+            return None
+        if min_length is not None and len(value) < min_length:
+            return _Failure(f"must be at least {min_length} character(s) long")
+        if max_length is not None and len(value) > max_length:
+            return _Failure(f"must be at most {max_length} character(s) long")
+        if fmt is not None and not fmt[0](value):
+            return _Failure(f"must be {fmt[1]}")
+        return None
+
+    return check
+
+
+def _compile_number(schema: dict[str, Any]) -> Check:
+    minimum = schema.get("minimum")
+    maximum = schema.get("maximum")
+
+    def check(value: Any) -> _Failure | None:
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return None
+        if minimum is not None and value < minimum:
+            return _Failure(f"must be >= {minimum}")
+        if maximum is not None and value > maximum:
+            return _Failure(f"must be <= {maximum}")
+        return None
+
+    return check
+
+
+def _compile_enum(options: list[Any]) -> Check:
+    allowed = list(options)
+    message = f"must be one of {', '.join(map(repr, allowed))}"
+
+    def check(value: Any) -> _Failure | None:
+        return None if value in allowed else _Failure(message)
+
+    return check
+
+
+def compile_schema(schema: dict[str, Any] | bool) -> Check:
+    """Compile a (draft-07 subset) JSON schema into a check function.
+
+    Raises :class:`ValueError` for keywords it does not implement so a schema
+    change cannot silently weaken validation.
+    """
+
+    if schema is True or schema == {}:
+        return lambda value: None
+    if schema is False:
+        return lambda value: _Failure("is not allowed")
+    unsupported = set(schema) - _SUPPORTED - _ANNOTATIONS
+    if unsupported:
+        raise ValueError(f"Unsupported JSON schema keyword(s): {', '.join(sorted(unsupported))}")
+
+    checks: list[Check] = []
+    if "type" in schema:
+        checks.append(_compile_type(schema["type"]))
+    if "enum" in schema:
+        checks.append(_compile_enum(schema["enum"]))
+    if {"required", "properties", "additionalProperties"} & schema.keys():
+        checks.append(_compile_object(schema))
+    if {"items", "minItems", "maxItems"} & schema.keys():
+        checks.append(_compile_array(schema))
+    if {"minLength", "maxLength", "format"} & schema.keys():
+        checks.append(_compile_string(schema))
+    if {"minimum", "maximum"} & schema.keys():
+        checks.append(_compile_number(schema))
+
+    if not checks:
+        return lambda value: None
+    if len(checks) == 1:
+        return checks[0]
+    if len(checks) == 2:
+        first, second = checks
+
+        def check_two(value: Any) -> _Failure | None:
+            return first(value) or second(value)
+
+        return check_two
+
+    def check_all(value: Any) -> _Failure | None:
+        for check in checks:
+            failure = check(value)
+            if failure is not None:
+                return failure
+        return None
+
+    return check_all
+
+
+class _Generator:
+    """Emit the source of a ``valid(value) -> bool`` function for a schema."""
+
+    _TYPE_TESTS = {
+        "object": "isinstance({v}, dict)",
+        "array": "isinstance({v}, list)",
+        "string": "isinstance({v}, str)",
+        "integer": "(isinstance({v}, int) and not isinstance({v}, bool))",
+        "number": "(isinstance({v}, (int, float)) and not isinstance({v}, bool))",
+        "boolean": "isinstance({v}, bool)",
+        "null": "{v} is None",
+    }
+
+    def __init__(self) -> None:
+        # Bound as default arguments of the generated function, so every
+        # name it uses is a fast local lookup.
+        self.namespace: dict[str, Any] = {
+            "_MISSING": _MISSING,
+            "isinstance": isinstance,
+            "len": len,
+            "dict": dict,
+            "list": list,
+            "str": str,
+            "int": int,
+            "float": float,
+            "bool": bool,
+        }
+        self._counter = 0
+
+    def const(self, value: Any) -> str:
+        name = f"_c{len(self.namespace)}"
+        self.namespace[name] = value
+        return name
+
+    def var(self) -> str:
+        self._counter += 1
+        return f"v{self._counter}"
+
+    def node(self, schema: dict[str, Any] | bool, v: str, indent: int) -> list[str]:
+        pad = "    " * indent
+        if schema is True:
+            return []
+        if schema is False:
+            return [f"{pad}return False"]
+        lines: list[str] = []
+        types = schema.get("type")
+        names = [types] if isinstance(types, str) else list(types or [])
+        if names:
+            test = " or ".join(self._TYPE_TESTS[name].format(v=v) for name in names)
+            lines.append(f"{pad}if not ({test}):")
+            lines.append(f"{pad}    return False")
+        if "enum" in schema:
+            lines.append(f"{pad}if {v} not in {self.const(list(schema['enum']))}:")
+            lines.append(f"{pad}    return False")
+
+        def guarded(kinds: tuple[str, ...], test: str, body: list[str]) -> None:
+            # Keywords only apply to their own JSON type; skip the guard when
+            # "type" already pinned the value to it.
+            if not body:
+                return
+            if len(names) == 1 and names[0] in kinds:
+                lines.extend(body)
+            else:
+                lines.append(f"{pad}if {test.format(v=v)}:")
+                lines.extend("    " + line for line in body)
+
+        numeric = "isinstance({v}, (int, float)) and not isinstance({v}, bool)"
+        guarded(("object",), "isinstance({v}, dict)", self._object(schema, v, indent))
+        guarded(("array",), "isinstance({v}, list)", self._array(schema, v, indent))
+        guarded(("string",), "isinstance({v}, str)", self._string(schema, v, indent))
+        guarded(("number", "integer"), numeric, self._number(schema, v, indent))
+        return lines
+
+    def _object(self, schema: dict[str, Any], v: str, indent: int) -> list[str]:
+        # Presence and additionalProperties are checked with one dict.get per
+        # declared property plus a key count; set operations on keys() cost
+        # more than the rest of the checks combined.
+        pad = "    " * indent
+        lines: list[str] = []
+        properties = schema.get("properties", {})
+        additional = schema.get("additionalProperties", True)
+        required = list(dict.fromkeys(schema.get("required", ())))
+        closed = additional is False
+        count = self.var() if closed else ""
+        for name in required:
+            if name not in properties:
+                lines.append(f"{pad}if {name!r} not in {v}:")
+                lines.append(f"{pad}    return False")
+        if closed:
+            lines.append(f"{pad}{count} = {sum(1 for name in required if name in properties)}")
+        for name, sub in properties.items():
+            item = self.var()
+            if name in required:
+                lines.append(f"{pad}{item} = {v}.get({name!r}, _MISSING)")
+                lines.append(f"{pad}if {item} is _MISSING:")
+                lines.append(f"{pad}    return False")
+                lines.extend(self.node(sub, item, indent))
+                continue
+            body = self.node(sub, item, indent + 1)
+            if body:
+                lines.append(f"{pad}{item} = {v}.get({name!r}, _MISSING)")
+                lines.append(f"{pad}if {item} is not _MISSING:")
+                if closed:
+                    lines.append(f"{pad}    {count} += 1")
+                lines.extend(body)
+            elif closed:
+                lines.append(f"{pad}if {name!r} in {v}:")
+                lines.append(f"{pad}    {count} += 1")
+        if closed:
+            lines.append(f"{pad}if len({v}) != {count}:")
+            lines.append(f"{pad}    return False")
+        elif isinstance(additional, dict):
+            key, item = self.var(), self.var()
+            body = self.node(additional, item, indent + 2)
+            if body:
+                lines.append(f"{pad}for {key}, {item} in {v}.items():")
+                lines.append(f"{pad}    if {key} not in {self.const(frozenset(properties))}:")
+                lines.extend(body)
+        return lines
+
+    def _array(self, schema: dict[str, Any], v: str, indent: int) -> list[str]:
+        pad = "    " * indent
+        lines: list[str] = []
+        if "minItems" in schema:
+            lines.append(f"{pad}if len({v}) < {int(schema['minItems'])}:")
+            lines.append(f"{pad}    return False")
+        if "maxItems" in schema:
+            lines.append(f"{pad}if len({v}) > {int(schema['maxItems'])}:")
+            lines.append(f"{pad}    return False")
+        if isinstance(schema.get("items"), dict):
+            item = self.var()
+            body = self.node(schema["items"], item, indent + 1)
+            if body:
+                lines.append(f"{pad}for {item} in {v}:")
+                lines.extend(body)
+        return lines
+
+    def _string(self, schema: dict[str, Any], v: str, indent: int) -> list[str]:
+        pad = "    " * indent
+        lines: list[str] = []
+        if "minLength" in schema:
+            lines.append(f"{pad}if len({v}) < {int(schema['minLength'])}:")
+            lines.append(f"{pad}    return False")
+        if "maxLength" in schema:
+            lines.append(f"{pad}if len({v}) > {int(schema['maxLength'])}:")
+            lines.append(f"{pad}    return False")
+        fmt = _FORMATS.get(schema.get("format", ""))
+        if fmt is not None:
+            lines.append(f"{pad}if not {self.const(fmt[0])}({v}):")
+            lines.append(f"{pad}    return False")
+        return lines
+
+    def _number(self, schema: dict[str, Any], v: str, indent: int) -> list[str]:
+        pad = "    " * indent
+        lines: list[str] = []
+        if "minimum" in schema:
+            lines.append(f"{pad}if {v} < {self.const(schema['minimum'])}:")
+            lines.append(f"{pad}    return False")
+        if "maximum" in schema:
+            lines.append(f"{pad}if {v} > {self.const(schema['maximum'])}:")
+            lines.append(f"{pad}    return False")
+        return lines
+
+
+def generate_predicate(schema: dict[str, Any] | bool) -> tuple[Callable[[Any], bool], str]:
+    """Return ``(valid, source)``: a generated function telling whether a value
+    matches ``schema`` and the source it was compiled from."""
+
+    compile_schema(schema)  # rejects unsupported keywords
+    generator = _Generator()
+    body = generator.node(schema, "v0", 1)
+    defaults = ", ".join(f"{name}={name}" for name in generator.namespace)
+    source = "\n".join([f"def valid(v0, *, {defaults}):", *body, "    return True", ""])
+    namespace = dict(generator.namespace)
+    exec(compile(source, "<snapshot-schema>", "exec"), namespace)
+    return namespace["valid"], source
+
+
 class SnapshotValidator:
-    """Validate payloads against the bundled snapshot schema.
+    """Validate payloads against a snapshot JSON schema.
 
-    The implementation intentionally focuses on the subset of draft-07 features
-    exercised by the unit tests: required fields, basic type checks and the ISO
-    timestamp format used by ``collected_at``.
+    The schema is compiled once on construction; it supports the draft-07
+    keywords used by the bundled schemas, including ``minLength``,
+    ``format: date-time`` and ``additionalProperties``.
     """
 
     def __init__(self, schema: dict[str, Any]):
         self._schema = schema
-        self._site_required = set(schema["properties"]["site"].get("required", []))
-        self._segment_required = set(
-            schema["properties"]["network_segments"]["items"].get("required", [])
-        )
-        self._device_required = set(schema["properties"]["devices"]["items"].get("required", []))
-        self._top_level_required = set(schema.get("required", []))
+        self._valid, self.source = generate_predicate(schema)
+        self._explain = compile_schema(schema)
 
     def validate(self, payload: dict[str, Any]) -> None:
-        self._ensure_type(payload, dict, "payload")
-        self._require_fields(payload, self._top_level_required, "payload")
-
-        self._validate_site(payload.get("site"))
-        self._validate_segments(payload.get("network_segments"))
-        self._validate_devices(payload.get("devices"))
-        self._validate_collected_at(payload.get("collected_at"))
-
-    def _validate_site(self, site: Any) -> None:
-        self._ensure_type(site, dict, "site")
-        self._require_fields(site, self._site_required, "site")
-        self._ensure_type(site.get("code"), str, "site.code")
-        self._ensure_type(site.get("name"), str, "site.name")
-        if "metadata" in site and not isinstance(site["metadata"], dict):
-            raise ValidationError("site.metadata must be an object")
-
-    def _validate_segments(self, segments: Any) -> None:
-        self._ensure_type(segments, list, "network_segments")
-        for index, segment in enumerate(segments):
-            path = f"network_segments[{index}]"
-            self._ensure_type(segment, dict, path)
-            self._require_fields(segment, self._segment_required, path)
-            self._ensure_type(segment.get("code"), str, f"{path}.code")
-            self._ensure_type(segment.get("name"), str, f"{path}.name")
-            if "metadata" in segment and not isinstance(segment["metadata"], dict):
-                raise ValidationError(f"{path}.metadata must be an object")
-
-    def _validate_devices(self, devices: Any) -> None:
-        self._ensure_type(devices, list, "devices")
-        for index, device in enumerate(devices):
-            path = f"devices[{index}]"
-            self._ensure_type(device, dict, path)
-            self._require_fields(device, self._device_required, path)
-            self._ensure_type(device.get("code"), str, f"{path}.code")
-            self._ensure_type(device.get("hostname"), str, f"{path}.hostname")
-            if "metadata" in device and not isinstance(device["metadata"], dict):
-                raise ValidationError(f"{path}.metadata must be an object")
-            if device.get("segment_code") is not None and not isinstance(
-                device["segment_code"], str
-            ):
-                raise ValidationError(f"{path}.segment_code must be a string")
-
-    def _validate_collected_at(self, value: Any) -> None:
-        self._ensure_type(value, str, "collected_at")
-        try:
-            datetime.fromisoformat(value.replace("Z", "+00:00"))
-        except ValueError as exc:  # pragma: no cover - defensive
-            raise ValidationError("collected_at must be an ISO-8601 timestamp") from exc
-
-    def _require_fields(self, container: dict[str, Any], required: set[str], path: str) -> None:
-        missing = sorted(field for field in required if field not in container)
-        if missing:
-            raise ValidationError(f"{path} missing required field(s): {', '.join(missing)}")
-
-    def _ensure_type(self, value: Any, expected: type, path: str) -> None:
-        if not isinstance(value, expected):
-            raise ValidationError(f"{path} must be of type {expected.__name__}")
+        if self._valid(payload):
+            return
+        failure = self._explain(payload)
+        if failure is None:  # pragma: no cover - the two compilers disagree
+            raise ValidationError("payload does not match the snapshot schema")
+        raise ValidationError(f"{failure.path()} {failure.message}")
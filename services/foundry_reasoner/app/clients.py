@@ -2,100 +2,346 @@
 
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
 
 import httpx
 
+from .resilience import ResilienceRegistry
 from .schemas import ScenarioPlan
 
+T = TypeVar("T")
 
-class OrchestratorClient:
-    """Client for the orchestrator service."""
 
-    def __init__(self, base_url: str = "http://orchestrator:8080") -> None:
+class ServiceClient:
+    """Base class routing calls through an optional :class:`ResilienceRegistry`.
+
+    With ``hedge=True`` the idempotent reads of a client (those calling
+    :meth:`_call` with ``idempotent=True``) are hedged at the endpoint's
+    observed tail latency; see :mod:`.resilience`.
+    """
+
+    service = "service"
+
+    def __init__(
+        self,
+        base_url: str,
+        *,
+        timeout: float = 5.0,
+        resilience: Optional[ResilienceRegistry] = None,
+        hedge: bool = False,
+    ) -> None:
         self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.resilience = resilience
+        self.hedge = hedge
+
+    async def _call(
+        self, endpoint: str, func: Callable[[float], Awaitable[T]], *, idempotent: bool = False
+    ) -> T:
+        """Invoke ``func(timeout)`` behind the service breaker, if configured."""
+
+        if self.resilience is None:
+            return await func(self.timeout)
+        return await self.resilience.call(
+            self.service,
+            f"{self.service}.{endpoint}",
+            func,
+            timeout=self.timeout,
+            hedge=self.hedge and idempotent,
+        )
+
+
+class OrchestratorClient(ServiceClient):
+    """Client for the orchestrator service."""
+
+    service = "orchestrator"
+
+    def __init__(
+        self,
+        base_url: str = "http://orchestrator:8080",
+        *,
+        resilience: Optional[ResilienceRegistry] = None,
+    ) -> None:
+        super().__init__(base_url, timeout=10.0, resilience=resilience)
 
     async def create_scenario(self, plan: ScenarioPlan) -> str:
         url = f"{self.base_url}/api/scenarios"
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            resp = await client.post(url, json=plan.dict())
-            resp.raise_for_status()
-            data = resp.json() if resp.content else {}
+
+        async def send(timeout: float) -> Dict[str, Any]:
+            async with httpx.AsyncClient(timeout=timeout) as client:
+                resp = await client.post(url, json=plan.dict())
+                resp.raise_for_status()
+                return resp.json() if resp.content else {}
+
+        data = await self._call("create_scenario", send)
         return str(data.get("id") or data.get("scenario_id") or "")
 
 
-class PerformanceEvaluatorClient:
+class PerformanceEvaluatorClient(ServiceClient):
     """Client for the performance evaluator service."""
 
-    def __init__(self, base_url: str = "http://performance_evaluator:8080") -> None:
-        self.base_url = base_url.rstrip("/")
+    service = "performance_evaluator"
+
+    def __init__(
+        self,
+        base_url: str = "http://performance_evaluator:8080",
+        *,
+        resilience: Optional[ResilienceRegistry] = None,
+    ) -> None:
+        super().__init__(base_url, resilience=resilience)
 
     async def evaluate(self, metrics: Dict[str, float]) -> float:
         if not metrics:
             return 50.0
         url = f"{self.base_url}/api/score"
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            resp = await client.post(url, json={"metrics": metrics})
-            resp.raise_for_status()
-            data = resp.json()
+
+        async def send(timeout: float) -> Dict[str, Any]:
+            async with httpx.AsyncClient(timeout=timeout) as client:
+                resp = await client.post(url, json={"metrics": metrics})
+                resp.raise_for_status()
+                return resp.json()
+
+        data = await self._call("evaluate", send)
         return float(data.get("score", 50.0))
 
 
-class DifficultyControllerClient:
+class DifficultyControllerClient(ServiceClient):
     """Client for difficulty adjustment decisions."""
 
-    def __init__(self, base_url: str = "http://difficulty_controller:8080") -> None:
-        self.base_url = base_url.rstrip("/")
+    service = "difficulty_controller"
+
+    def __init__(
+        self,
+        base_url: str = "http://difficulty_controller:8080",
+        *,
+        resilience: Optional[ResilienceRegistry] = None,
+    ) -> None:
+        super().__init__(base_url, resilience=resilience)
 
     async def adjust(self, current: str, score: float) -> Dict[str, Any]:
         url = f"{self.base_url}/api/difficulty"
         payload = {"current_difficulty": current, "score": score}
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            resp = await client.post(url, json=payload)
-            resp.raise_for_status()
-            data = resp.json()
-        return data
 
+        async def send(timeout: float) -> Dict[str, Any]:
+            async with httpx.AsyncClient(timeout=timeout) as client:
+                resp = await client.post(url, json=payload)
+                resp.raise_for_status()
+                return resp.json()
 
-class LeaderboardClient:
+        return await self._call("adjust", send)
+
+
+class LeaderboardClient(ServiceClient):
     """Client for publishing outcomes to the leaderboard service."""
 
-    def __init__(self, base_url: str = "http://leaderboard_service:8080") -> None:
-        self.base_url = base_url.rstrip("/")
+    service = "leaderboard"
+
+    def __init__(
+        self,
+        base_url: str = "http://leaderboard_service:8080",
+        *,
+        resilience: Optional[ResilienceRegistry] = None,
+        hedge: bool = False,
+    ) -> None:
+        super().__init__(base_url, resilience=resilience, hedge=hedge)
 
     async def publish(self, learner_id: Optional[str], score: float, difficulty: str, notes: str) -> None:
         if not learner_id:
             return
-        url = f"{self.base_url}/api/leaderboard"
-        payload = {
-            "learner_id": learner_id,
-            "score": score,
-            "difficulty": difficulty,
-            "notes": notes,
-        }
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            resp = await client.post(url, json=payload)
-            resp.raise_for_status()
+        await self.publish_many(
+            [
+                {
+                    "learner_id": learner_id,
+                    "score": score,
+                    "difficulty": difficulty,
+                    "notes": notes,
+                }
+            ]
+        )
+
+    async def publish_many(self, entries: List[Dict[str, Any]]) -> None:
+        """Publish several outcomes in one request.
+
+        The batch endpoint applies all entries or none, so a failed call can
+        be retried as a whole without re-posting entries that already landed.
+        """
+
+        url = f"{self.base_url}/api/leaderboard/batch"
+        entries = [entry for entry in entries if entry.get("learner_id")]
+        if not entries:
+            return
+
+        async def send(timeout: float) -> None:
+            async with httpx.AsyncClient(timeout=timeout) as client:
+                resp = await client.post(url, json=entries)
+                resp.raise_for_status()
+
+        await self._call("publish", send)
 
     async def top(self, limit: int = 10) -> List[Dict[str, Any]]:
         url = f"{self.base_url}/api/leaderboard"
         params = {"limit": limit}
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            resp = await client.get(url, params=params)
-            resp.raise_for_status()
-            data = resp.json()
+
+        async def send(timeout: float) -> Dict[str, Any]:
+            async with httpx.AsyncClient(timeout=timeout) as client:
+                resp = await client.get(url, params=params)
+                resp.raise_for_status()
+                return resp.json()
+
+        data = await self._call("top", send, idempotent=True)
         return list(data.get("entries", []))
 
 
-class OPAClient:
+class DecisionCache:
+    """TTL- and size-bounded LRU cache for OPA decisions.
+
+    Denials are cached with their own (usually shorter) TTL so a learner who
+    was just granted access is not locked out for the full positive TTL.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_entries: int = 1024,
+        ttl: float = 30.0,
+        negative_ttl: float = 5.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._clock = clock
+        self._entries: "OrderedDict[str, Tuple[bool, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key_for(payload: Dict[str, Any]) -> str:
+        canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[bool]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        allowed, expires_at = entry
+        if expires_at <= self._clock():
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return allowed
+
+    def put(self, key: str, allowed: bool) -> None:
+        ttl = self.ttl if allowed else self.negative_ttl
+        if ttl <= 0:
+            return
+        self._entries[key] = (allowed, self._clock() + ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self) -> None:
+        """Drop every cached decision, e.g. after policies are republished."""
+
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class OPAClient(ServiceClient):
     """OPA policy evaluation helper."""
 
-    def __init__(self, url: str = "http://opa:8181/v1/data/foundry/reasoner/allow") -> None:
+    service = "opa"
+
+    def __init__(
+        self,
+        url: str = "http://opa:8181/v1/data/foundry/reasoner/allow",
+        *,
+        cache: Optional[DecisionCache] = None,
+        resilience: Optional[ResilienceRegistry] = None,
+        hedge: bool = False,
+    ) -> None:
+        super().__init__(url, resilience=resilience, hedge=hedge)
         self.url = url
+        self.cache = cache
+        self._inflight: Dict[str, "asyncio.Future[bool]"] = {}
+        # Bumped by invalidate(); evaluations started under an older
+        # generation must not populate the cache or be shared.
+        self._generation = 0
 
     async def check(self, payload: Dict[str, Any]) -> bool:
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            resp = await client.post(self.url, json={"input": payload})
-            resp.raise_for_status()
-            data = resp.json()
+        if self.cache is None:
+            return await self._evaluate(payload)
+
+        key = DecisionCache.key_for(payload)
+        while True:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+            generation = self._generation
+            # Identical checks arriving in a burst share one round trip to OPA.
+            pending = self._inflight.get(key)
+            if pending is not None:
+                try:
+                    allowed = await asyncio.shield(pending)
+                except asyncio.CancelledError:
+                    # The leader was cancelled (e.g. its client went away),
+                    # not this check: start over, leading if nobody else does.
+                    if pending.cancelled() and not asyncio.current_task().cancelling():  # type: ignore[union-attr]
+                        continue
+                    raise
+            else:
+                allowed = await self._evaluate_shared(key, payload, generation)
+            if generation == self._generation:
+                return allowed
+            # Policies were republished while this check was in flight; the
+            # decision may be stale, so evaluate again.
+
+    async def _evaluate_shared(self, key: str, payload: Dict[str, Any], generation: int) -> bool:
+        future: "asyncio.Future[bool]" = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            allowed = await self._evaluate(payload)
+        except Exception as exc:
+            future.set_exception(exc)
+            # Mark the exception as retrieved when nobody else was waiting.
+            future.exception()
+            raise
+        else:
+            if generation == self._generation:
+                self.cache.put(key, allowed)  # type: ignore[union-attr]
+            future.set_result(allowed)
+            return allowed
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+            if not future.done():
+                future.cancel()
+
+    def invalidate(self) -> None:
+        self._generation += 1
+        # Checks arriving from now on must not join evaluations that started
+        # against the previous policies.
+        self._inflight.clear()
+        if self.cache is not None:
+            self.cache.invalidate()
+
+    async def _evaluate(self, payload: Dict[str, Any]) -> bool:
+        async def send(timeout: float) -> Dict[str, Any]:
+            async with httpx.AsyncClient(timeout=timeout) as client:
+                resp = await client.post(self.url, json={"input": payload})
+                resp.raise_for_status()
+                return resp.json()
+
+        data = await self._call("check", send, idempotent=True)
         return bool(data.get("result", False))
@@ -0,0 +1,134 @@
+"""Background consolidation of task memory.
+
+Every reasoning cycle persists one memory record, so without maintenance a
+task's memory (and the cost of retrieving from it) grows forever. The
+:class:`MemoryConsolidator` periodically walks every task, clusters
+near-duplicate records by cosine similarity, keeps the best-scoring
+representative of each cluster (capped at ``max_per_task``) and deletes the
+rest with one bulk call per task.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, List, Optional, Sequence, Tuple
+
+from .vector_store import MemoryRecord, TaskMemory, cosine_similarity
+
+logger = logging.getLogger(__name__)
+
+
+def _score(record: MemoryRecord) -> float:
+    try:
+        return float(record.metadata.get("score", 0.0))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def plan_consolidation(
+    entries: Sequence[Tuple[Any, MemoryRecord]],
+    *,
+    similarity: float = 0.95,
+    max_records: int = 50,
+) -> List[Any]:
+    """Return the keys of records superseded by a better near-duplicate.
+
+    Records are visited best score first; a record is kept unless it is at
+    least ``similarity`` close to one already kept. Only the ``max_records``
+    best representatives survive.
+    """
+
+    kept: List[List[float]] = []
+    superseded: List[Any] = []
+    for key, record in sorted(entries, key=lambda entry: _score(entry[1]), reverse=True):
+        vector = list(record.vector)
+        if len(kept) >= max_records or any(
+            cosine_similarity(vector, other) >= similarity for other in kept
+        ):
+            superseded.append(key)
+        else:
+            kept.append(vector)
+    return superseded
+
+
+@dataclass
+class ConsolidationReport:
+    """Outcome of one consolidation pass."""
+
+    tasks: int = 0
+    scanned: int = 0
+    deleted: int = 0
+
+
+class MemoryConsolidator:
+    """Periodically consolidate a :class:`TaskMemory` in the background."""
+
+    def __init__(
+        self,
+        memory: TaskMemory,
+        *,
+        similarity: float = 0.95,
+        max_per_task: int = 50,
+        interval: float = 300.0,
+    ) -> None:
+        self.memory = memory
+        self.similarity = similarity
+        self.max_per_task = max(1, max_per_task)
+        self.interval = interval
+        self.last_report: Optional[ConsolidationReport] = None
+        self._task: Optional[asyncio.Task[None]] = None
+
+    async def consolidate_task(self, task_id: str) -> Tuple[int, int]:
+        """Consolidate one task, returning ``(scanned, deleted)``."""
+
+        entries = await self.memory.scan(task_id)
+        superseded = plan_consolidation(
+            entries, similarity=self.similarity, max_records=self.max_per_task
+        )
+        if superseded:
+            await self.memory.delete_many(superseded)
+        return len(entries), len(superseded)
+
+    async def run_once(self) -> ConsolidationReport:
+        report = ConsolidationReport()
+        for task_id in await self.memory.task_ids():
+            scanned, deleted = await self.consolidate_task(task_id)
+            report.tasks += 1
+            report.scanned += scanned
+            report.deleted += deleted
+        self.last_report = report
+        logger.info(
+            "memory_consolidated tasks=%d scanned=%d deleted=%d",
+            report.tasks,
+            report.scanned,
+            report.deleted,
+        )
+        return report
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run_once()
+            except Exception:  # pragma: no cover - background safety net
+                logger.exception("memory_consolidation_failed")
+
+    def start(self) -> None:
+        """Start the periodic consolidation loop on the running event loop."""
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def close(self) -> None:
+        """Stop the background loop (an in-flight pass is cancelled)."""
+
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
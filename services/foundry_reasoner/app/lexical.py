@@ -0,0 +1,150 @@
+"""BM25 lexical prefiltering for local task-memory retrieval.
+
+Local retrieval used to compute a cosine similarity against every vector of
+a task. With hybrid retrieval a per-task BM25 inverted index over record
+content (and objectives) first picks ``HybridConfig.candidates`` lexical
+matches; cosine is computed only for those, and the final order blends both
+scores::
+
+    score = (1 - lexical_weight) * cosine + lexical_weight * bm25 / max_bm25
+
+When the lexical index yields fewer than ``top_k`` candidates (e.g. the
+query shares no terms with the task's memories) callers fall back to the
+full vector scan so purely semantic queries still work.
+"""
+
+from __future__ import annotations
+
+import heapq
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, Hashable, Iterable, List, Mapping, Optional, Tuple
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(text.lower())
+
+
+def memory_text(content: str, metadata: Optional[Mapping[str, object]] = None) -> str:
+    """Text indexed for a memory record: its content plus the objective."""
+
+    objective = (metadata or {}).get("objective")
+    return f"{content} {objective}" if objective else content
+
+
+@dataclass(frozen=True)
+class HybridConfig:
+    """How lexical candidates are gathered and blended with cosine scores."""
+
+    candidates: int = 64
+    lexical_weight: float = 0.3
+    k1: float = 1.2
+    b: float = 0.75
+
+
+class BM25Index:
+    """Incremental Okapi BM25 inverted index over documents keyed by ``key``."""
+
+    def __init__(self, *, k1: float = 1.2, b: float = 0.75) -> None:
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[Hashable, int]] = {}
+        self._terms: Dict[Hashable, List[str]] = {}
+        self._lengths: Dict[Hashable, int] = {}
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    def add(self, key: Hashable, text: str) -> None:
+        if key in self._lengths:
+            self.remove(key)
+        tokens = tokenize(text)
+        counts = Counter(tokens)
+        for term, count in counts.items():
+            self._postings.setdefault(term, {})[key] = count
+        self._terms[key] = list(counts)
+        self._lengths[key] = len(tokens)
+        self._total_length += len(tokens)
+
+    def remove(self, key: Hashable) -> None:
+        if key not in self._lengths:
+            return
+        for term in self._terms.pop(key):
+            postings = self._postings[term]
+            postings.pop(key, None)
+            if not postings:
+                del self._postings[term]
+        self._total_length -= self._lengths.pop(key)
+
+    def search(self, query: str, limit: int) -> List[Tuple[float, Hashable]]:
+        """Return up to ``limit`` ``(score, key)`` pairs, best first."""
+
+        count = len(self._lengths)
+        if not count or limit <= 0:
+            return []
+        average = (self._total_length / count) or 1.0
+        scores: Dict[Hashable, float] = {}
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1.0 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for key, frequency in postings.items():
+                norm = self.k1 * (1.0 - self.b + self.b * self._lengths[key] / average)
+                scores[key] = scores.get(key, 0.0) + idf * frequency * (self.k1 + 1.0) / (frequency + norm)
+        return heapq.nlargest(limit, ((score, key) for key, score in scores.items()), key=lambda item: item[0])
+
+
+class LexicalIndex:
+    """One :class:`BM25Index` per task id, built lazily by the owning store."""
+
+    def __init__(self, config: HybridConfig) -> None:
+        self.config = config
+        self._tasks: Dict[str, BM25Index] = {}
+
+    def has(self, task_id: str) -> bool:
+        return task_id in self._tasks
+
+    def build(self, task_id: str, documents: Iterable[Tuple[Hashable, str]]) -> None:
+        index = self._tasks[task_id] = BM25Index(k1=self.config.k1, b=self.config.b)
+        for key, text in documents:
+            index.add(key, text)
+
+    def add(self, task_id: str, key: Hashable, text: str) -> None:
+        index = self._tasks.get(task_id)
+        if index is not None:
+            index.add(key, text)
+
+    def remove(self, task_id: str, key: Hashable) -> None:
+        index = self._tasks.get(task_id)
+        if index is not None:
+            index.remove(key)
+
+    def clear(self) -> None:
+        self._tasks.clear()
+
+    def candidates(self, task_id: str, query: str) -> List[Tuple[float, Hashable]]:
+        index = self._tasks.get(task_id)
+        return index.search(query, self.config.candidates) if index is not None else []
+
+    def rank(
+        self,
+        lexical: List[Tuple[float, Hashable]],
+        cosine: Mapping[Hashable, float],
+        top_k: int,
+    ) -> List[Hashable]:
+        """Blend lexical and cosine scores of the candidates; best ``top_k`` keys."""
+
+        weight = self.config.lexical_weight
+        best = max((score for score, _ in lexical), default=0.0) or 1.0
+        blended = [
+            ((1.0 - weight) * cosine[key] + weight * score / best, key)
+            for score, key in lexical
+            if key in cosine
+        ]
+        return [key for _, key in heapq.nlargest(top_k, blended, key=lambda item: item[0])]
@@ -0,0 +1,428 @@
+"""Persistent on-disk task memory used when Qdrant is unreachable.
+
+The store is a directory holding append-only files:
+
+``records.jsonl``
+    One JSON payload (task id, content, metadata) per record.
+``vectors.f32``
+    Fixed-width little-endian float32 rows, memory-mapped for search.
+``vectors.i8`` (only with ``quantize=True``)
+    One row per record: a float32 scale followed by ``dimensions`` int8
+    values. Searches scan these 4x smaller rows and only touch the float32
+    file to rescore the best candidates and to return vectors. The float32
+    file is kept for that, so quantization adds ``dimensions + 4`` bytes per
+    record (about 27% more disk for 64 dimensions) rather than saving any.
+``index.bin``
+    One fixed-size entry per record: payload offset/length, a hash of the
+    task id and the vector norm. It is written last, so a record only becomes
+    visible once the other files contain it.
+``deleted.bin``
+    Row ids removed by :meth:`PersistentLocalMemory.delete` (uint64 each).
+
+Only the small index is read at startup (lazily, on first use). Searches scan
+the memory-mapped vectors of the requested task and decode payloads for the
+top-k hits only. With a :class:`~.lexical.HybridConfig` a per-task BM25 index
+(built from the payloads on the first search of a task) narrows the cosine
+scan to lexical candidates. Deleted rows are skipped until :meth:`compact` rewrites the
+directory without them.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import heapq
+import json
+import math
+import mmap
+import os
+import shutil
+import struct
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from .lexical import HybridConfig, LexicalIndex, memory_text
+from .vector_store import MemoryRecord
+
+_INDEX_ENTRY = struct.Struct("<QIQf")
+_SCALE = struct.Struct("<f")
+_ROW_ID = struct.Struct("<Q")
+
+
+def _task_hash(task_id: str) -> int:
+    return int.from_bytes(hashlib.blake2b(task_id.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def quantize_int8(values: Sequence[float]) -> Tuple[float, array]:
+    """Symmetric per-vector int8 quantization returning ``(scale, codes)``."""
+
+    peak = max((abs(value) for value in values), default=0.0)
+    if peak == 0.0:
+        return 0.0, array("b", bytes(len(values)))
+    scale = peak / 127.0
+    return scale, array("b", (max(-127, min(127, round(value / scale))) for value in values))
+
+
+class PersistentLocalMemory:
+    """Append-only record log plus memory-mapped (optionally int8) vectors."""
+
+    def __init__(
+        self,
+        path: str | Path,
+        *,
+        dimensions: int = 64,
+        quantize: bool = False,
+        rescore: bool = True,
+        oversampling: float = 2.0,
+        compact_ratio: float = 0.5,
+        hybrid: Optional[HybridConfig] = None,
+    ) -> None:
+        self.path = Path(path)
+        self.dimensions = dimensions
+        self.quantize = quantize
+        self.rescore = rescore
+        self.oversampling = max(1.0, oversampling)
+        self.compact_ratio = compact_ratio
+        self._lexical = LexicalIndex(hybrid) if hybrid is not None else None
+        self._row_bytes = 4 * dimensions
+        self._qrow_bytes = _SCALE.size + dimensions
+        self._loaded = False
+        self._rows: List[Tuple[int, int, int, float]] = []
+        self._rows_by_task: Dict[int, List[int]] = {}
+        self._deleted: Set[int] = set()
+        self._maps: Dict[Path, Tuple[mmap.mmap, int]] = {}
+
+    @property
+    def _records_path(self) -> Path:
+        return self.path / "records.jsonl"
+
+    @property
+    def _vectors_path(self) -> Path:
+        return self.path / "vectors.f32"
+
+    @property
+    def _quantized_path(self) -> Path:
+        return self.path / "vectors.i8"
+
+    @property
+    def _index_path(self) -> Path:
+        return self.path / "index.bin"
+
+    @property
+    def _deleted_path(self) -> Path:
+        return self.path / "deleted.bin"
+
+    @property
+    def _compact_path(self) -> Path:
+        return self.path.with_name(self.path.name + ".compact")
+
+    @property
+    def _retired_path(self) -> Path:
+        return self.path.with_name(self.path.name + ".retired")
+
+    # ------------------------------------------------------------------ loading
+    def _load(self) -> None:
+        if self._loaded:
+            return
+        compacted = self._compact_path
+        if compacted.exists():
+            if self.path.exists():
+                shutil.rmtree(compacted)  # compaction interrupted before the swap
+            else:
+                compacted.rename(self.path)  # interrupted during the swap
+        retired = self._retired_path
+        if retired.exists():
+            shutil.rmtree(retired)
+        self.path.mkdir(parents=True, exist_ok=True)
+        for file_path in (self._records_path, self._vectors_path, self._index_path, self._deleted_path):
+            file_path.touch(exist_ok=True)
+        raw = self._deleted_path.read_bytes()
+        self._deleted = {
+            _ROW_ID.unpack_from(raw, offset)[0]
+            for offset in range(0, len(raw) - _ROW_ID.size + 1, _ROW_ID.size)
+        }
+        raw = self._index_path.read_bytes()
+        vector_rows = self._vectors_path.stat().st_size // self._row_bytes
+        count = min(len(raw) // _INDEX_ENTRY.size, vector_rows)
+        for row_id in range(count):
+            self._add_row(_INDEX_ENTRY.unpack_from(raw, row_id * _INDEX_ENTRY.size))
+        if self.quantize:
+            self._backfill_quantized()
+        self._loaded = True
+
+    def _backfill_quantized(self) -> None:
+        """Quantize rows written before ``quantize`` was enabled (or lost in a crash)."""
+
+        self._quantized_path.touch(exist_ok=True)
+        have = self._quantized_path.stat().st_size // self._qrow_bytes
+        if have >= len(self._rows):
+            return
+        with self._vectors_path.open("rb") as source, self._quantized_path.open("r+b") as target:
+            source.seek(have * self._row_bytes)
+            target.seek(have * self._qrow_bytes)
+            for _ in range(have, len(self._rows)):
+                values = array("f")
+                values.frombytes(source.read(self._row_bytes))
+                target.write(self._encode_quantized(values))
+
+    def _add_row(self, entry: Tuple[int, int, int, float]) -> None:
+        row_id = len(self._rows)
+        self._rows.append(entry)
+        if row_id not in self._deleted:
+            self._rows_by_task.setdefault(entry[2], []).append(row_id)
+
+    def _view(self, file_path: Path) -> memoryview:
+        mapped = self._maps.get(file_path)
+        if mapped is None or mapped[1] < len(self._rows):
+            if mapped is not None:
+                mapped[0].close()
+            with file_path.open("rb") as handle:
+                mapped = (mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ), len(self._rows))
+            self._maps[file_path] = mapped
+        return memoryview(mapped[0])
+
+    def __len__(self) -> int:
+        self._load()
+        return len(self._rows) - len(self._deleted)
+
+    # ------------------------------------------------------------------ writing
+    def _fit(self, vector: Iterable[float]) -> array:
+        values = array("f", list(vector)[: self.dimensions])
+        if len(values) < self.dimensions:
+            values.extend([0.0] * (self.dimensions - len(values)))
+        return values
+
+    def _encode_quantized(self, values: Sequence[float]) -> bytes:
+        scale, codes = quantize_int8(values)
+        return _SCALE.pack(scale) + codes.tobytes()
+
+    def append(self, record: MemoryRecord) -> None:
+        self._load()
+        values = self._fit(record.vector)
+        norm = math.sqrt(sum(value * value for value in values))
+        line = json.dumps(
+            {"task_id": record.task_id, "content": record.content, "metadata": record.metadata},
+            default=str,
+        ).encode("utf-8") + b"\n"
+
+        row_id = len(self._rows)
+        with self._records_path.open("ab") as handle:
+            offset = handle.tell()
+            handle.write(line)
+        with self._vectors_path.open("r+b") as handle:
+            handle.seek(row_id * self._row_bytes)
+            handle.write(values.tobytes())
+        if self.quantize:
+            with self._quantized_path.open("r+b") as handle:
+                handle.seek(row_id * self._qrow_bytes)
+                handle.write(self._encode_quantized(values))
+        entry = (offset, len(line), _task_hash(record.task_id), norm)
+        with self._index_path.open("r+b") as handle:
+            handle.seek(row_id * _INDEX_ENTRY.size)
+            handle.write(_INDEX_ENTRY.pack(*entry))
+            handle.flush()
+            os.fsync(handle.fileno())
+        self._add_row(entry)
+        if self._lexical is not None:
+            self._lexical.add(record.task_id, row_id, memory_text(record.content, record.metadata))
+
+    def extend(self, records: Iterable[MemoryRecord]) -> None:
+        for record in records:
+            self.append(record)
+
+    # ------------------------------------------------------------------ reading
+    def _read_payload(self, row_id: int) -> dict:
+        offset, length, _, _ = self._rows[row_id]
+        with self._records_path.open("rb") as handle:
+            handle.seek(offset)
+            return json.loads(handle.read(length))
+
+    def _vector(self, view: memoryview, row_id: int) -> memoryview:
+        start = row_id * self._row_bytes
+        return view[start : start + self._row_bytes].cast("f")
+
+    def _exact_scores(self, rows: Iterable[int], query: array, query_norm: float) -> List[Tuple[float, int]]:
+        view = self._view(self._vectors_path)
+        scored: List[Tuple[float, int]] = []
+        for row_id in rows:
+            norm = self._rows[row_id][3]
+            if norm == 0.0:
+                continue
+            dot = sum(map(float.__mul__, self._vector(view, row_id), query))
+            scored.append((dot / (norm * query_norm), row_id))
+        return scored
+
+    def _quantized_scores(self, rows: Iterable[int], query: array, query_norm: float) -> List[Tuple[float, int]]:
+        query_scale, query_codes = quantize_int8(query)
+        view = self._view(self._quantized_path)
+        scored: List[Tuple[float, int]] = []
+        for row_id in rows:
+            norm = self._rows[row_id][3]
+            if norm == 0.0:
+                continue
+            start = row_id * self._qrow_bytes
+            (scale,) = _SCALE.unpack_from(view, start)
+            codes = view[start + _SCALE.size : start + self._qrow_bytes].cast("b")
+            dot = sum(map(int.__mul__, codes, query_codes)) * scale * query_scale
+            scored.append((dot / (norm * query_norm), row_id))
+        return scored
+
+    def _lexical_candidates(self, task_id: str, rows: List[int], query_text: str) -> List[Tuple[float, int]]:
+        assert self._lexical is not None
+        if not self._lexical.has(task_id):
+            documents = []
+            for row_id in rows:
+                payload = self._read_payload(row_id)
+                if payload.get("task_id") == task_id:
+                    documents.append((row_id, memory_text(payload.get("content", ""), payload.get("metadata"))))
+            self._lexical.build(task_id, documents)
+        return self._lexical.candidates(task_id, query_text)
+
+    def search(
+        self,
+        task_id: str,
+        query_vector: Iterable[float],
+        top_k: int,
+        *,
+        query_text: Optional[str] = None,
+    ) -> List[MemoryRecord]:
+        self._load()
+        candidates = self._rows_by_task.get(_task_hash(task_id))
+        if not candidates or top_k <= 0:
+            return []
+        query = self._fit(query_vector)
+        query_norm = math.sqrt(sum(value * value for value in query))
+        if query_norm == 0.0:
+            return []
+
+        if self._lexical is not None and query_text:
+            lexical = self._lexical_candidates(task_id, candidates, query_text)
+            if len(lexical) >= top_k:
+                rows = [row_id for _, row_id in lexical]
+                cosine = {row_id: score for score, row_id in self._exact_scores(rows, query, query_norm)}
+                best = self._lexical.rank(lexical, cosine, top_k)
+                return [record for _, record in self._materialise(task_id, best)]
+
+        if self.quantize:
+            scored = self._quantized_scores(candidates, query, query_norm)
+            if self.rescore:
+                shortlist = heapq.nlargest(math.ceil(top_k * self.oversampling), scored)
+                scored = self._exact_scores((row_id for _, row_id in shortlist), query, query_norm)
+        else:
+            scored = self._exact_scores(candidates, query, query_norm)
+
+        best = [row_id for _, row_id in heapq.nlargest(top_k, scored)]
+        return [record for _, record in self._materialise(task_id, best)]
+
+    def _materialise(self, task_id: str, rows: Iterable[int]) -> List[Tuple[int, MemoryRecord]]:
+        view = self._view(self._vectors_path)
+        results: List[Tuple[int, MemoryRecord]] = []
+        for row_id in rows:
+            payload = self._read_payload(row_id)
+            if payload.get("task_id") != task_id:
+                continue  # 64-bit task hash collision
+            record = MemoryRecord(
+                task_id=task_id,
+                content=payload.get("content", ""),
+                vector=list(self._vector(view, row_id)),
+                metadata=payload.get("metadata") or {},
+            )
+            results.append((row_id, record))
+        return results
+
+    # ------------------------------------------------------------ maintenance
+    def task_ids(self) -> List[str]:
+        """Return the distinct task ids with live records."""
+
+        self._load()
+        task_ids: Set[str] = set()
+        for rows in self._rows_by_task.values():
+            if rows:
+                task_ids.add(self._read_payload(rows[0])["task_id"])
+                # Hash collisions are vanishingly rare; pick them up anyway.
+                if len(rows) > 1:
+                    task_ids.update(self._read_payload(row_id)["task_id"] for row_id in rows[1:])
+        return sorted(task_ids)
+
+    def rows_for(self, task_id: str) -> List[Tuple[int, MemoryRecord]]:
+        """Return ``(row_id, record)`` for every live record of ``task_id``."""
+
+        self._load()
+        return self._materialise(task_id, list(self._rows_by_task.get(_task_hash(task_id), ())))
+
+    def delete(self, row_ids: Iterable[int]) -> int:
+        """Tombstone ``row_ids``; compacts once deleted rows pass ``compact_ratio``."""
+
+        self._load()
+        fresh = sorted({row_id for row_id in row_ids if 0 <= row_id < len(self._rows)} - self._deleted)
+        if not fresh:
+            return 0
+        with self._deleted_path.open("ab") as handle:
+            handle.write(b"".join(_ROW_ID.pack(row_id) for row_id in fresh))
+            handle.flush()
+            os.fsync(handle.fileno())
+        self._deleted.update(fresh)
+        for row_id in fresh:
+            self._rows_by_task[self._rows[row_id][2]].remove(row_id)
+            if self._lexical is not None:
+                self._lexical.remove(self._read_payload(row_id).get("task_id", ""), row_id)
+        if len(self._deleted) >= self.compact_ratio * len(self._rows):
+            self.compact()
+        return len(fresh)
+
+    def compact(self) -> None:
+        """Rewrite the store without deleted rows.
+
+        The live rows are copied into a sibling ``<name>.compact`` directory
+        which then replaces the original; :meth:`_load` finishes or discards
+        an interrupted swap.
+        """
+
+        self._load()
+        if not self._deleted:
+            return
+        target = self._compact_path
+        if target.exists():
+            shutil.rmtree(target)
+        fresh = PersistentLocalMemory(target, dimensions=self.dimensions, quantize=self.quantize)
+        fresh._load()
+        view = self._view(self._vectors_path)
+        with self._records_path.open("rb") as records, fresh._records_path.open("ab") as out_records, \
+                fresh._vectors_path.open("ab") as out_vectors, fresh._index_path.open("ab") as out_index:
+            for row_id, (offset, length, task_hash, norm) in enumerate(self._rows):
+                if row_id in self._deleted:
+                    continue
+                records.seek(offset)
+                new_offset = out_records.tell()
+                out_records.write(records.read(length))
+                start = row_id * self._row_bytes
+                out_vectors.write(view[start : start + self._row_bytes])
+                out_index.write(_INDEX_ENTRY.pack(new_offset, length, task_hash, norm))
+            for handle in (out_records, out_vectors, out_index):
+                handle.flush()
+                os.fsync(handle.fileno())
+        del view
+        fresh.close()
+        if self.quantize:
+            fresh._loaded = False
+            fresh._load()  # backfills vectors.i8 for the rewritten rows
+            fresh.close()
+
+        self.close()
+        retired = self._retired_path
+        if retired.exists():
+            shutil.rmtree(retired)
+        self.path.rename(retired)
+        target.rename(self.path)
+        shutil.rmtree(retired)
+        self._loaded = False
+        self._rows = []
+        self._rows_by_task = {}
+        self._deleted = set()
+        if self._lexical is not None:
+            self._lexical.clear()
+
+    def close(self) -> None:
+        for mapped, _ in self._maps.values():
+            mapped.close()
+        self._maps.clear()
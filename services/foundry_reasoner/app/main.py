@@ -3,21 +3,32 @@
 from __future__ import annotations
 
 import functools
-from typing import AsyncGenerator
+import hmac
+import json
+from contextlib import asynccontextmanager
+from typing import Any, AsyncGenerator, AsyncIterator, Dict
 
 from fastapi import Depends, FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from pydantic_settings import BaseSettings
 
 from .clients import (
+    DecisionCache,
     DifficultyControllerClient,
     LeaderboardClient,
     OPAClient,
     OrchestratorClient,
     PerformanceEvaluatorClient,
 )
-from .reasoning import ReasoningDenied, ReasoningEngine
+from .consolidation import MemoryConsolidator
+from .lexical import HybridConfig
+from .reasoning import ReasoningDenied, ReasoningEngine, build_side_effect_handlers
+from .resilience import CircuitOpenError, ResilienceRegistry
 from .schemas import ReasoningRequest, ReasoningResponse
+from .tracing import StageTracer, build_otlp_tracer, install_correlation_middleware
 from .vector_store import QdrantTaskMemory
+from .write_behind import WriteBehindQueue
 
 
 class Settings(BaseSettings):
@@ -26,16 +37,73 @@ class Settings(BaseSettings):
     difficulty_controller_url: str = "http://difficulty_controller:8080"
     leaderboard_service_url: str = "http://leaderboard_service:8080"
     opa_url: str = "http://opa:8181/v1/data/foundry/reasoner/allow"
+    opa_cache_enabled: bool = True
+    opa_cache_ttl: float = 30.0
+    opa_cache_negative_ttl: float = 5.0
+    opa_cache_size: int = 1024
+    # Bearer token required by POST /api/policies/invalidate; the endpoint is
+    # disabled while it is empty.
+    policy_admin_token: str = ""
     qdrant_url: str = "http://qdrant:6333"
     qdrant_collection: str = "task_memory"
+    qdrant_batch_size: int = 32
+    qdrant_flush_interval: float = 0.25
+    local_memory_path: str = "data/task_memory"
+    vector_quantization: str = ""
+    quantization_rescore: bool = True
+    quantization_oversampling: float = 2.0
+    hybrid_retrieval_enabled: bool = True
+    hybrid_candidates: int = 64
+    hybrid_lexical_weight: float = 0.3
+    breaker_failure_threshold: int = 5
+    breaker_reset_timeout: float = 10.0
+    adaptive_timeout_min: float = 0.5
+    adaptive_timeout_multiplier: float = 3.0
+    hedging_enabled: bool = True
+    hedge_percentile: float = 95.0
+    hedge_budget: float = 0.1
+    otlp_traces_endpoint: str = ""
+    write_behind_enabled: bool = True
+    write_behind_path: str = "data/reasoner_write_behind.sqlite3"
+    write_behind_batch_size: int = 50
+    write_behind_flush_interval: float = 0.5
+    write_behind_max_attempts: int = 5
+    consolidation_enabled: bool = True
+    consolidation_interval: float = 300.0
+    consolidation_similarity: float = 0.95
+    consolidation_max_per_task: int = 50
 
     class Config:
         env_prefix = "FOUNDRY_REASONER_"
         case_sensitive = False
 
 
-app = FastAPI(title="foundry_reasoner")
+@asynccontextmanager
+async def _lifespan(_: FastAPI) -> AsyncIterator[None]:
+    global _consolidator, _side_effects, _task_memory
+    side_effects = get_side_effects()
+    if side_effects is not None:
+        side_effects.start()
+    consolidator = get_consolidator()
+    if consolidator is not None:
+        consolidator.start()
+    yield
+    if _consolidator is not None:
+        await _consolidator.close()
+        _consolidator = None
+    if _side_effects is not None:
+        await _side_effects.close()
+        _side_effects = None
+    if _task_memory is not None:
+        await _task_memory.close()
+        _task_memory = None
+
+
+app = FastAPI(title="foundry_reasoner", lifespan=_lifespan)
+install_correlation_middleware(app)
 _task_memory: QdrantTaskMemory | None = None
+_side_effects: WriteBehindQueue | None = None
+_consolidator: MemoryConsolidator | None = None
 
 
 @functools.lru_cache()
@@ -43,6 +111,48 @@ def get_settings() -> Settings:
     return Settings()
 
 
+@functools.lru_cache()
+def get_resilience() -> ResilienceRegistry:
+    settings = get_settings()
+    return ResilienceRegistry(
+        failure_threshold=settings.breaker_failure_threshold,
+        reset_timeout=settings.breaker_reset_timeout,
+        min_timeout=settings.adaptive_timeout_min,
+        timeout_multiplier=settings.adaptive_timeout_multiplier,
+        hedge_percentile=settings.hedge_percentile,
+        hedge_budget=settings.hedge_budget,
+    )
+
+
+@functools.lru_cache()
+def get_tracer() -> StageTracer:
+    endpoint = get_settings().otlp_traces_endpoint
+    return StageTracer(otel_tracer=build_otlp_tracer(endpoint) if endpoint else None)
+
+
+@functools.lru_cache()
+def get_opa_cache() -> DecisionCache | None:
+    settings = get_settings()
+    if not settings.opa_cache_enabled:
+        return None
+    return DecisionCache(
+        max_entries=settings.opa_cache_size,
+        ttl=settings.opa_cache_ttl,
+        negative_ttl=settings.opa_cache_negative_ttl,
+    )
+
+
+@functools.lru_cache()
+def get_opa_client() -> OPAClient:
+    settings = get_settings()
+    return OPAClient(
+        settings.opa_url,
+        cache=get_opa_cache(),
+        resilience=get_resilience(),
+        hedge=settings.hedging_enabled,
+    )
+
+
 def get_task_memory() -> QdrantTaskMemory:
     global _task_memory
     if _task_memory is None:
@@ -50,19 +160,78 @@ def get_task_memory() -> QdrantTaskMemory:
         _task_memory = QdrantTaskMemory(
             base_url=settings.qdrant_url,
             collection=settings.qdrant_collection,
+            batch_size=settings.qdrant_batch_size,
+            flush_interval=settings.qdrant_flush_interval,
+            local_path=settings.local_memory_path or None,
+            resilience=get_resilience(),
+            hedge=settings.hedging_enabled,
+            quantization=settings.vector_quantization or None,
+            rescore=settings.quantization_rescore,
+            oversampling=settings.quantization_oversampling,
+            hybrid=(
+                HybridConfig(
+                    candidates=settings.hybrid_candidates,
+                    lexical_weight=settings.hybrid_lexical_weight,
+                )
+                if settings.hybrid_retrieval_enabled
+                else None
+            ),
         )
     return _task_memory
 
 
+def get_side_effects() -> WriteBehindQueue | None:
+    global _side_effects
+    settings = get_settings()
+    if not settings.write_behind_enabled:
+        return None
+    if _side_effects is None:
+        _side_effects = WriteBehindQueue(
+            build_side_effect_handlers(
+                get_task_memory(),
+                LeaderboardClient(settings.leaderboard_service_url, resilience=get_resilience()),
+            ),
+            settings.write_behind_path,
+            batch_size=settings.write_behind_batch_size,
+            flush_interval=settings.write_behind_flush_interval,
+            max_attempts=settings.write_behind_max_attempts,
+        )
+    return _side_effects
+
+
+def get_consolidator() -> MemoryConsolidator | None:
+    global _consolidator
+    settings = get_settings()
+    if not settings.consolidation_enabled:
+        return None
+    if _consolidator is None:
+        _consolidator = MemoryConsolidator(
+            get_task_memory(),
+            similarity=settings.consolidation_similarity,
+            max_per_task=settings.consolidation_max_per_task,
+            interval=settings.consolidation_interval,
+        )
+    return _consolidator
+
+
 def build_engine() -> ReasoningEngine:
     settings = get_settings()
+    resilience = get_resilience()
     return ReasoningEngine(
-        opa_client=OPAClient(settings.opa_url),
-        orchestrator_client=OrchestratorClient(settings.orchestrator_url),
+        opa_client=get_opa_client(),
+        orchestrator_client=OrchestratorClient(settings.orchestrator_url, resilience=resilience),
         task_memory=get_task_memory(),
-        performance_client=PerformanceEvaluatorClient(settings.performance_evaluator_url),
-        difficulty_client=DifficultyControllerClient(settings.difficulty_controller_url),
-        leaderboard_client=LeaderboardClient(settings.leaderboard_service_url),
+        performance_client=PerformanceEvaluatorClient(
+            settings.performance_evaluator_url, resilience=resilience
+        ),
+        difficulty_client=DifficultyControllerClient(
+            settings.difficulty_controller_url, resilience=resilience
+        ),
+        leaderboard_client=LeaderboardClient(
+            settings.leaderboard_service_url, resilience=resilience, hedge=settings.hedging_enabled
+        ),
+        side_effects=get_side_effects(),
+        tracer=get_tracer(),
     )
 
 
@@ -85,6 +254,32 @@ async def ready() -> dict:
     return {"status": "ready"}
 
 
+@app.get("/metrics")
+async def metrics() -> dict:
+    return {**get_resilience().snapshot(), "stages": get_tracer().snapshot()}
+
+
+_admin_bearer = HTTPBearer(auto_error=False)
+
+
+def require_policy_admin(
+    credentials: HTTPAuthorizationCredentials | None = Depends(_admin_bearer),
+) -> None:
+    expected = get_settings().policy_admin_token
+    if not expected:
+        raise HTTPException(status_code=403, detail="Policy administration is disabled")
+    if credentials is None or not hmac.compare_digest(credentials.credentials, expected):
+        raise HTTPException(status_code=401, detail="Invalid policy admin token")
+
+
+@app.post("/api/policies/invalidate", dependencies=[Depends(require_policy_admin)])
+async def invalidate_policy_cache() -> dict:
+    """Hook called after policy bundles are republished to OPA."""
+
+    get_opa_client().invalidate()
+    return {"status": "invalidated"}
+
+
 @app.post("/api/reason", response_model=ReasoningResponse)
 async def reason(
     request: ReasoningRequest, engine: ReasoningEngine = Depends(get_engine)
@@ -93,7 +288,44 @@ async def reason(
         return await engine.run_reasoning_cycle(request)
     except ReasoningDenied as exc:
         raise HTTPException(status_code=403, detail=str(exc)) from exc
+    except CircuitOpenError as exc:
+        raise HTTPException(status_code=503, detail=str(exc)) from exc
     except HTTPException:
         raise
     except Exception as exc:  # pragma: no cover - defensive path
         raise HTTPException(status_code=500, detail=str(exc)) from exc
+
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+@app.post("/api/reason/stream")
+async def reason_stream(
+    request: ReasoningRequest, engine: ReasoningEngine = Depends(get_engine)
+) -> StreamingResponse:
+    """Server-sent events variant of ``/api/reason``.
+
+    Progress events (``memory_context``, ``scenario``, ``score``,
+    ``difficulty``) are sent as soon as each stage finishes, followed by a
+    ``result`` event with the full response. Failures after the stream has
+    started are reported as an ``error`` event carrying the status code the
+    blocking endpoint would have returned.
+    """
+
+    async def events() -> AsyncIterator[str]:
+        try:
+            async for event, data in engine.stream_reasoning_cycle(request):
+                yield _sse(event, data)
+        except ReasoningDenied as exc:
+            yield _sse("error", {"status": 403, "detail": str(exc)})
+        except CircuitOpenError as exc:
+            yield _sse("error", {"status": 503, "detail": str(exc)})
+        except Exception as exc:  # pragma: no cover - defensive path
+            yield _sse("error", {"status": 500, "detail": str(exc)})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
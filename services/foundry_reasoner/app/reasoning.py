@@ -2,8 +2,9 @@
 
 from __future__ import annotations
 
+import asyncio
 import datetime as dt
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
 
 from .clients import (
     DifficultyControllerClient,
@@ -14,7 +15,15 @@ from .clients import (
 )
 from .embedding import embed_text
 from .schemas import MemoryRecordPayload, ReasoningRequest, ReasoningResponse, ScenarioPlan
+from .tracing import StageTracer
 from .vector_store import MemoryRecord, TaskMemory
+from .write_behind import BatchHandler, WriteBehindQueue
+
+MEMORY_JOB = "memory"
+LEADERBOARD_JOB = "leaderboard"
+
+
+ProgressCallback = Callable[[str, Dict[str, Any]], None]
 
 
 class ReasoningDenied(Exception):
@@ -33,6 +42,8 @@ class ReasoningEngine:
         performance_client: PerformanceEvaluatorClient,
         difficulty_client: DifficultyControllerClient,
         leaderboard_client: LeaderboardClient,
+        side_effects: Optional[WriteBehindQueue] = None,
+        tracer: Optional[StageTracer] = None,
     ) -> None:
         self.opa_client = opa_client
         self.orchestrator_client = orchestrator_client
@@ -40,24 +51,72 @@ class ReasoningEngine:
         self.performance_client = performance_client
         self.difficulty_client = difficulty_client
         self.leaderboard_client = leaderboard_client
+        self.side_effects = side_effects
+        self.tracer = tracer or StageTracer()
 
     async def run_reasoning_cycle(self, request: ReasoningRequest) -> ReasoningResponse:
         """Execute the end-to-end reasoning workflow."""
 
-        opa_allowed = await self.opa_client.check(
-            {
-                "task_id": request.task_id,
-                "learner_id": request.learner_id,
-                "objective": request.objective,
-                "context": request.context,
-            }
-        )
+        with self.tracer.cycle():
+            return await self._run_stages(request)
+
+    async def stream_reasoning_cycle(
+        self, request: ReasoningRequest
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """Run a reasoning cycle, yielding ``(event, data)`` as stages complete.
+
+        Emits ``memory_context``, ``scenario``, ``score`` and ``difficulty``
+        progress events followed by a final ``result`` event carrying the full
+        :class:`ReasoningResponse`. Exceptions propagate after the events
+        emitted so far have been yielded.
+        """
+
+        events: "asyncio.Queue[Tuple[str, Dict[str, Any]]]" = asyncio.Queue()
+
+        async def run() -> ReasoningResponse:
+            with self.tracer.cycle():
+                return await self._run_stages(request, progress=lambda *event: events.put_nowait(event))
+
+        task = asyncio.ensure_future(run())
+        try:
+            while not task.done() or not events.empty():
+                getter = asyncio.ensure_future(events.get())
+                await asyncio.wait({getter, task}, return_when=asyncio.FIRST_COMPLETED)
+                if getter.done():
+                    yield getter.result()
+                else:
+                    getter.cancel()
+            response = task.result()
+        finally:
+            if not task.done():
+                task.cancel()
+        yield "result", response.model_dump()
+
+    async def _run_stages(
+        self, request: ReasoningRequest, progress: Optional[ProgressCallback] = None
+    ) -> ReasoningResponse:
+        span = self.tracer.span
+
+        def emit(event: str, data: Dict[str, Any]) -> None:
+            if progress is not None:
+                progress(event, data)
+
+        with span("opa_check"):
+            opa_allowed = await self.opa_client.check(
+                {
+                    "task_id": request.task_id,
+                    "learner_id": request.learner_id,
+                    "objective": request.objective,
+                    "context": request.context,
+                }
+            )
         if not opa_allowed:
             raise ReasoningDenied("OPA denied reasoning request")
 
-        memory_records = await self.task_memory.retrieve(
-            request.task_id, request.objective or "generic"
-        )
+        with span("memory_retrieve"):
+            memory_records = await self.task_memory.retrieve(
+                request.task_id, request.objective or "generic"
+            )
         memory_payloads = [
             MemoryRecordPayload(
                 task_id=record.task_id,
@@ -67,31 +126,41 @@ class ReasoningEngine:
             )
             for record in memory_records
         ]
+        emit("memory_context", {"memory_context": [item.model_dump() for item in memory_payloads]})
 
-        plan = self._build_plan(request, memory_payloads)
-        scenario_id = await self.orchestrator_client.create_scenario(plan)
+        with span("plan_build"):
+            plan = self._build_plan(request, memory_payloads)
+        with span("scenario_create"):
+            scenario_id = await self.orchestrator_client.create_scenario(plan)
+        emit("scenario", {"scenario_id": scenario_id, "plan": plan.name})
 
-        score = await self.performance_client.evaluate(request.performance_metrics)
-        difficulty_data = await self.difficulty_client.adjust(
-            current=request.context.get("difficulty", "medium"), score=score
-        )
+        with span("evaluate"):
+            score = await self.performance_client.evaluate(request.performance_metrics)
+        emit("score", {"score": score})
+        with span("adjust"):
+            difficulty_data = await self.difficulty_client.adjust(
+                current=request.context.get("difficulty", "medium"), score=score
+            )
         difficulty = str(difficulty_data.get("difficulty", "medium"))
         recommendations = difficulty_data.get("recommendations") or []
+        emit("difficulty", {"difficulty": difficulty, "recommendations": recommendations})
 
-        await self.leaderboard_client.publish(
-            request.learner_id,
-            score,
-            difficulty,
-            notes=f"Scenario {scenario_id} executed on {dt.datetime.now(dt.timezone.utc).isoformat()}",
-        )
+        with span("publish"):
+            await self._publish_outcome(
+                request.learner_id,
+                score,
+                difficulty,
+                notes=f"Scenario {scenario_id} executed on {dt.datetime.now(dt.timezone.utc).isoformat()}",
+            )
 
-        await self._persist_memory(
-            request=request,
-            scenario_id=scenario_id,
-            score=score,
-            difficulty=difficulty,
-            recommendations=recommendations,
-        )
+        with span("persist"):
+            await self._persist_memory(
+                request=request,
+                scenario_id=scenario_id,
+                score=score,
+                difficulty=difficulty,
+                recommendations=recommendations,
+            )
 
         decision_summary = self._summarise_decision(plan, score, difficulty)
 
@@ -127,6 +196,23 @@ class ReasoningEngine:
             instructions=instructions,
         )
 
+    async def _publish_outcome(
+        self, learner_id: Optional[str], score: float, difficulty: str, notes: str
+    ) -> None:
+        if self.side_effects is None:
+            await self.leaderboard_client.publish(learner_id, score, difficulty, notes=notes)
+            return
+        if learner_id:
+            self.side_effects.submit(
+                LEADERBOARD_JOB,
+                {
+                    "learner_id": learner_id,
+                    "score": score,
+                    "difficulty": difficulty,
+                    "notes": notes,
+                },
+            )
+
     async def _persist_memory(
         self,
         *,
@@ -151,6 +237,9 @@ class ReasoningEngine:
             vector=vector,
             metadata=metadata,
         )
+        if self.side_effects is not None:
+            self.side_effects.submit(MEMORY_JOB, memory_record_to_dict(record))
+            return
         await self.task_memory.store(record)
 
     def _summarise_decision(
@@ -160,3 +249,35 @@ class ReasoningEngine:
             f"Submitted plan '{plan.name}' using template {plan.template}. "
             f"Score {score:.1f} led to difficulty '{difficulty}'."
         )
+
+
+def memory_record_to_dict(record: MemoryRecord) -> Dict[str, Any]:
+    return {
+        "task_id": record.task_id,
+        "content": record.content,
+        "vector": list(record.vector),
+        "metadata": dict(record.metadata),
+    }
+
+
+def memory_record_from_dict(data: Dict[str, Any]) -> MemoryRecord:
+    return MemoryRecord(
+        task_id=data["task_id"],
+        content=data["content"],
+        vector=data["vector"],
+        metadata=data.get("metadata") or {},
+    )
+
+
+def build_side_effect_handlers(
+    task_memory: TaskMemory, leaderboard_client: LeaderboardClient
+) -> Dict[str, BatchHandler]:
+    """Return write-behind handlers flushing reasoning side effects in batches."""
+
+    async def persist_memory(payloads: List[Dict[str, Any]]) -> None:
+        await task_memory.store_many([memory_record_from_dict(payload) for payload in payloads])
+
+    async def publish_leaderboard(payloads: List[Dict[str, Any]]) -> None:
+        await leaderboard_client.publish_many(payloads)
+
+    return {MEMORY_JOB: persist_memory, LEADERBOARD_JOB: publish_leaderboard}
@@ -0,0 +1,311 @@
+"""Circuit breakers and adaptive timeouts shared by the reasoner's clients.
+
+Every downstream call goes through :meth:`ResilienceRegistry.call`, which
+
+* rejects the call immediately with :class:`CircuitOpenError` while the
+  service's breaker is open, so an outage costs a dictionary lookup instead of
+  a full HTTP timeout;
+* lets a single probe through once ``reset_timeout`` has elapsed (half-open)
+  and closes the breaker again when it succeeds;
+* derives the timeout for each endpoint from its observed p99 latency,
+  clamped between ``min_timeout`` and the client's configured timeout.
+  Failed and timed-out calls feed the latency window too, so a service that
+  becomes slower raises its own timeout instead of timing out forever, and
+  the half-open probe always gets the full configured timeout.
+
+Breakers are keyed by service (``"qdrant"``), latency statistics by endpoint
+(``"qdrant.search"``).
+
+Idempotent reads can ask for hedging (``call(..., hedge=True)``): when the
+first attempt has not answered after the endpoint's observed
+``hedge_percentile`` latency, a second attempt is sent and whichever succeeds
+first wins, the other being cancelled. Hedges are capped at ``hedge_budget``
+of an endpoint's calls so a slow service does not see its load doubled.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterable, Optional, TypeVar
+
+import httpx
+
+T = TypeVar("T")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because the service breaker is open."""
+
+    def __init__(self, service: str) -> None:
+        super().__init__(f"Circuit open for {service}")
+        self.service = service
+
+
+def percentile(samples: Iterable[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of ``samples`` (``None`` when empty)."""
+
+    ordered = sorted(samples)
+    if not ordered:
+        return None
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def is_service_failure(exc: BaseException) -> bool:
+    """Return ``True`` for errors that indicate an unhealthy downstream service."""
+
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code >= 500
+    return isinstance(exc, (httpx.RequestError, TimeoutError))
+
+
+class LatencyTracker:
+    """Rolling window of call latencies for one endpoint."""
+
+    def __init__(self, window: int = 256) -> None:
+        self._samples: Deque[float] = deque(maxlen=window)
+        self.calls = 0
+        self.failures = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def observe(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        return percentile(self._samples, pct)
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with half-open probing."""
+
+    def __init__(
+        self,
+        *,
+        failure_threshold: int = 5,
+        reset_timeout: float = 10.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.rejected = 0
+        self._probe_in_flight = False
+
+    def allow(self) -> bool:
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and self.opened_at is not None:
+            if self._clock() - self.opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+        if self.state == HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        self.rejected += 1
+        return False
+
+    def record_success(self) -> None:
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self.state = OPEN
+            self.opened_at = self._clock()
+        self._probe_in_flight = False
+
+    def release(self) -> None:
+        """Forget an in-flight probe that ended without a verdict."""
+
+        self._probe_in_flight = False
+
+
+class ResilienceRegistry:
+    """Per-service breakers and per-endpoint adaptive timeouts."""
+
+    def __init__(
+        self,
+        *,
+        failure_threshold: int = 5,
+        reset_timeout: float = 10.0,
+        min_timeout: float = 0.5,
+        timeout_multiplier: float = 3.0,
+        min_samples: int = 20,
+        window: int = 256,
+        hedge_percentile: Optional[float] = 95.0,
+        hedge_budget: float = 0.1,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.min_timeout = min_timeout
+        self.timeout_multiplier = timeout_multiplier
+        self.min_samples = min_samples
+        self.window = window
+        self.hedge_percentile = hedge_percentile
+        self.hedge_budget = hedge_budget
+        self._clock = clock
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._latencies: Dict[str, LatencyTracker] = {}
+
+    def breaker(self, service: str) -> CircuitBreaker:
+        breaker = self._breakers.get(service)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                failure_threshold=self.failure_threshold,
+                reset_timeout=self.reset_timeout,
+                clock=self._clock,
+            )
+            self._breakers[service] = breaker
+        return breaker
+
+    def latency(self, endpoint: str) -> LatencyTracker:
+        tracker = self._latencies.get(endpoint)
+        if tracker is None:
+            tracker = LatencyTracker(self.window)
+            self._latencies[endpoint] = tracker
+        return tracker
+
+    def timeout_for(self, endpoint: str, default: float) -> float:
+        tracker = self.latency(endpoint)
+        if len(tracker) < self.min_samples:
+            return default
+        p99 = tracker.percentile(99.0) or default
+        return min(default, max(self.min_timeout, p99 * self.timeout_multiplier))
+
+    def hedge_delay(self, endpoint: str) -> Optional[float]:
+        """Delay before hedging ``endpoint``; ``None`` when hedging is not warranted."""
+
+        if self.hedge_percentile is None:
+            return None
+        tracker = self.latency(endpoint)
+        if len(tracker) < self.min_samples or tracker.hedged >= self.hedge_budget * tracker.calls:
+            return None
+        return tracker.percentile(self.hedge_percentile)
+
+    async def call(
+        self,
+        service: str,
+        endpoint: str,
+        func: Callable[[float], Awaitable[T]],
+        *,
+        timeout: float,
+        hedge: bool = False,
+    ) -> T:
+        """Run ``func(timeout)`` guarded by the breaker for ``service``.
+
+        ``hedge`` must only be set for idempotent calls.
+        """
+
+        delay = self.hedge_delay(endpoint) if hedge else None
+        if delay is None:
+            return await self._attempt(service, endpoint, func, timeout)
+        return await self._hedged(service, endpoint, func, timeout, delay)
+
+    async def _hedged(
+        self,
+        service: str,
+        endpoint: str,
+        func: Callable[[float], Awaitable[T]],
+        timeout: float,
+        delay: float,
+    ) -> T:
+        first = asyncio.ensure_future(self._attempt(service, endpoint, func, timeout))
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        if done or self.breaker(service).state != CLOSED:
+            return await first
+
+        tracker = self.latency(endpoint)
+        tracker.hedged += 1
+        second = asyncio.ensure_future(self._attempt(service, endpoint, func, timeout))
+        pending = {first, second}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for attempt in done:
+                    if not attempt.cancelled() and attempt.exception() is None:
+                        if attempt is second:
+                            tracker.hedge_wins += 1
+                        return attempt.result()
+            # Both attempts failed; surface the original one's error.
+            return first.result()
+        finally:
+            for attempt in pending:
+                attempt.cancel()
+
+    async def _attempt(
+        self,
+        service: str,
+        endpoint: str,
+        func: Callable[[float], Awaitable[T]],
+        timeout: float,
+    ) -> T:
+        breaker = self.breaker(service)
+        if not breaker.allow():
+            raise CircuitOpenError(service)
+        # A half-open probe decides whether the breaker closes, so it must not
+        # be cut short by a timeout learned before the service slowed down.
+        if breaker.state != HALF_OPEN:
+            timeout = self.timeout_for(endpoint, timeout)
+        tracker = self.latency(endpoint)
+        tracker.calls += 1
+        started = self._clock()
+        try:
+            result = await func(timeout)
+        except Exception as exc:
+            if is_service_failure(exc):
+                tracker.failures += 1
+                # A timeout's elapsed time is a lower bound of the real latency;
+                # recording it lets the adaptive timeout grow back.
+                tracker.observe(self._clock() - started)
+                breaker.record_failure()
+            else:
+                # The service answered (e.g. a 4xx), so it is reachable.
+                breaker.record_success()
+            raise
+        except BaseException:
+            breaker.release()
+            raise
+        tracker.observe(self._clock() - started)
+        breaker.record_success()
+        return result
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return breaker and latency state for the metrics endpoint."""
+
+        return {
+            "breakers": {
+                service: {
+                    "state": breaker.state,
+                    "consecutive_failures": breaker.consecutive_failures,
+                    "rejected": breaker.rejected,
+                }
+                for service, breaker in self._breakers.items()
+            },
+            "endpoints": {
+                endpoint: {
+                    "calls": tracker.calls,
+                    "failures": tracker.failures,
+                    "hedged": tracker.hedged,
+                    "hedge_wins": tracker.hedge_wins,
+                    "p50_seconds": tracker.percentile(50.0),
+                    "p99_seconds": tracker.percentile(99.0),
+                }
+                for endpoint, tracker in self._latencies.items()
+            },
+        }
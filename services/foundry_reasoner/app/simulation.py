@@ -1,14 +1,58 @@
-"""Simulation harness for smoke testing the reasoning workflow."""
+"""Simulation harness for smoke testing and load testing the reasoning workflow.
+
+Besides the single-cycle smoke test (:func:`run_blocking_simulation`) the
+harness can drive many concurrent cycles against the in-memory stubs, with
+optional injected latency and failures, and report throughput and per-stage
+latency percentiles. Run ``python -m services.foundry_reasoner.app.simulation
+--help`` for the CLI.
+"""
 
 from __future__ import annotations
 
+import argparse
 import asyncio
-from dataclasses import dataclass, field
-from typing import Any, Dict, List, Optional
-
+import json
+import random
+import time
+from collections import defaultdict
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from .embedding import embed_text
+from .lexical import HybridConfig, LexicalIndex, memory_text
 from .reasoning import ReasoningEngine
+from .resilience import percentile
 from .schemas import ReasoningRequest, ReasoningResponse, ScenarioPlan
-from .vector_store import MemoryRecord, TaskMemory
+from .vector_store import MemoryRecord, TaskMemory, search_records
+
+
+class SimulatedFailure(Exception):
+    """Raised by a stub when its :class:`FaultProfile` injects a failure."""
+
+
+@dataclass
+class FaultProfile:
+    """Latency and failure injection for a simulation stub.
+
+    Each call sleeps ``latency`` seconds plus up to ``jitter`` extra seconds
+    and then fails with probability ``failure_rate``.
+    """
+
+    latency: float = 0.0
+    jitter: float = 0.0
+    failure_rate: float = 0.0
+    seed: Optional[int] = None
+    _rng: random.Random = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self._rng = random.Random(self.seed)
+
+    async def apply(self, stage: str) -> None:
+        delay = self.latency + (self._rng.uniform(0.0, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if self.failure_rate and self._rng.random() < self.failure_rate:
+            raise SimulatedFailure(f"Injected failure in {stage}")
 
 
 @dataclass
@@ -16,8 +60,10 @@ class SimulationOrchestrator:
     """In-memory orchestrator implementation for simulations."""
 
     scenarios: List[ScenarioPlan] = field(default_factory=list)
+    faults: FaultProfile = field(default_factory=FaultProfile)
 
     async def create_scenario(self, plan: ScenarioPlan) -> str:
+        await self.faults.apply("orchestrator")
         self.scenarios.append(plan)
         return f"sim-{len(self.scenarios)}"
 
@@ -26,7 +72,10 @@ class SimulationOrchestrator:
 class SimulationPerformanceEvaluator:
     """Naive scoring using request metrics."""
 
+    faults: FaultProfile = field(default_factory=FaultProfile)
+
     async def evaluate(self, metrics: Dict[str, float]) -> float:
+        await self.faults.apply("performance_evaluator")
         if not metrics:
             return 50.0
         weights = {
@@ -44,7 +93,10 @@ class SimulationPerformanceEvaluator:
 class SimulationDifficultyController:
     """Rules-based difficulty adjustment."""
 
+    faults: FaultProfile = field(default_factory=FaultProfile)
+
     async def adjust(self, current: str, score: float) -> Dict[str, Any]:
+        await self.faults.apply("difficulty_controller")
         tiers = ["easy", "medium", "hard"]
         tier_index = tiers.index(current) if current in tiers else 1
         if score > 75 and tier_index < len(tiers) - 1:
@@ -64,8 +116,10 @@ class SimulationLeaderboard:
     """Simple leaderboard collector."""
 
     entries: List[Dict[str, Any]] = field(default_factory=list)
+    faults: FaultProfile = field(default_factory=FaultProfile)
 
     async def publish(self, learner_id: Optional[str], score: float, difficulty: str, notes: str) -> None:
+        await self.faults.apply("leaderboard")
         if learner_id is None:
             return
         self.entries.append(
@@ -77,14 +131,20 @@ class SimulationLeaderboard:
             }
         )
 
+    async def publish_many(self, entries: List[Dict[str, Any]]) -> None:
+        for entry in entries:
+            await self.publish(**entry)
+
 
 @dataclass
 class SimulationOPA:
     """Always-allow OPA stub configurable for tests."""
 
     allowed: bool = True
+    faults: FaultProfile = field(default_factory=FaultProfile)
 
     async def check(self, payload: Dict[str, Any]) -> bool:  # noqa: ARG002
+        await self.faults.apply("opa")
         return self.allowed
 
 
@@ -93,13 +153,113 @@ class InMemoryTaskMemory(TaskMemory):
     """Task memory implementation used by the simulation harness."""
 
     records: List[MemoryRecord] = field(default_factory=list)
-
-    async def retrieve(self, task_id: str, query: str, top_k: int = 3) -> List[MemoryRecord]:  # noqa: ARG002
-        matches = [record for record in self.records if record.task_id == task_id]
-        return matches[:top_k]
+    faults: FaultProfile = field(default_factory=FaultProfile)
+    hybrid: Optional[HybridConfig] = None
+    _lexical: Optional[LexicalIndex] = field(default=None, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        if self.hybrid is not None:
+            self._lexical = LexicalIndex(self.hybrid)
+
+    async def retrieve(self, task_id: str, query: str, top_k: int = 3) -> List[MemoryRecord]:
+        await self.faults.apply("task_memory")
+        return search_records(
+            self.records, task_id, embed_text(query), top_k, lexical=self._lexical, query_text=query
+        )
 
     async def store(self, record: MemoryRecord) -> None:
+        await self.faults.apply("task_memory")
         self.records.append(record)
+        if self._lexical is not None:
+            self._lexical.add(record.task_id, len(self.records) - 1, memory_text(record.content, record.metadata))
+
+    async def task_ids(self) -> List[str]:
+        return sorted({record.task_id for record in self.records})
+
+    async def scan(self, task_id: str) -> List[Tuple[Any, MemoryRecord]]:
+        return [(index, record) for index, record in enumerate(self.records) if record.task_id == task_id]
+
+    async def delete_many(self, keys: List[Any]) -> None:
+        dropped = set(keys)
+        self.records = [record for index, record in enumerate(self.records) if index not in dropped]
+        if self._lexical is not None:
+            self._lexical.clear()  # list positions shifted
+
+
+class StageRecorder:
+    """Collect per-stage latencies and error counts during a load run."""
+
+    def __init__(self) -> None:
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    def record(self, stage: str, seconds: float, *, failed: bool = False) -> None:
+        self.samples[stage].append(seconds)
+        if failed:
+            self.errors[stage] += 1
+
+
+class _TimedProxy:
+    """Wrap a stub so every coroutine method call is timed as ``<name>.<method>``."""
+
+    def __init__(self, target: Any, name: str, recorder: StageRecorder) -> None:
+        self._target = target
+        self._name = name
+        self._recorder = recorder
+
+    def __getattr__(self, attr: str) -> Any:
+        value = getattr(self._target, attr)
+        if not asyncio.iscoroutinefunction(value):
+            return value
+        stage = f"{self._name}.{attr}"
+        recorder = self._recorder
+
+        async def timed(*args: Any, **kwargs: Any) -> Any:
+            started = time.perf_counter()
+            try:
+                result = await value(*args, **kwargs)
+            except Exception:
+                recorder.record(stage, time.perf_counter() - started, failed=True)
+                raise
+            recorder.record(stage, time.perf_counter() - started)
+            return result
+
+        return timed
+
+
+@dataclass
+class StageStats:
+    """Latency summary for a single stage."""
+
+    count: int
+    errors: int
+    p50: Optional[float]
+    p95: Optional[float]
+    p99: Optional[float]
+
+
+@dataclass
+class LoadReport:
+    """Outcome of :meth:`SimulationHarness.run_load`."""
+
+    cycles: int
+    succeeded: int
+    failed: int
+    duration_seconds: float
+    throughput_per_second: float
+    stages: Dict[str, StageStats]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+_OBJECTIVES = [
+    "Improve network defense skills",
+    "Harden cloud identity configuration",
+    "Detect lateral movement in OT networks",
+    "Triage phishing incidents",
+    "Tune SIEM correlation rules",
+]
 
 
 @dataclass
@@ -107,19 +267,50 @@ class SimulationHarness:
     """High-level helper to exercise the :class:`ReasoningEngine` end-to-end."""
 
     engine: ReasoningEngine
+    recorder: Optional[StageRecorder] = None
 
     @classmethod
-    def build(cls) -> "SimulationHarness":
-        task_memory = InMemoryTaskMemory()
+    def build(
+        cls,
+        *,
+        faults: Optional[Dict[str, FaultProfile]] = None,
+        record_stages: bool = False,
+    ) -> "SimulationHarness":
+        """Build a harness wired to in-memory stubs.
+
+        ``faults`` maps a dependency name (``opa``, ``orchestrator``,
+        ``task_memory``, ``performance``, ``difficulty``, ``leaderboard``) to
+        the :class:`FaultProfile` its stub should apply.
+        """
+
+        faults = faults or {}
+
+        def profile(name: str) -> FaultProfile:
+            return faults.get(name) or FaultProfile()
+
+        dependencies: Dict[str, Any] = {
+            "opa": SimulationOPA(faults=profile("opa")),
+            "orchestrator": SimulationOrchestrator(faults=profile("orchestrator")),
+            "task_memory": InMemoryTaskMemory(faults=profile("task_memory")),
+            "performance": SimulationPerformanceEvaluator(faults=profile("performance")),
+            "difficulty": SimulationDifficultyController(faults=profile("difficulty")),
+            "leaderboard": SimulationLeaderboard(faults=profile("leaderboard")),
+        }
+        recorder = StageRecorder() if record_stages else None
+        if recorder is not None:
+            dependencies = {
+                name: _TimedProxy(dependency, name, recorder)
+                for name, dependency in dependencies.items()
+            }
         engine = ReasoningEngine(
-            opa_client=SimulationOPA(),
-            orchestrator_client=SimulationOrchestrator(),
-            task_memory=task_memory,
-            performance_client=SimulationPerformanceEvaluator(),
-            difficulty_client=SimulationDifficultyController(),
-            leaderboard_client=SimulationLeaderboard(),
+            opa_client=dependencies["opa"],
+            orchestrator_client=dependencies["orchestrator"],
+            task_memory=dependencies["task_memory"],
+            performance_client=dependencies["performance"],
+            difficulty_client=dependencies["difficulty"],
+            leaderboard_client=dependencies["leaderboard"],
         )
-        return cls(engine=engine)
+        return cls(engine=engine, recorder=recorder)
 
     async def run_once(
         self,
@@ -138,9 +329,170 @@ class SimulationHarness:
         )
         return await self.engine.run_reasoning_cycle(request)
 
+    def _random_request(self, rng: random.Random, tasks: int, learners: int, skew: float) -> ReasoningRequest:
+        def pick(population: int) -> int:
+            if skew <= 0:
+                return rng.randrange(population)
+            weights = [1.0 / (rank + 1) ** skew for rank in range(population)]
+            return rng.choices(range(population), weights=weights)[0]
+
+        return ReasoningRequest(
+            task_id=f"task-{pick(tasks)}",
+            objective=rng.choice(_OBJECTIVES),
+            learner_id=f"learner-{pick(learners)}",
+            context={
+                "difficulty": rng.choice(["easy", "medium", "hard"]),
+                "template": "adaptive/defense.yaml",
+            },
+            performance_metrics={
+                "accuracy": round(rng.random(), 3),
+                "efficiency": round(rng.random(), 3),
+            },
+            observations=["Learner struggled with lateral movement detection"],
+        )
+
+    async def run_load(
+        self,
+        cycles: int,
+        *,
+        concurrency: int = 1,
+        arrival_rate: Optional[float] = None,
+        tasks: int = 10,
+        learners: int = 50,
+        skew: float = 0.0,
+        seed: int = 0,
+    ) -> LoadReport:
+        """Run ``cycles`` reasoning cycles and summarise their latencies.
+
+        Without ``arrival_rate`` this is a closed loop with ``concurrency``
+        workers. With ``arrival_rate`` (cycles/second) it is an open loop with
+        Poisson arrivals, where ``concurrency`` caps the cycles in flight;
+        there a cycle's latency runs from its scheduled arrival, so time spent
+        waiting for a free slot counts (it is also reported as ``queued``).
+        Task and learner ids are drawn uniformly, or Zipf-like when
+        ``skew > 0``.
+
+        The report always has the ``cycle`` stage; per-dependency stages
+        (``opa.check`` etc.) are only recorded by harnesses built with
+        ``record_stages=True``, as :func:`run_load_simulation` does.
+        """
+
+        if self.recorder is None:
+            self.recorder = StageRecorder()
+        recorder = self.recorder
+        rng = random.Random(seed)
+        requests = [self._random_request(rng, tasks, learners, skew) for _ in range(cycles)]
+        outcomes = {"succeeded": 0, "failed": 0}
+        limiter = asyncio.Semaphore(max(1, concurrency))
+
+        async def one(request: ReasoningRequest, scheduled: Optional[float] = None) -> None:
+            async with limiter:
+                started = time.perf_counter()
+                if scheduled is not None:
+                    recorder.record("queued", started - scheduled)
+                    started = scheduled
+                try:
+                    await self.engine.run_reasoning_cycle(request)
+                except Exception:
+                    outcomes["failed"] += 1
+                    recorder.record("cycle", time.perf_counter() - started, failed=True)
+                else:
+                    outcomes["succeeded"] += 1
+                    recorder.record("cycle", time.perf_counter() - started)
+
+        started = time.perf_counter()
+        if arrival_rate:
+            pending: List[asyncio.Task[None]] = []
+            for request in requests:
+                pending.append(asyncio.create_task(one(request, time.perf_counter())))
+                await asyncio.sleep(rng.expovariate(arrival_rate))
+            await asyncio.gather(*pending)
+        else:
+            queue = iter(requests)
+
+            async def worker() -> None:
+                for request in queue:
+                    await one(request)
+
+            await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+        duration = time.perf_counter() - started
+
+        stages = {
+            stage: StageStats(
+                count=len(samples),
+                errors=recorder.errors.get(stage, 0),
+                p50=percentile(samples, 50.0),
+                p95=percentile(samples, 95.0),
+                p99=percentile(samples, 99.0),
+            )
+            for stage, samples in sorted(recorder.samples.items())
+        }
+        return LoadReport(
+            cycles=cycles,
+            succeeded=outcomes["succeeded"],
+            failed=outcomes["failed"],
+            duration_seconds=duration,
+            throughput_per_second=cycles / duration if duration > 0 else 0.0,
+            stages=stages,
+        )
+
 
 def run_blocking_simulation() -> ReasoningResponse:
     """Convenience wrapper for CLI-based smoke tests."""
 
     harness = SimulationHarness.build()
     return asyncio.run(harness.run_once())
+
+
+def run_load_simulation(
+    cycles: int = 1000,
+    *,
+    faults: Optional[Dict[str, FaultProfile]] = None,
+    **options: Any,
+) -> LoadReport:
+    """Blocking wrapper around :meth:`SimulationHarness.run_load`."""
+
+    harness = SimulationHarness.build(faults=faults, record_stages=True)
+    return asyncio.run(harness.run_load(cycles, **options))
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Network-free load test for the reasoner.")
+    parser.add_argument("--cycles", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--arrival-rate", type=float, default=None, help="cycles/second (open loop)")
+    parser.add_argument("--tasks", type=int, default=10)
+    parser.add_argument("--learners", type=int, default=50)
+    parser.add_argument("--skew", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.0, help="injected seconds per stub call")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    faults = {
+        name: FaultProfile(
+            latency=args.latency,
+            jitter=args.jitter,
+            failure_rate=args.failure_rate,
+            seed=args.seed + offset,
+        )
+        for offset, name in enumerate(
+            ["opa", "orchestrator", "task_memory", "performance", "difficulty", "leaderboard"]
+        )
+    }
+    report = run_load_simulation(
+        args.cycles,
+        faults=faults,
+        concurrency=args.concurrency,
+        arrival_rate=args.arrival_rate,
+        tasks=args.tasks,
+        learners=args.learners,
+        skew=args.skew,
+        seed=args.seed,
+    )
+    print(json.dumps(report.to_dict(), indent=2))
+
+
+if __name__ == "__main__":  # pragma: no cover - manual entry point
+    main()
@@ -0,0 +1,86 @@
+"""Tests for task-memory consolidation and local compaction."""
+
+import asyncio
+import json
+
+import httpx
+
+from ..consolidation import MemoryConsolidator, plan_consolidation
+from ..embedding import embed_text
+from ..local_store import PersistentLocalMemory
+from ..simulation import InMemoryTaskMemory
+from ..vector_store import MemoryRecord, QdrantTaskMemory
+
+
+def _record(task_id: str, text: str, score: float) -> MemoryRecord:
+    return MemoryRecord(task_id=task_id, content=text, vector=embed_text(text), metadata={"score": score})
+
+
+def test_plan_keeps_best_scoring_representative_per_cluster():
+    entries = [
+        ("a", _record("task-1", "network defense drill", 60.0)),
+        ("b", _record("task-1", "network defense drill", 90.0)),
+        ("c", _record("task-1", "phishing awareness refresher", 40.0)),
+    ]
+    assert plan_consolidation(entries) == ["a"]
+    assert plan_consolidation(entries, max_records=1) == ["a", "c"]
+
+
+def test_consolidator_bounds_in_memory_task_memory():
+    memory = InMemoryTaskMemory()
+    memory.records = [
+        *(_record("task-1", "network defense drill", float(score)) for score in range(10)),
+        _record("task-1", "phishing awareness refresher", 50.0),
+        _record("task-2", "network defense drill", 10.0),
+    ]
+    report = asyncio.run(MemoryConsolidator(memory).run_once())
+
+    assert (report.tasks, report.scanned, report.deleted) == (2, 12, 9)
+    survivors = {(record.task_id, record.content): record.metadata["score"] for record in memory.records}
+    assert survivors == {
+        ("task-1", "network defense drill"): 9.0,
+        ("task-1", "phishing awareness refresher"): 50.0,
+        ("task-2", "network defense drill"): 10.0,
+    }
+
+
+def test_local_store_tombstones_survive_reopen_and_compact(tmp_path):
+    store = PersistentLocalMemory(tmp_path / "memory", compact_ratio=0.9)
+    store.extend(_record("task-1", f"objective {index}", float(index)) for index in range(4))
+    assert store.delete([0, 1]) == 2
+    store.close()
+
+    reopened = PersistentLocalMemory(tmp_path / "memory", quantize=True)
+    assert len(reopened) == 2
+    assert sorted(record.content for _, record in reopened.rows_for("task-1")) == ["objective 2", "objective 3"]
+
+    reopened.compact()
+    assert len(reopened) == 2
+    assert [row_id for row_id, _ in reopened.rows_for("task-1")] == [0, 1]
+    assert (tmp_path / "memory" / "deleted.bin").stat().st_size == 0
+    assert (tmp_path / "memory" / "vectors.i8").stat().st_size == 2 * (4 + 64)
+    results = reopened.search("task-1", embed_text("objective 3"), top_k=1)
+    assert [record.content for record in results] == ["objective 3"]
+    assert not (tmp_path / "memory.compact").exists()
+
+
+def test_qdrant_consolidation_bulk_deletes_superseded_points():
+    points = [
+        {"id": "p1", "payload": {"task_id": "task-1", "content": "drill", "score": 50.0}, "vector": embed_text("drill")},
+        {"id": "p2", "payload": {"task_id": "task-1", "content": "drill", "score": 80.0}, "vector": embed_text("drill")},
+    ]
+    deletes = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path.endswith("/points/scroll"):
+            return httpx.Response(200, json={"result": {"points": points, "next_page_offset": None}})
+        if request.url.path.endswith("/points/delete"):
+            deletes.append(json.loads(request.content))
+        return httpx.Response(200, json={"result": {}})
+
+    memory = QdrantTaskMemory("http://qdrant.consolidate", local_fallback=False)
+    memory._client = httpx.AsyncClient(base_url=memory.base_url, transport=httpx.MockTransport(handler))
+    report = asyncio.run(MemoryConsolidator(memory).run_once())
+
+    assert report.deleted == 1
+    assert deletes == [{"points": ["p1"]}]
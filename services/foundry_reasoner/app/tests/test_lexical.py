@@ -0,0 +1,62 @@
+"""Tests for BM25 lexical prefiltering of task-memory retrieval."""
+
+import asyncio
+
+from ..embedding import embed_text
+from ..lexical import BM25Index, HybridConfig
+from ..local_store import PersistentLocalMemory
+from ..simulation import InMemoryTaskMemory
+from ..vector_store import MemoryRecord
+
+
+def _record(task_id: str, text: str) -> MemoryRecord:
+    return MemoryRecord(task_id=task_id, content=text, vector=embed_text(text), metadata={"score": 70.0})
+
+
+def test_bm25_prefers_rare_terms_and_supports_removal():
+    index = BM25Index()
+    index.add("a", "network defense drill")
+    index.add("b", "network segmentation drill")
+    index.add("c", "phishing drill")
+
+    assert [key for _, key in index.search("segmentation drill", 3)][0] == "b"
+    index.remove("b")
+    assert "b" not in [key for _, key in index.search("segmentation network", 3)]
+    assert index.search("unknown", 3) == []
+
+
+def test_local_store_scores_only_lexical_candidates(tmp_path, monkeypatch):
+    store = PersistentLocalMemory(tmp_path / "memory", hybrid=HybridConfig(candidates=4))
+    store.extend(_record("task-1", f"routine exercise {index}") for index in range(30))
+    store.append(_record("task-1", "kerberoasting detection lab"))
+
+    scored = []
+    original = store._exact_scores
+
+    def counting(rows, query, query_norm):
+        rows = list(rows)
+        scored.extend(rows)
+        return original(rows, query, query_norm)
+
+    monkeypatch.setattr(store, "_exact_scores", counting)
+    results = store.search("task-1", embed_text("kerberoasting lab"), top_k=1, query_text="kerberoasting lab")
+    assert [record.content for record in results] == ["kerberoasting detection lab"]
+    assert len(scored) <= 4
+
+    scored.clear()
+    results = store.search("task-1", embed_text("zzz"), top_k=2, query_text="zzz")
+    assert len(results) == 2
+    assert len(scored) == 31  # no lexical match: full vector scan
+
+
+def test_in_memory_task_memory_hybrid_retrieval():
+    memory = InMemoryTaskMemory(hybrid=HybridConfig())
+
+    async def scenario():
+        for text in ("phishing awareness refresher", "lateral movement detection", "password spraying triage"):
+            await memory.store(_record("task-1", text))
+        await memory.store(_record("task-2", "lateral movement detection"))
+        return await memory.retrieve("task-1", "lateral movement", top_k=1)
+
+    results = asyncio.run(scenario())
+    assert [(record.task_id, record.content) for record in results] == [("task-1", "lateral movement detection")]
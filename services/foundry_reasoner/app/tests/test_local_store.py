@@ -0,0 +1,135 @@
+"""Tests for the persistent, memory-mapped local task memory."""
+
+import asyncio
+import json
+
+import httpx
+
+from ..embedding import embed_text
+from ..local_store import PersistentLocalMemory, quantize_int8
+from ..vector_store import MemoryRecord, QdrantTaskMemory
+
+
+def _record(task_id: str, text: str) -> MemoryRecord:
+    return MemoryRecord(
+        task_id=task_id,
+        content=text,
+        vector=embed_text(text),
+        metadata={"score": 80.0},
+    )
+
+
+def test_records_survive_reopen_and_rank_by_similarity(tmp_path):
+    store = PersistentLocalMemory(tmp_path / "memory")
+    store.extend(
+        [
+            _record("task-1", "lateral movement detection drill"),
+            _record("task-1", "phishing awareness refresher"),
+            _record("task-2", "lateral movement detection drill"),
+        ]
+    )
+    store.close()
+
+    reopened = PersistentLocalMemory(tmp_path / "memory")
+    assert len(reopened) == 3
+    results = reopened.search("task-1", embed_text("lateral movement detection"), top_k=2)
+    assert [record.content for record in results] == [
+        "lateral movement detection drill",
+        "phishing awareness refresher",
+    ]
+    assert all(record.task_id == "task-1" for record in results)
+    assert results[0].metadata == {"score": 80.0}
+    assert len(list(results[0].vector)) == 64
+
+
+def test_search_only_decodes_top_k_payloads(tmp_path, monkeypatch):
+    store = PersistentLocalMemory(tmp_path / "memory")
+    store.extend(_record("task-1", f"objective number {index}") for index in range(20))
+
+    decoded = []
+    original = store._read_payload
+
+    def counting(row_id):
+        decoded.append(row_id)
+        return original(row_id)
+
+    monkeypatch.setattr(store, "_read_payload", counting)
+    results = store.search("task-1", embed_text("objective number 7"), top_k=3)
+    assert len(results) == 3
+    assert len(decoded) == 3
+
+
+def test_qdrant_fallback_persists_across_restarts(tmp_path):
+    def handler(request: httpx.Request) -> httpx.Response:
+        raise httpx.ConnectError("qdrant down", request=request)
+
+    def build() -> QdrantTaskMemory:
+        memory = QdrantTaskMemory("http://qdrant.offline", local_path=tmp_path / "memory")
+        memory._client = httpx.AsyncClient(
+            base_url=memory.base_url, transport=httpx.MockTransport(handler)
+        )
+        return memory
+
+    async def first_run():
+        memory = build()
+        await memory.store(_record("task-1", "network defense drill"))
+        await memory.close()
+
+    async def second_run():
+        memory = build()
+        try:
+            return await memory.retrieve("task-1", "network defense")
+        finally:
+            await memory.close()
+
+    asyncio.run(first_run())
+    results = asyncio.run(second_run())
+    assert [record.content for record in results] == ["network defense drill"]
+
+
+def test_quantize_int8_round_trips_within_one_step():
+    values = [0.5, -0.25, 0.0, 1.0]
+    scale, codes = quantize_int8(values)
+    assert list(codes) == [64, -32, 0, 127]
+    assert all(abs(code * scale - value) <= scale for code, value in zip(codes, values))
+
+
+def test_quantized_store_matches_exact_ranking(tmp_path):
+    texts = [f"objective {word} drill" for word in ("alpha", "bravo", "charlie", "delta", "echo")]
+    exact = PersistentLocalMemory(tmp_path / "exact")
+    quantized = PersistentLocalMemory(tmp_path / "quantized", quantize=True, rescore=False)
+    for store in (exact, quantized):
+        store.extend(_record("task-1", text) for text in texts)
+
+    query = embed_text("charlie drill")
+    expected = [record.content for record in exact.search("task-1", query, top_k=3)]
+    assert [record.content for record in quantized.search("task-1", query, top_k=3)] == expected
+    assert (tmp_path / "quantized" / "vectors.i8").stat().st_size == 5 * (4 + 64)
+
+
+def test_enabling_quantization_backfills_existing_store(tmp_path):
+    PersistentLocalMemory(tmp_path / "memory").extend(
+        [_record("task-1", "blue team drill"), _record("task-1", "red team drill")]
+    )
+
+    store = PersistentLocalMemory(tmp_path / "memory", quantize=True)
+    results = store.search("task-1", embed_text("red team"), top_k=1)
+    assert [record.content for record in results] == ["red team drill"]
+    assert (tmp_path / "memory" / "vectors.i8").stat().st_size == 2 * (4 + 64)
+
+
+def test_qdrant_collection_requests_int8_quantization():
+    bodies = {}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        bodies[request.url.path] = json.loads(request.content)
+        return httpx.Response(200, json={"result": []})
+
+    memory = QdrantTaskMemory("http://qdrant.int8", collection="quantized", quantization="int8")
+    memory._client = httpx.AsyncClient(
+        base_url=memory.base_url, transport=httpx.MockTransport(handler)
+    )
+    asyncio.run(memory.retrieve("task-1", "anything"))
+
+    assert bodies["/collections/quantized"]["quantization_config"]["scalar"]["type"] == "int8"
+    assert bodies["/collections/quantized/points/search"]["params"]["quantization"]["rescore"] is True
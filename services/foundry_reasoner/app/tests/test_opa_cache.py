@@ -0,0 +1,152 @@
+"""Tests for the OPA decision cache."""
+
+import asyncio
+
+from ..clients import DecisionCache, OPAClient
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _counting_client(cache: DecisionCache, decisions):
+    client = OPAClient("http://opa.invalid", cache=cache)
+    calls = []
+
+    async def evaluate(payload):
+        calls.append(payload)
+        await asyncio.sleep(0)
+        return decisions(payload)
+
+    client._evaluate = evaluate  # type: ignore[method-assign]
+    return client, calls
+
+
+def test_key_is_canonical_across_dict_order():
+    first = DecisionCache.key_for({"task_id": "t", "context": {"a": 1, "b": 2}})
+    second = DecisionCache.key_for({"context": {"b": 2, "a": 1}, "task_id": "t"})
+    assert first == second
+
+
+def test_positive_and_negative_decisions_expire_independently():
+    clock = _Clock()
+    cache = DecisionCache(ttl=30.0, negative_ttl=5.0, clock=clock)
+    client, calls = _counting_client(cache, lambda payload: payload["learner_id"] == "ok")
+
+    async def scenario():
+        assert await client.check({"learner_id": "ok"}) is True
+        assert await client.check({"learner_id": "denied"}) is False
+        assert await client.check({"learner_id": "ok"}) is True
+        assert await client.check({"learner_id": "denied"}) is False
+        assert len(calls) == 2
+        clock.now = 10.0
+        assert await client.check({"learner_id": "ok"}) is True
+        assert await client.check({"learner_id": "denied"}) is False
+        assert len(calls) == 3
+
+    asyncio.run(scenario())
+
+
+def test_cache_is_size_bounded_and_invalidated():
+    cache = DecisionCache(max_entries=2)
+    client, calls = _counting_client(cache, lambda payload: True)
+
+    async def scenario():
+        for learner in ("a", "b", "c"):
+            await client.check({"learner_id": learner})
+        assert len(cache) == 2
+        await client.check({"learner_id": "a"})
+        assert len(calls) == 4
+        client.invalidate()
+        assert len(cache) == 0
+        await client.check({"learner_id": "a"})
+        assert len(calls) == 5
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_identical_checks_share_one_round_trip():
+    client, calls = _counting_client(DecisionCache(), lambda payload: True)
+
+    async def scenario():
+        return await asyncio.gather(*(client.check({"learner_id": "x"}) for _ in range(10)))
+
+    assert asyncio.run(scenario()) == [True] * 10
+    assert len(calls) == 1
+
+
+def test_followers_take_over_when_the_leading_check_is_cancelled():
+    client = OPAClient("http://opa.invalid", cache=DecisionCache())
+    calls = []
+
+    async def evaluate(payload):
+        calls.append(payload)
+        await asyncio.sleep(0.01)
+        return True
+
+    client._evaluate = evaluate  # type: ignore[method-assign]
+
+    async def scenario():
+        leader = asyncio.create_task(client.check({"learner_id": "x"}))
+        await asyncio.sleep(0)
+        followers = [asyncio.create_task(client.check({"learner_id": "x"})) for _ in range(3)]
+        await asyncio.sleep(0)
+        leader.cancel()
+        results = await asyncio.gather(*followers)
+        assert leader.cancelled()
+        return results
+
+    assert asyncio.run(scenario()) == [True] * 3
+    assert len(calls) == 2  # the cancelled leader's round trip, then one shared retry
+
+def test_invalidation_discards_decisions_evaluated_against_old_policies():
+    policy = {"allow": True}
+    release = None
+    client = OPAClient("http://opa.invalid", cache=DecisionCache())
+    calls = []
+
+    async def evaluate(payload):
+        calls.append(payload)
+        decision = policy["allow"]
+        if len(calls) == 1:
+            await release.wait()
+        return decision
+
+    client._evaluate = evaluate  # type: ignore[method-assign]
+
+    async def scenario():
+        nonlocal release
+        release = asyncio.Event()
+        first = asyncio.create_task(client.check({"learner_id": "x"}))
+        joined = asyncio.create_task(client.check({"learner_id": "x"}))
+        await asyncio.sleep(0)
+        policy["allow"] = False
+        client.invalidate()
+        release.set()
+        return await asyncio.gather(first, joined)
+
+    # Both the originator and the check sharing its round trip re-evaluate.
+    assert asyncio.run(scenario()) == [False, False]
+    assert client.cache.get(DecisionCache.key_for({"learner_id": "x"})) is False
+
+
+def test_policy_invalidation_endpoint_requires_admin_token(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    from .. import main
+
+    monkeypatch.setattr(main, "get_settings", lambda: main.Settings(policy_admin_token=""))
+    client = TestClient(main.app)
+    assert client.post("/api/policies/invalidate").status_code == 403
+
+    monkeypatch.setattr(main, "get_settings", lambda: main.Settings(policy_admin_token="s3cret"))
+    assert client.post("/api/policies/invalidate").status_code == 401
+    headers = {"Authorization": "Bearer wrong"}
+    assert client.post("/api/policies/invalidate", headers=headers).status_code == 401
+    monkeypatch.setattr(main, "get_opa_client", lambda: OPAClient("http://opa.invalid", cache=DecisionCache()))
+    headers = {"Authorization": "Bearer s3cret"}
+    assert client.post("/api/policies/invalidate", headers=headers).json() == {"status": "invalidated"}
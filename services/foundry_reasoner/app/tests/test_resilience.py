@@ -0,0 +1,213 @@
+"""Tests for circuit breakers and adaptive timeouts."""
+
+import asyncio
+
+import httpx
+import pytest
+
+from ..resilience import CLOSED, HALF_OPEN, OPEN, CircuitOpenError, ResilienceRegistry
+from ..vector_store import QdrantTaskMemory
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _down(timeout):  # noqa: ARG001
+    async def fail():
+        raise httpx.ConnectError("connection refused")
+
+    return fail()
+
+
+def test_breaker_opens_then_probes_half_open():
+    clock = _Clock()
+    registry = ResilienceRegistry(failure_threshold=2, reset_timeout=10.0, clock=clock)
+
+    async def ok(timeout):  # noqa: ARG001
+        return "ok"
+
+    async def scenario():
+        for _ in range(2):
+            with pytest.raises(httpx.ConnectError):
+                await registry.call("opa", "opa.check", _down, timeout=5.0)
+        assert registry.breaker("opa").state == OPEN
+        with pytest.raises(CircuitOpenError):
+            await registry.call("opa", "opa.check", ok, timeout=5.0)
+
+        clock.now = 11.0
+        assert registry.breaker("opa").allow() is True
+        assert registry.breaker("opa").state == HALF_OPEN
+        # Only one probe is admitted while half-open.
+        assert registry.breaker("opa").allow() is False
+        registry.breaker("opa").release()
+        assert await registry.call("opa", "opa.check", ok, timeout=5.0) == "ok"
+        assert registry.breaker("opa").state == CLOSED
+
+    asyncio.run(scenario())
+    snapshot = registry.snapshot()
+    assert snapshot["breakers"]["opa"]["rejected"] == 2
+    assert snapshot["endpoints"]["opa.check"]["failures"] == 2
+
+
+def test_client_errors_do_not_trip_the_breaker():
+    registry = ResilienceRegistry(failure_threshold=1)
+    request = httpx.Request("GET", "http://leaderboard.test")
+
+    async def not_found(timeout):  # noqa: ARG001
+        response = httpx.Response(404, request=request)
+        response.raise_for_status()
+
+    async def scenario():
+        with pytest.raises(httpx.HTTPStatusError):
+            await registry.call("leaderboard", "leaderboard.top", not_found, timeout=5.0)
+
+    asyncio.run(scenario())
+    assert registry.breaker("leaderboard").state == CLOSED
+
+
+def test_timeout_adapts_to_observed_p99():
+    clock = _Clock()
+    registry = ResilienceRegistry(min_samples=5, timeout_multiplier=3.0, clock=clock)
+    seen = []
+
+    async def fast(timeout):
+        seen.append(timeout)
+        clock.now += 0.2
+
+    async def scenario():
+        for _ in range(6):
+            await registry.call("qdrant", "qdrant.search", fast, timeout=5.0)
+
+    asyncio.run(scenario())
+    assert seen[0] == 5.0
+    assert seen[-1] == pytest.approx(0.6)
+
+
+def test_breaker_recovers_after_service_slows_past_adaptive_timeout():
+    clock = _Clock()
+    registry = ResilienceRegistry(
+        failure_threshold=2, reset_timeout=10.0, min_samples=5, min_timeout=0.1, clock=clock
+    )
+    latency = {"seconds": 0.1}
+    seen = []
+
+    async def service(timeout):
+        seen.append(timeout)
+        if latency["seconds"] > timeout:
+            clock.now += timeout
+            raise httpx.ReadTimeout("timed out")
+        clock.now += latency["seconds"]
+        return "ok"
+
+    async def call():
+        try:
+            return await registry.call("qdrant", "qdrant.search", service, timeout=5.0)
+        except (httpx.ReadTimeout, CircuitOpenError):
+            return None
+
+    async def scenario():
+        for _ in range(10):
+            await call()
+        # The service is now 10x slower than the learned 0.3s timeout.
+        latency["seconds"] = 1.0
+        for _ in range(2):
+            assert await call() is None
+        # Each timeout widened the next one (0.3s, then 3 x 0.3s).
+        assert seen[-2:] == [pytest.approx(0.3), pytest.approx(0.9)]
+        assert registry.breaker("qdrant").state == OPEN
+        clock.now += 11.0
+        # The half-open probe runs with the configured timeout and succeeds.
+        assert await call() == "ok"
+        assert seen[-1] == 5.0
+        assert registry.breaker("qdrant").state == CLOSED
+        for _ in range(5):
+            assert await call() == "ok"
+
+    asyncio.run(scenario())
+
+
+def test_qdrant_memory_fails_fast_while_breaker_is_open():
+    attempts = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        attempts.append(request)
+        raise httpx.ConnectError("qdrant down", request=request)
+
+    registry = ResilienceRegistry(failure_threshold=2, reset_timeout=60.0)
+    memory = QdrantTaskMemory("http://qdrant.breaker", resilience=registry)
+    memory._client = httpx.AsyncClient(
+        base_url=memory.base_url, transport=httpx.MockTransport(handler)
+    )
+
+    async def scenario():
+        for _ in range(5):
+            assert await memory.retrieve("task-1", "anything") == []
+
+    asyncio.run(scenario())
+    assert len(attempts) == 2
+    assert registry.snapshot()["breakers"]["qdrant"]["state"] == OPEN
+
+
+def _warm(registry, endpoint, samples):
+    for _ in range(samples):
+        registry.latency(endpoint).calls += 1
+        registry.latency(endpoint).observe(0.001)
+
+
+def test_slow_idempotent_call_is_hedged_and_second_attempt_wins():
+    registry = ResilienceRegistry(min_samples=5, hedge_budget=1.0)
+    _warm(registry, "leaderboard.top", 5)
+    attempts = []
+
+    async def top(timeout):  # noqa: ARG001
+        attempts.append(len(attempts))
+        if len(attempts) == 1:
+            await asyncio.sleep(5)  # a GC pause on the first replica
+        return len(attempts)
+
+    async def scenario():
+        return await asyncio.wait_for(
+            registry.call("leaderboard", "leaderboard.top", top, timeout=10.0, hedge=True), 1.0
+        )
+
+    assert asyncio.run(scenario()) == 2
+    stats = registry.snapshot()["endpoints"]["leaderboard.top"]
+    assert (stats["hedged"], stats["hedge_wins"]) == (1, 1)
+
+
+def test_hedging_respects_budget_and_opt_in():
+    registry = ResilienceRegistry(min_samples=5, hedge_budget=0.0)
+    _warm(registry, "opa.check", 5)
+    calls = []
+
+    async def check(timeout):  # noqa: ARG001
+        calls.append(1)
+        await asyncio.sleep(0.02)
+        return True
+
+    async def scenario():
+        await registry.call("opa", "opa.check", check, timeout=1.0, hedge=True)
+        registry.hedge_budget = 1.0
+        await registry.call("opa", "opa.check", check, timeout=1.0)
+
+    asyncio.run(scenario())
+    assert len(calls) == 2
+    assert registry.latency("opa.check").hedged == 0
+
+
+def test_hedged_call_surfaces_error_when_both_attempts_fail():
+    registry = ResilienceRegistry(min_samples=5, hedge_budget=1.0, failure_threshold=10)
+    _warm(registry, "qdrant.search", 5)
+
+    async def search(timeout):  # noqa: ARG001
+        await asyncio.sleep(0.01)
+        raise httpx.ConnectError("qdrant down")
+
+    with pytest.raises(httpx.ConnectError):
+        asyncio.run(registry.call("qdrant", "qdrant.search", search, timeout=1.0, hedge=True))
+    assert registry.latency("qdrant.search").hedged == 1
@@ -2,7 +2,7 @@
 
 import asyncio
 
-from ..simulation import SimulationHarness
+from ..simulation import FaultProfile, SimulationHarness
 
 
 def test_simulation_harness_executes_reasoning_cycle():
@@ -15,3 +15,42 @@ def test_simulation_harness_executes_reasoning_cycle():
     assert result.difficulty in {"easy", "medium", "hard"}
     assert result.recommendations
     assert result.decision_summary
+
+
+def test_load_run_reports_per_stage_percentiles():
+    harness = SimulationHarness.build(record_stages=True)
+    report = asyncio.run(harness.run_load(40, concurrency=8, tasks=3, learners=5, skew=1.0))
+
+    assert report.cycles == 40
+    assert report.succeeded == 40 and report.failed == 0
+    assert report.throughput_per_second > 0
+    assert report.stages["cycle"].count == 40
+    for stage in ("opa.check", "task_memory.retrieve", "orchestrator.create_scenario", "leaderboard.publish"):
+        stats = report.stages[stage]
+        assert stats.count == 40
+        assert stats.p50 <= stats.p95 <= stats.p99
+
+
+def test_load_run_injects_latency_and_failures():
+    faults = {
+        "orchestrator": FaultProfile(latency=0.001, failure_rate=0.5, seed=7),
+    }
+    harness = SimulationHarness.build(faults=faults, record_stages=True)
+    report = asyncio.run(harness.run_load(30, concurrency=4, arrival_rate=2000.0, seed=3))
+
+    assert report.failed > 0
+    assert report.succeeded + report.failed == 30
+    assert report.stages["orchestrator.create_scenario"].errors == report.failed
+    assert report.stages["orchestrator.create_scenario"].p50 >= 0.001
+
+
+def test_open_loop_latency_includes_time_queued_for_a_slot():
+    faults = {"orchestrator": FaultProfile(latency=0.005, seed=1)}
+    harness = SimulationHarness.build(faults=faults)
+    report = asyncio.run(harness.run_load(10, concurrency=1, arrival_rate=100000.0, seed=1))
+
+    # Arrivals pile up behind one slot, so the slowest cycle waited for the
+    # nine before it instead of reporting only its own ~5ms.
+    assert report.stages["queued"].count == 10
+    assert report.stages["cycle"].p99 >= 9 * 0.005
+    assert report.stages["cycle"].p99 >= report.stages["queued"].p99
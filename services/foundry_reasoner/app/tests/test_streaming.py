@@ -0,0 +1,60 @@
+"""Tests for the server-sent events variant of the reasoning endpoint."""
+
+import asyncio
+import json
+
+from fastapi.testclient import TestClient
+
+from ..main import app, get_engine
+from ..schemas import ReasoningRequest
+from ..simulation import SimulationHarness
+
+
+def _request() -> ReasoningRequest:
+    return ReasoningRequest(
+        task_id="task-1",
+        objective="Improve network defense skills",
+        learner_id="learner-1",
+        performance_metrics={"accuracy": 0.72, "efficiency": 0.65},
+    )
+
+
+def _parse(body: str):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_engine_streams_stage_events_before_result():
+    harness = SimulationHarness.build()
+
+    async def collect():
+        return [event async for event in harness.engine.stream_reasoning_cycle(_request())]
+
+    events = asyncio.run(collect())
+    assert [name for name, _ in events] == ["memory_context", "scenario", "score", "difficulty", "result"]
+    result = events[-1][1]
+    assert events[1][1]["scenario_id"] == result["scenario_id"]
+    assert events[2][1]["score"] == result["score"]
+    assert events[3][1]["difficulty"] == result["difficulty"]
+
+
+def test_stream_endpoint_emits_sse_and_reports_denials():
+    harness = SimulationHarness.build()
+    app.dependency_overrides[get_engine] = lambda: harness.engine
+    try:
+        client = TestClient(app)
+        payload = _request().model_dump()
+
+        response = client.post("/api/reason/stream", json=payload)
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        assert [name for name, _ in _parse(response.text)][-1] == "result"
+
+        harness.engine.opa_client.allowed = False
+        events = _parse(client.post("/api/reason/stream", json=payload).text)
+        assert events == [("error", {"status": 403, "detail": "OPA denied reasoning request"})]
+    finally:
+        app.dependency_overrides.clear()
@@ -0,0 +1,54 @@
+"""Tests for per-stage reasoning spans."""
+
+import asyncio
+
+from ..simulation import SimulationHarness
+from ..tracing import Histogram, corr_id_var
+
+
+STAGES = [
+    "opa_check",
+    "memory_retrieve",
+    "plan_build",
+    "scenario_create",
+    "evaluate",
+    "adjust",
+    "publish",
+    "persist",
+    "cycle",
+]
+
+
+def test_every_stage_is_timed_under_the_request_correlation_id():
+    harness = SimulationHarness.build()
+    tracer = harness.engine.tracer
+
+    async def scenario():
+        corr_id_var.set("corr-123")
+        await harness.run_once()
+
+    asyncio.run(scenario())
+
+    spans = tracer.spans_for("corr-123")
+    assert [span.stage for span in spans] == STAGES
+    assert all(span.duration >= 0 for span in spans)
+    assert tracer.snapshot()["persist"]["count"] == 1
+
+
+def test_cycles_without_correlation_id_get_a_local_one():
+    harness = SimulationHarness.build()
+    asyncio.run(harness.run_once())
+
+    spans = list(harness.engine.tracer.recent)
+    assert len({span.corr_id for span in spans}) == 1
+    assert spans[0].corr_id.startswith("local-")
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram(buckets=(0.01, 0.1))
+    for value in (0.005, 0.05, 0.5):
+        histogram.observe(value)
+
+    snapshot = histogram.snapshot()
+    assert snapshot["count"] == 3
+    assert snapshot["buckets"] == {"0.01": 1, "0.1": 2, "+Inf": 3}
@@ -0,0 +1,104 @@
+"""Tests for the Qdrant-backed task memory."""
+
+import asyncio
+import json
+
+import httpx
+
+from ..vector_store import MemoryRecord, QdrantTaskMemory, _READY_COLLECTIONS
+
+
+def _memory_with_transport(handler, **kwargs) -> QdrantTaskMemory:
+    memory = QdrantTaskMemory("http://qdrant.test", collection="batched", **kwargs)
+    memory._client = httpx.AsyncClient(
+        base_url=memory.base_url, transport=httpx.MockTransport(handler)
+    )
+    return memory
+
+
+def _record(index: int) -> MemoryRecord:
+    return MemoryRecord(task_id="task-1", content=f"memory {index}", vector=[1.0, 0.0])
+
+
+def test_buffered_store_coalesces_points_into_one_upsert():
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200, json={"result": True})
+
+    _READY_COLLECTIONS.discard(("http://qdrant.test", "batched"))
+    memory = _memory_with_transport(handler, batch_size=3, flush_interval=60.0)
+
+    async def scenario():
+        for index in range(4):
+            await memory.store(_record(index))
+        await memory.close()
+
+    asyncio.run(scenario())
+
+    upserts = [req for req in requests if req.url.path.endswith("/points")]
+    assert [len(json.loads(req.content)["points"]) for req in upserts] == [3, 1]
+    assert upserts[0].url.params["wait"] == "false"
+    assert upserts[1].url.params["wait"] == "true"
+    assert all(point["id"] for point in json.loads(upserts[0].content)["points"])
+
+
+def test_collection_setup_is_shared_across_instances():
+    setups = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/collections/batched":
+            setups.append(request)
+        return httpx.Response(200, json={"result": True})
+
+    _READY_COLLECTIONS.discard(("http://qdrant.test", "batched"))
+
+    async def scenario():
+        for _ in range(2):
+            memory = _memory_with_transport(handler)
+            await memory.store(_record(0))
+            await memory.close()
+
+    asyncio.run(scenario())
+    assert len(setups) == 1
+
+
+def test_failed_batch_falls_back_to_local_records():
+    def handler(request: httpx.Request) -> httpx.Response:
+        raise httpx.ConnectError("qdrant down", request=request)
+
+    memory = _memory_with_transport(handler, batch_size=2)
+
+    async def scenario():
+        await memory.store(_record(0))
+        await memory.store(_record(1))
+        return await memory.retrieve("task-1", "memory")
+
+    results = asyncio.run(scenario())
+    assert len(results) == 2
+
+
+def test_existing_collection_is_patched_to_requested_quantization():
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if request.method == "PUT" and request.url.path == "/collections/batched":
+            return httpx.Response(409, json={"status": {"error": "already exists"}})
+        if request.method == "GET":
+            return httpx.Response(200, json={"result": {"config": {"quantization_config": None}}})
+        return httpx.Response(200, json={"result": True})
+
+    _READY_COLLECTIONS.discard(("http://qdrant.test", "batched"))
+    memory = _memory_with_transport(handler, quantization="int8")
+
+    async def scenario():
+        await memory._ensure_collection()
+        await memory.close()
+
+    asyncio.run(scenario())
+
+    assert [request.method for request in requests] == ["PUT", "GET", "PATCH"]
+    assert json.loads(requests[-1].content)["quantization_config"]["scalar"]["type"] == "int8"
+    assert ("http://qdrant.test", "batched") in _READY_COLLECTIONS
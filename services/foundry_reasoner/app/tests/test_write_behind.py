@@ -0,0 +1,164 @@
+"""Tests for the write-behind side-effect queue."""
+
+import asyncio
+
+from ..reasoning import LEADERBOARD_JOB, MEMORY_JOB, build_side_effect_handlers
+from ..simulation import InMemoryTaskMemory, SimulationHarness, SimulationLeaderboard
+from ..write_behind import WriteBehindQueue
+
+
+def test_queue_flushes_jobs_in_batches():
+    batches = []
+
+    async def handler(payloads):
+        batches.append(payloads)
+
+    async def scenario():
+        queue = WriteBehindQueue({"memory": handler}, batch_size=2)
+        for index in range(3):
+            queue.submit("memory", {"n": index})
+        await queue.drain()
+        return queue.pending()
+
+    assert asyncio.run(scenario()) == 0
+    assert batches == [[{"n": 0}, {"n": 1}], [{"n": 2}]]
+
+
+def test_submit_buffers_and_the_flusher_spools_off_the_event_loop(tmp_path):
+    import threading
+
+    delivered = []
+
+    async def handler(payloads):
+        delivered.extend(payloads)
+
+    async def scenario():
+        queue = WriteBehindQueue({"memory": handler}, tmp_path / "spool.sqlite3")
+        statements = []
+        queue._conn.set_trace_callback(lambda sql: statements.append((sql, threading.current_thread())))
+        for index in range(3):
+            queue.submit("memory", {"n": index})
+        assert statements == [] and queue.pending() == 3
+        statements.clear()
+        await queue.drain()
+        inserts = [thread for sql, thread in statements if sql.startswith("INSERT")]
+        assert inserts and threading.main_thread() not in inserts
+        await queue.close()
+
+    asyncio.run(scenario())
+    assert delivered == [{"n": 0}, {"n": 1}, {"n": 2}]
+
+def test_failed_batches_are_retried_with_backoff():
+    attempts = {"n": 0}
+
+    async def flaky(payloads):  # noqa: ARG001
+        attempts["n"] += 1
+        if attempts["n"] == 1:
+            raise RuntimeError("leaderboard unavailable")
+
+    async def scenario():
+        queue = WriteBehindQueue({"leaderboard": flaky}, retry_backoff=60.0)
+        queue.submit("leaderboard", {"learner_id": "l-1"})
+        assert await queue.flush() == 0
+        # Still backing off, so a regular flush does not retry yet.
+        assert await queue.flush() == 0
+        assert queue.pending() == 1
+        assert await queue.flush(ignore_backoff=True) == 1
+        return queue.pending()
+
+    assert asyncio.run(scenario()) == 0
+    assert attempts["n"] == 2
+
+
+def test_spooled_jobs_survive_restart(tmp_path):
+    path = tmp_path / "spool.sqlite3"
+    delivered = []
+
+    async def failing(payloads):  # noqa: ARG001
+        raise RuntimeError("down")
+
+    async def recording(payloads):
+        delivered.extend(payloads)
+
+    async def first_process():
+        queue = WriteBehindQueue({"memory": failing}, path)
+        queue.submit("memory", {"task_id": "task-1"})
+        await queue.close()
+
+    async def second_process():
+        queue = WriteBehindQueue({"memory": recording}, path)
+        await queue.close()
+
+    asyncio.run(first_process())
+    asyncio.run(second_process())
+    assert delivered == [{"task_id": "task-1"}]
+
+
+def test_engine_defers_side_effects_to_queue():
+    harness = SimulationHarness.build()
+    engine = harness.engine
+    memory = InMemoryTaskMemory()
+    leaderboard = SimulationLeaderboard()
+    engine.task_memory = memory
+    engine.leaderboard_client = leaderboard
+    queue = WriteBehindQueue(build_side_effect_handlers(memory, leaderboard))
+    engine.side_effects = queue
+
+    async def scenario():
+        result = await harness.run_once()
+        assert not memory.records and not leaderboard.entries
+        assert queue.pending() == 2
+        await queue.close()
+        return result
+
+    result = asyncio.run(scenario())
+    assert result.allowed is True
+    assert len(memory.records) == 1
+    assert memory.records[0].metadata["scenario_id"] == result.scenario_id
+    assert [entry["learner_id"] for entry in leaderboard.entries] == ["learner-1"]
+    assert {MEMORY_JOB, LEADERBOARD_JOB} == set(queue.handlers)
+
+
+def test_leaderboard_batches_are_posted_as_one_request(monkeypatch):
+    import httpx
+
+    from services.leaderboard_service.app import main as leaderboard_service
+
+    from .. import clients
+
+    requests = []
+
+    async def record(request):
+        requests.append(request)
+
+    real_client = httpx.AsyncClient
+
+    def client_factory(**kwargs):
+        return real_client(
+            transport=httpx.ASGITransport(app=leaderboard_service.app),
+            event_hooks={"request": [record]},
+            **kwargs,
+        )
+
+    monkeypatch.setattr(clients.httpx, "AsyncClient", client_factory)
+    monkeypatch.setattr(leaderboard_service, "_LEADERBOARD", {})
+    client = clients.LeaderboardClient("http://leaderboard.test")
+    entries = [
+        {"learner_id": "l-1", "score": 40.0, "difficulty": "easy", "notes": ""},
+        {"learner_id": "l-2", "score": 101.0, "difficulty": "easy", "notes": ""},
+    ]
+
+    async def scenario():
+        try:
+            await client.publish_many(entries)
+        except httpx.HTTPStatusError as exc:
+            return exc.response.status_code
+        return None
+
+    # One invalid entry rejects the whole batch, so a retry re-sends nothing twice.
+    assert asyncio.run(scenario()) == 422
+    assert leaderboard_service._LEADERBOARD == {}
+    entries[1]["score"] = 90.0
+    assert asyncio.run(scenario()) is None
+    assert [request.url.path for request in requests] == ["/api/leaderboard/batch"] * 2
+    assert sorted(leaderboard_service._LEADERBOARD) == ["l-1", "l-2"]
@@ -0,0 +1,177 @@
+"""Correlation IDs and per-stage timing spans for the reasoning workflow.
+
+:class:`StageTracer` times each step of
+:meth:`~.reasoning.ReasoningEngine.run_reasoning_cycle` with a monotonic clock,
+tags it with the request's correlation ID and feeds a fixed-bucket histogram
+per stage (exposed through ``GET /metrics``). When an OTLP endpoint is
+configured and ``opentelemetry-sdk`` plus ``opentelemetry-exporter-otlp`` are
+installed, the same spans are exported as traces.
+"""
+
+from __future__ import annotations
+
+import bisect
+import contextlib
+import logging
+import time
+import uuid
+from collections import deque
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+from fastapi import FastAPI
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import Response
+
+logger = logging.getLogger(__name__)
+
+# The correlation helpers below deliberately mirror
+# backend/orchestrator/correlation.py (same header, same context variable
+# name) so IDs propagate identically across both services. They are copied
+# rather than imported because the reasoner image only ships its own ``app``
+# directory (see services/foundry_reasoner/Dockerfile); keep the two in sync.
+corr_id_var: ContextVar[str] = ContextVar("corr_id", default="")
+
+DEFAULT_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class CorrelationIdMiddleware(BaseHTTPMiddleware):
+    async def dispatch(
+        self,
+        request: Request,
+        call_next: Callable[[Request], Awaitable[Response]],
+    ) -> Response:
+        correlation_id = request.headers.get("X-Correlation-ID") or str(uuid.uuid4())
+        corr_id_var.set(correlation_id)
+        request.state.corr_id = correlation_id
+        response = await call_next(request)
+        response.headers["X-Correlation-ID"] = correlation_id
+        return response
+
+
+def install_correlation_middleware(app: FastAPI) -> None:
+    """Attach the correlation ID middleware to the given FastAPI app."""
+
+    app.add_middleware(CorrelationIdMiddleware)
+
+
+def current_corr_id() -> str:
+    """Return the correlation ID for the current request context."""
+
+    return corr_id_var.get()
+
+
+class Histogram:
+    """Cumulative fixed-bucket latency histogram (Prometheus style)."""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def snapshot(self) -> Dict[str, Any]:
+        cumulative: Dict[str, int] = {}
+        running = 0
+        for bound, count in zip(self.buckets, self.counts):
+            running += count
+            cumulative[str(bound)] = running
+        cumulative["+Inf"] = self.count
+        return {"count": self.count, "sum": self.sum, "buckets": cumulative}
+
+
+@dataclass
+class Span:
+    """A completed stage timing."""
+
+    stage: str
+    corr_id: str
+    duration: float
+    failed: bool = False
+
+
+def build_otlp_tracer(endpoint: str, service_name: str = "foundry_reasoner") -> Any:
+    """Return an OpenTelemetry tracer exporting to ``endpoint`` or ``None``."""
+
+    try:
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter  # type: ignore
+        from opentelemetry.sdk.resources import Resource  # type: ignore
+        from opentelemetry.sdk.trace import TracerProvider  # type: ignore
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor  # type: ignore
+    except Exception:
+        logger.warning("otlp_export_disabled reason=opentelemetry-sdk not installed")
+        return None
+    provider = TracerProvider(resource=Resource.create({"service.name": service_name}))
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter(endpoint=endpoint)))
+    return provider.get_tracer(service_name)
+
+
+class StageTracer:
+    """Time reasoning stages, keep histograms and optionally export spans."""
+
+    def __init__(self, *, otel_tracer: Any = None, recent: int = 256) -> None:
+        self.otel_tracer = otel_tracer
+        self.histograms: Dict[str, Histogram] = {}
+        self.recent: Deque[Span] = deque(maxlen=recent)
+
+    @contextlib.contextmanager
+    def cycle(self) -> Iterator[str]:
+        """Wrap a whole reasoning cycle, ensuring a correlation ID is bound."""
+
+        corr_id = current_corr_id()
+        token = None
+        if not corr_id:
+            corr_id = f"local-{uuid.uuid4()}"
+            token = corr_id_var.set(corr_id)
+        try:
+            with self.span("cycle"):
+                yield corr_id
+        finally:
+            if token is not None:
+                corr_id_var.reset(token)
+
+    @contextlib.contextmanager
+    def span(self, stage: str) -> Iterator[None]:
+        corr_id = current_corr_id()
+        otel_cm = (
+            self.otel_tracer.start_as_current_span(stage, attributes={"correlation_id": corr_id})
+            if self.otel_tracer is not None
+            else contextlib.nullcontext()
+        )
+        started = time.perf_counter()
+        failed = False
+        with otel_cm:
+            try:
+                yield
+            except BaseException:
+                failed = True
+                raise
+            finally:
+                self._record(Span(stage, corr_id, time.perf_counter() - started, failed))
+
+    def _record(self, span: Span) -> None:
+        histogram = self.histograms.get(span.stage)
+        if histogram is None:
+            histogram = self.histograms[span.stage] = Histogram()
+        histogram.observe(span.duration)
+        self.recent.append(span)
+        logger.debug(
+            "reasoner_stage stage=%s corr_id=%s duration_ms=%.3f failed=%s",
+            span.stage,
+            span.corr_id,
+            span.duration * 1000.0,
+            span.failed,
+        )
+
+    def spans_for(self, corr_id: str) -> List[Span]:
+        return [span for span in self.recent if span.corr_id == corr_id]
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {stage: histogram.snapshot() for stage, histogram in sorted(self.histograms.items())}
@@ -3,13 +3,84 @@
 from __future__ import annotations
 
 import asyncio
+import logging
+import uuid
 from dataclasses import dataclass, field
-from typing import Any, Dict, Iterable, List, Optional
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Set, Tuple
 
 import httpx
 import math
 
 from .embedding import embed_text
+from .lexical import HybridConfig, LexicalIndex, memory_text
+from .resilience import CircuitOpenError, ResilienceRegistry
+
+if TYPE_CHECKING:  # pragma: no cover - import cycle guard
+    from .local_store import PersistentLocalMemory
+
+logger = logging.getLogger(__name__)
+
+# Collections already created per (base_url, collection), shared across
+# ``QdrantTaskMemory`` instances so rebuilding an engine skips the setup PUT.
+_READY_COLLECTIONS: Set[Tuple[str, str]] = set()
+
+_SCROLL_PAGE = 256
+
+
+def cosine_similarity(a: Iterable[float], b: Iterable[float]) -> float:
+    """Cosine similarity over the common prefix of two vectors."""
+
+    a, b = list(a), list(b)
+    if not a or not b:
+        return 0.0
+    length = min(len(a), len(b))
+    dot = sum(a[i] * b[i] for i in range(length))
+    norm_a = math.sqrt(sum(value * value for value in a[:length]))
+    norm_b = math.sqrt(sum(value * value for value in b[:length]))
+    if norm_a == 0.0 or norm_b == 0.0:
+        return 0.0
+    return dot / (norm_a * norm_b)
+
+
+def search_records(
+    records: List["MemoryRecord"],
+    task_id: str,
+    query_vector: Iterable[float],
+    top_k: int,
+    *,
+    lexical: Optional[LexicalIndex] = None,
+    query_text: Optional[str] = None,
+) -> List["MemoryRecord"]:
+    """Rank the ``task_id`` records of an in-process list by cosine similarity.
+
+    With a ``lexical`` index (keyed by list position) only its BM25
+    candidates are scored and the result uses the blended hybrid ranking.
+    """
+
+    query_vec = list(query_vector)
+    if lexical is not None and query_text:
+        if not lexical.has(task_id):
+            lexical.build(
+                task_id,
+                (
+                    (index, memory_text(record.content, record.metadata))
+                    for index, record in enumerate(records)
+                    if record.task_id == task_id
+                ),
+            )
+        candidates = lexical.candidates(task_id, query_text)
+        if len(candidates) >= top_k:
+            cosine = {key: cosine_similarity(records[key].vector, query_vec) for _, key in candidates}
+            return [records[key] for key in lexical.rank(candidates, cosine, top_k)]
+
+    scores: List[Tuple[float, MemoryRecord]] = []
+    for record in records:
+        if record.task_id != task_id:
+            continue
+        scores.append((cosine_similarity(record.vector, query_vec), record))
+    scores.sort(key=lambda item: item[0], reverse=True)
+    return [record for _, record in scores[:top_k]]
 
 
 @dataclass
@@ -31,9 +102,56 @@ class TaskMemory:
     async def store(self, record: MemoryRecord) -> None:  # pragma: no cover - interface
         raise NotImplementedError
 
+    async def store_many(self, records: List[MemoryRecord]) -> None:
+        for record in records:
+            await self.store(record)
+
+    # Maintenance hooks used by :class:`~.consolidation.MemoryConsolidator`.
+    # The defaults describe an empty store, so consolidation is a no-op for
+    # implementations that do not support it.
+    async def task_ids(self) -> List[str]:
+        return []
+
+    async def scan(self, task_id: str) -> List[Tuple[Any, MemoryRecord]]:  # noqa: ARG002
+        """Return ``(key, record)`` pairs for every record of ``task_id``."""
+
+        return []
+
+    async def delete_many(self, keys: List[Any]) -> None:
+        """Delete the records identified by keys returned from :meth:`scan`."""
+
+        raise NotImplementedError
+
 
 class QdrantTaskMemory(TaskMemory):
-    """Implementation backed by Qdrant with an in-memory fallback for offline testing."""
+    """Implementation backed by Qdrant with an in-memory fallback for offline testing.
+
+    With ``batch_size > 1`` :meth:`store` buffers records and flushes them as a
+    single multi-point upsert once ``batch_size`` records are pending or
+    ``flush_interval`` seconds have passed. Buffered flushes use Qdrant's
+    ``wait=false`` acknowledgement since nobody is waiting on the write; call
+    :meth:`close` on shutdown to flush what is left.
+
+    When ``local_path`` is set the offline fallback is a
+    :class:`~.local_store.PersistentLocalMemory` directory instead of a plain
+    list, so an air-gapped reasoner keeps its memories across restarts.
+
+    ``quantization="int8"`` stores vectors as int8 with a per-vector scale:
+    the Qdrant collection is created with scalar quantization (originals on
+    disk) and the local store keeps an int8 copy for scanning. ``rescore``
+    re-ranks the ``oversampling`` x ``top_k`` best quantized candidates
+    against the original float vectors.
+
+    ``hedge`` hedges searches at their observed tail latency through the
+    ``resilience`` registry.
+
+    ``hybrid`` enables BM25 lexical prefiltering (see :mod:`.lexical`) for
+    the local fallback search; Qdrant itself keeps ranking by vector alone.
+
+    :meth:`scan` and :meth:`delete_many` cover both Qdrant points and the
+    local fallback records; keys are ``("qdrant", point_id)``,
+    ``("local", row_id)`` or ``("list", index)``.
+    """
 
     def __init__(
         self,
@@ -42,23 +160,86 @@ class QdrantTaskMemory(TaskMemory):
         *,
         timeout: float = 5.0,
         local_fallback: bool = True,
+        batch_size: int = 1,
+        flush_interval: float = 0.25,
+        local_path: str | Path | None = None,
+        resilience: Optional[ResilienceRegistry] = None,
+        quantization: Optional[str] = None,
+        rescore: bool = True,
+        oversampling: float = 2.0,
+        hybrid: Optional[HybridConfig] = None,
+        hedge: bool = False,
     ) -> None:
+        if quantization not in (None, "int8"):
+            raise ValueError(f"Unsupported quantization '{quantization}'")
         self.base_url = base_url.rstrip("/")
         self.collection = collection
         self.timeout = timeout
         self.local_fallback = local_fallback
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.resilience = resilience
+        self.hedge = hedge
+        self.quantization = quantization
+        self.rescore = rescore
+        self.oversampling = oversampling
         self._local_records: List[MemoryRecord] = []
+        self._lexical = LexicalIndex(hybrid) if hybrid is not None else None
+        self._local_store: Optional["PersistentLocalMemory"] = None
+        if local_path is not None:
+            from .local_store import PersistentLocalMemory
+
+            self._local_store = PersistentLocalMemory(
+                local_path,
+                quantize=quantization == "int8",
+                rescore=rescore,
+                oversampling=oversampling,
+                hybrid=hybrid,
+            )
         self._collection_ready = asyncio.Lock()
-        self._collection_created = False
+        self._client: Optional[httpx.AsyncClient] = None
+        self._buffer: List[MemoryRecord] = []
+        self._flush_task: Optional[asyncio.Task[None]] = None
 
-    async def _request(self, method: str, path: str, json: Optional[Dict[str, Any]] = None) -> Optional[httpx.Response]:
-        url = f"{self.base_url}{path}"
-        try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                resp = await client.request(method, url, json=json)
+    @property
+    def _collection_created(self) -> bool:
+        return (self.base_url, self.collection) in _READY_COLLECTIONS
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(base_url=self.base_url, timeout=self.timeout)
+        return self._client
+
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        json: Optional[Dict[str, Any]] = None,
+        params: Optional[Dict[str, Any]] = None,
+        *,
+        endpoint: str = "request",
+        accept: Tuple[int, ...] = (),
+        idempotent: bool = False,
+    ) -> Optional[httpx.Response]:
+        async def send(timeout: float) -> httpx.Response:
+            resp = await self._get_client().request(
+                method, path, json=json, params=params, timeout=timeout
+            )
+            if resp.status_code not in accept:
                 resp.raise_for_status()
-                return resp
-        except (httpx.RequestError, httpx.HTTPStatusError):
+            return resp
+
+        try:
+            if self.resilience is None:
+                return await send(self.timeout)
+            return await self.resilience.call(
+                "qdrant",
+                f"qdrant.{endpoint}",
+                send,
+                timeout=self.timeout,
+                hedge=self.hedge and idempotent,
+            )
+        except (httpx.RequestError, httpx.HTTPStatusError, CircuitOpenError):
             if not self.local_fallback:
                 raise
             return None
@@ -69,19 +250,63 @@ class QdrantTaskMemory(TaskMemory):
         async with self._collection_ready:
             if self._collection_created:
                 return
-            payload = {
+            payload: Dict[str, Any] = {
                 "vectors": {
                     "size": 64,
                     "distance": "Cosine",
                 }
             }
-            await self._request("PUT", f"/collections/{self.collection}", json=payload)
-            self._collection_created = True
+            quantization_config = None
+            if self.quantization == "int8":
+                payload["vectors"]["on_disk"] = True
+                quantization_config = {
+                    "scalar": {"type": "int8", "quantile": 0.99, "always_ram": True}
+                }
+                payload["quantization_config"] = quantization_config
+            resp = await self._request(
+                "PUT",
+                f"/collections/{self.collection}",
+                json=payload,
+                endpoint="collection",
+                accept=(409,),  # collection already exists
+            )
+            if resp is None:
+                return
+            if resp.status_code == 409 and quantization_config is not None:
+                if not await self._reconcile_quantization(quantization_config):
+                    return
+            _READY_COLLECTIONS.add((self.base_url, self.collection))
+
+    async def _reconcile_quantization(self, wanted: Dict[str, Any]) -> bool:
+        """Apply ``wanted`` to a collection created before quantization was
+        enabled; returns ``False`` when Qdrant could not be asked."""
+
+        resp = await self._request(
+            "GET", f"/collections/{self.collection}", endpoint="collection", idempotent=True
+        )
+        if resp is None:
+            return False
+        config = (resp.json().get("result") or {}).get("config") or {}
+        if config.get("quantization_config") == wanted:
+            return True
+        logger.warning(
+            "qdrant_collection_quantization_update collection=%s current=%s wanted=%s",
+            self.collection,
+            config.get("quantization_config"),
+            wanted,
+        )
+        resp = await self._request(
+            "PATCH",
+            f"/collections/{self.collection}",
+            json={"quantization_config": wanted},
+            endpoint="collection",
+        )
+        return resp is not None
 
     async def retrieve(self, task_id: str, query: str, top_k: int = 3) -> List[MemoryRecord]:
         await self._ensure_collection()
         query_vector = embed_text(query)
-        payload = {
+        payload: Dict[str, Any] = {
             "vector": query_vector,
             "limit": top_k,
             "filter": {
@@ -93,9 +318,19 @@ class QdrantTaskMemory(TaskMemory):
                 ]
             },
         }
-        resp = await self._request("POST", f"/collections/{self.collection}/points/search", json=payload)
+        if self.quantization is not None:
+            payload["params"] = {
+                "quantization": {"rescore": self.rescore, "oversampling": self.oversampling}
+            }
+        resp = await self._request(
+            "POST",
+            f"/collections/{self.collection}/points/search",
+            json=payload,
+            endpoint="search",
+            idempotent=True,
+        )
         if resp is None:
-            return self._fallback_search(task_id, query_vector, top_k)
+            return self._fallback_search(task_id, query_vector, top_k, query)
         data = resp.json()
         hits = data.get("result", [])
         results: List[MemoryRecord] = []
@@ -112,45 +347,174 @@ class QdrantTaskMemory(TaskMemory):
         return results
 
     async def store(self, record: MemoryRecord) -> None:
+        if self.batch_size <= 1:
+            await self.store_many([record])
+            return
+        self._buffer.append(record)
+        if len(self._buffer) >= self.batch_size:
+            await self.flush(wait=False)
+        elif self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.get_running_loop().create_task(self._flush_later())
+
+    async def store_many(self, records: List[MemoryRecord]) -> None:
+        if records:
+            await self._upsert(list(records), wait=True)
+
+    async def flush(self, *, wait: bool = True) -> None:
+        """Upsert every buffered record in a single request."""
+
+        if not self._buffer:
+            return
+        records, self._buffer = self._buffer, []
+        await self._upsert(records, wait=wait)
+
+    async def close(self) -> None:
+        """Flush buffered records and release the pooled HTTP connection."""
+
+        if self._flush_task is not None and not self._flush_task.done():
+            self._flush_task.cancel()
+        self._flush_task = None
+        try:
+            await self.flush(wait=True)
+        finally:
+            if self._client is not None:
+                await self._client.aclose()
+                self._client = None
+            if self._local_store is not None:
+                self._local_store.close()
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.flush_interval)
+        try:
+            await self.flush(wait=False)
+        except Exception:  # pragma: no cover - background safety net
+            logger.exception("qdrant_flush_failed collection=%s", self.collection)
+
+    async def _upsert(self, records: List[MemoryRecord], *, wait: bool) -> None:
         await self._ensure_collection()
-        payload = {
-            "points": [
-                {
-                    "id": record.metadata.get("id") if record.metadata else None,
-                    "vector": list(record.vector),
-                    "payload": {
-                        "task_id": record.task_id,
-                        "content": record.content,
-                        **record.metadata,
-                    },
-                }
+        payload = {"points": [self._to_point(record) for record in records]}
+        resp = await self._request(
+            "PUT",
+            f"/collections/{self.collection}/points",
+            json=payload,
+            params={"wait": "true" if wait else "false"},
+            endpoint="upsert",
+        )
+        if resp is None and self.local_fallback:
+            self._remember_locally(records)
+
+    async def _scroll(
+        self, task_id: Optional[str], *, with_vector: bool
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Page through the collection; ``None`` when Qdrant is unreachable."""
+
+        await self._ensure_collection()
+        payload: Dict[str, Any] = {
+            "limit": _SCROLL_PAGE,
+            "with_payload": True if with_vector else {"include": ["task_id"]},
+            "with_vector": with_vector,
+        }
+        if task_id is not None:
+            payload["filter"] = {"must": [{"key": "task_id", "match": {"value": task_id}}]}
+        points: List[Dict[str, Any]] = []
+        while True:
+            resp = await self._request(
+                "POST", f"/collections/{self.collection}/points/scroll", json=payload, endpoint="scroll"
+            )
+            if resp is None:
+                return None
+            result = resp.json().get("result") or {}
+            points.extend(result.get("points") or [])
+            offset = result.get("next_page_offset")
+            if offset is None:
+                return points
+            payload["offset"] = offset
+
+    async def task_ids(self) -> List[str]:
+        task_ids: Set[str] = set()
+        points = await self._scroll(None, with_vector=False)
+        for point in points or []:
+            task_id = (point.get("payload") or {}).get("task_id")
+            if task_id:
+                task_ids.add(task_id)
+        if self._local_store is not None:
+            task_ids.update(self._local_store.task_ids())
+        task_ids.update(record.task_id for record in self._local_records)
+        return sorted(task_ids)
+
+    async def scan(self, task_id: str) -> List[Tuple[Any, MemoryRecord]]:
+        entries: List[Tuple[Any, MemoryRecord]] = []
+        for point in await self._scroll(task_id, with_vector=True) or []:
+            payload = point.get("payload") or {}
+            record = MemoryRecord(
+                task_id=payload.get("task_id", task_id),
+                content=payload.get("content", ""),
+                vector=point.get("vector") or [],
+                metadata=payload,
+            )
+            entries.append((("qdrant", point.get("id")), record))
+        if self._local_store is not None:
+            entries.extend((("local", row_id), record) for row_id, record in self._local_store.rows_for(task_id))
+        entries.extend(
+            (("list", index), record)
+            for index, record in enumerate(self._local_records)
+            if record.task_id == task_id
+        )
+        return entries
+
+    async def delete_many(self, keys: List[Any]) -> None:
+        grouped: Dict[str, List[Any]] = {"qdrant": [], "local": [], "list": []}
+        for source, key in keys:
+            grouped[source].append(key)
+        if grouped["qdrant"]:
+            await self._request(
+                "POST",
+                f"/collections/{self.collection}/points/delete",
+                json={"points": grouped["qdrant"]},
+                params={"wait": "true"},
+                endpoint="delete",
+            )
+        if grouped["local"] and self._local_store is not None:
+            self._local_store.delete(grouped["local"])
+        if grouped["list"]:
+            dropped = set(grouped["list"])
+            self._local_records = [
+                record for index, record in enumerate(self._local_records) if index not in dropped
             ]
+            if self._lexical is not None:
+                self._lexical.clear()  # list positions shifted
+
+    def _remember_locally(self, records: List[MemoryRecord]) -> None:
+        if self._local_store is not None:
+            self._local_store.extend(records)
+        else:
+            for record in records:
+                self._local_records.append(record)
+                if self._lexical is not None:
+                    self._lexical.add(
+                        record.task_id,
+                        len(self._local_records) - 1,
+                        memory_text(record.content, record.metadata),
+                    )
+
+    @staticmethod
+    def _to_point(record: MemoryRecord) -> Dict[str, Any]:
+        point_id = record.metadata.get("id") if record.metadata else None
+        return {
+            "id": point_id or str(uuid.uuid4()),
+            "vector": list(record.vector),
+            "payload": {
+                "task_id": record.task_id,
+                "content": record.content,
+                **record.metadata,
+            },
         }
-        resp = await self._request("PUT", f"/collections/{self.collection}/points", json=payload)
-        if resp is None and self.local_fallback:
-            self._local_records.append(record)
-
-    def _fallback_search(self, task_id: str, query_vector: Iterable[float], top_k: int) -> List[MemoryRecord]:
-        if not self._local_records:
-            return []
-
-        def cosine(a: List[float], b: List[float]) -> float:
-            if not a or not b:
-                return 0.0
-            length = min(len(a), len(b))
-            dot = sum(a[i] * b[i] for i in range(length))
-            norm_a = math.sqrt(sum(value * value for value in a[:length]))
-            norm_b = math.sqrt(sum(value * value for value in b[:length]))
-            if norm_a == 0.0 or norm_b == 0.0:
-                return 0.0
-            return dot / (norm_a * norm_b)
-
-        query_vec = list(query_vector)
-        scores: List[tuple[float, MemoryRecord]] = []
-        for record in self._local_records:
-            if record.task_id != task_id:
-                continue
-            rec_vec = list(record.vector)
-            scores.append((cosine(rec_vec, query_vec), record))
-        scores.sort(key=lambda item: item[0], reverse=True)
-        return [record for _, record in scores[:top_k]]
+
+    def _fallback_search(
+        self, task_id: str, query_vector: Iterable[float], top_k: int, query: Optional[str] = None
+    ) -> List[MemoryRecord]:
+        if self._local_store is not None:
+            return self._local_store.search(task_id, query_vector, top_k, query_text=query)
+        return search_records(
+            self._local_records, task_id, query_vector, top_k, lexical=self._lexical, query_text=query
+        )
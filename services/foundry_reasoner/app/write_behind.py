@@ -0,0 +1,233 @@
+"""Durable write-behind queue for reasoning side effects.
+
+Persisting task memory and publishing leaderboard outcomes do not influence the
+response returned to the caller, so the :class:`ReasoningEngine` can hand them
+to a :class:`WriteBehindQueue` instead of awaiting them inline. Submitting
+only buffers the job in memory; the background task writes buffered jobs to a
+local SQLite spool in one transaction per batch, from a worker thread, so they
+survive restarts, then flushes them with exponential-backoff retries. Jobs
+submitted within the last ``flush_interval`` are lost if the process dies
+before they are spooled.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+BatchHandler = Callable[[List[Dict[str, Any]]], Awaitable[None]]
+
+
+@dataclass
+class QueuedJob:
+    """A side effect waiting to be flushed."""
+
+    id: int
+    kind: str
+    payload: Dict[str, Any]
+    attempts: int = 0
+
+
+class WriteBehindQueue:
+    """Spool side effects to disk and flush them asynchronously in batches.
+
+    ``handlers`` maps a job kind (e.g. ``"memory"``) to a coroutine receiving a
+    list of payloads. A handler failure causes the whole batch of that kind to
+    be retried after a backoff; jobs exceeding ``max_attempts`` are dropped and
+    logged. Passing ``path=None`` keeps the spool in memory, which is handy for
+    tests and simulations.
+    """
+
+    def __init__(
+        self,
+        handlers: Mapping[str, BatchHandler],
+        path: str | Path | None = None,
+        *,
+        batch_size: int = 50,
+        flush_interval: float = 0.5,
+        max_attempts: int = 5,
+        retry_backoff: float = 1.0,
+    ) -> None:
+        self.handlers = dict(handlers)
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.max_attempts = max(1, max_attempts)
+        self.retry_backoff = retry_backoff
+        self._conn = self._open(path)
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task[None]] = None
+        self._flush_lock = asyncio.Lock()
+        self._closed = False
+        # (kind, payload JSON) submitted but not spooled yet
+        self._incoming: List[tuple[str, str]] = []
+
+    @staticmethod
+    def _open(path: str | Path | None) -> sqlite3.Connection:
+        if path is None:
+            target = ":memory:"
+        else:
+            spool = Path(path)
+            spool.parent.mkdir(parents=True, exist_ok=True)
+            target = str(spool)
+        conn = sqlite3.connect(target, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS write_behind (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                not_before REAL NOT NULL DEFAULT 0
+            )
+            """
+        )
+        return conn
+
+    # ------------------------------------------------------------------ enqueue
+    def submit(self, kind: str, payload: Dict[str, Any]) -> None:
+        """Buffer a job for the background flusher; no disk I/O happens here."""
+
+        if kind not in self.handlers:
+            raise ValueError(f"No write-behind handler registered for '{kind}'")
+        self._incoming.append((kind, json.dumps(payload, default=str)))
+        if len(self._incoming) >= self.batch_size:
+            self._wakeup.set()
+
+    def pending(self) -> int:
+        row = self._conn.execute("SELECT COUNT(*) FROM write_behind").fetchone()
+        return int(row[0]) + len(self._incoming)
+
+    def _write_spool(self, jobs: List[tuple[str, str]]) -> None:
+        self._conn.execute("BEGIN")
+        try:
+            self._conn.executemany("INSERT INTO write_behind (kind, payload) VALUES (?, ?)", jobs)
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+
+    async def _spool(self) -> None:
+        """Write buffered jobs to the spool in one transaction, off the event loop."""
+
+        if not self._incoming:
+            return
+        jobs, self._incoming = self._incoming, []
+        try:
+            await asyncio.to_thread(self._write_spool, jobs)
+        except BaseException:
+            self._incoming[:0] = jobs
+            raise
+
+    # ----------------------------------------------------------------- flushing
+    def _due_jobs(self, *, ignore_backoff: bool = False) -> List[QueuedJob]:
+        now = float("inf") if ignore_backoff else time.time()
+        rows = self._conn.execute(
+            """
+            SELECT id, kind, payload, attempts FROM write_behind
+            WHERE not_before <= ? ORDER BY id LIMIT ?
+            """,
+            (now, self.batch_size),
+        ).fetchall()
+        return [QueuedJob(id=row[0], kind=row[1], payload=json.loads(row[2]), attempts=row[3]) for row in rows]
+
+    async def flush(self, *, ignore_backoff: bool = False) -> int:
+        """Flush one batch of due jobs and return how many were delivered."""
+
+        delivered, _ = await self._flush_batch(ignore_backoff=ignore_backoff)
+        return delivered
+
+    async def _flush_batch(self, *, ignore_backoff: bool) -> tuple[int, int]:
+        async with self._flush_lock:
+            await self._spool()
+            jobs = self._due_jobs(ignore_backoff=ignore_backoff)
+            by_kind: Dict[str, List[QueuedJob]] = {}
+            for job in jobs:
+                by_kind.setdefault(job.kind, []).append(job)
+            delivered = failed = 0
+            for kind, batch in by_kind.items():
+                if await self._dispatch(kind, batch):
+                    delivered += len(batch)
+                else:
+                    failed += len(batch)
+            return delivered, failed
+
+    async def _dispatch(self, kind: str, batch: List[QueuedJob]) -> bool:
+        try:
+            await self.handlers[kind]([job.payload for job in batch])
+        except Exception:
+            logger.exception("write_behind_flush_failed kind=%s size=%d", kind, len(batch))
+            self._reschedule(batch)
+            return False
+        self._conn.executemany("DELETE FROM write_behind WHERE id = ?", [(job.id,) for job in batch])
+        return True
+
+    def _reschedule(self, batch: List[QueuedJob]) -> None:
+        dropped = [job for job in batch if job.attempts + 1 >= self.max_attempts]
+        retried = [job for job in batch if job.attempts + 1 < self.max_attempts]
+        if dropped:
+            logger.error(
+                "write_behind_dropped kind=%s ids=%s", dropped[0].kind, [job.id for job in dropped]
+            )
+            self._conn.executemany("DELETE FROM write_behind WHERE id = ?", [(job.id,) for job in dropped])
+        now = time.time()
+        self._conn.executemany(
+            "UPDATE write_behind SET attempts = ?, not_before = ? WHERE id = ?",
+            [
+                (job.attempts + 1, now + self.retry_backoff * (2 ** job.attempts), job.id)
+                for job in retried
+            ],
+        )
+
+    async def drain(self) -> None:
+        """Flush everything currently spooled, ignoring retry backoff.
+
+        Draining stops at the first failing batch; whatever is left stays in
+        the spool and is retried after the next :meth:`start`.
+        """
+
+        while True:
+            delivered, failed = await self._flush_batch(ignore_backoff=True)
+            if failed or not delivered:
+                return
+
+    # ---------------------------------------------------------------- lifecycle
+    async def _run(self) -> None:
+        while not self._closed:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            while await self.flush():
+                if self._closed:
+                    break
+
+    def start(self) -> None:
+        """Start the background flusher on the running event loop."""
+
+        if self._task is None or self._task.done():
+            self._closed = False
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def close(self) -> None:
+        """Stop the flusher and drain the spool before shutdown."""
+
+        if self._closed and self._task is None:
+            return
+        self._closed = True
+        self._wakeup.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        await self.drain()
+        self._conn.close()
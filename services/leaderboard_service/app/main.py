@@ -38,16 +38,29 @@ def ready() -> dict:
     return {"status": "ready"}
 
 
-@app.post("/api/leaderboard")
-def upsert(entry: LeaderboardEntry) -> LeaderboardEntry:
-    if not entry.learner_id:
-        raise HTTPException(status_code=400, detail="learner_id required")
+def _upsert(entry: LeaderboardEntry) -> LeaderboardEntry:
     existing = _LEADERBOARD.get(entry.learner_id)
     if existing is None or entry.score >= existing.score:
         _LEADERBOARD[entry.learner_id] = entry
     return _LEADERBOARD[entry.learner_id]
 
 
+@app.post("/api/leaderboard")
+def upsert(entry: LeaderboardEntry) -> LeaderboardEntry:
+    if not entry.learner_id:
+        raise HTTPException(status_code=400, detail="learner_id required")
+    return _upsert(entry)
+
+
+@app.post("/api/leaderboard/batch", response_model=LeaderboardResponse)
+def upsert_many(entries: List[LeaderboardEntry]) -> LeaderboardResponse:
+    """Apply several entries atomically: either all are recorded or none."""
+
+    if any(not entry.learner_id for entry in entries):
+        raise HTTPException(status_code=400, detail="learner_id required")
+    return LeaderboardResponse(entries=[_upsert(entry) for entry in entries])
+
+
 @app.get("/api/leaderboard", response_model=LeaderboardResponse)
 def top(limit: int = 10) -> LeaderboardResponse:
     sorted_entries = sorted(
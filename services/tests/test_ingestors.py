@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import json
+import time
 from pathlib import Path
 
 import pytest
@@ -147,3 +148,788 @@ def test_sync_validation_failure(identity_app: tuple):
     log_lines = audit_path.read_text(encoding="utf-8").strip().splitlines()
     entries = [json.loads(line) for line in log_lines]
     assert any(entry["status"] == "failed" for entry in entries)
+
+
+def test_ingest_snapshot_statement_count_is_independent_of_size(tmp_path: Path):
+    from services.foundry_ingestor_common.database import (
+        create_db_engine,
+        create_session_factory,
+        initialize_database,
+    )
+    from services.foundry_ingestor_common.ingest import ingest_snapshot
+
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'bulk.db'}")
+    initialize_database(engine)
+    session_factory = create_session_factory(engine)
+
+    def payload(snapshot_id: str, devices: int) -> dict:
+        data = build_payload(snapshot_id)
+        data["devices"] = [
+            {"code": f"DEV-{i}", "hostname": f"host-{i}", "segment_code": "SEG-1", "metadata": {}}
+            for i in range(devices)
+        ]
+        return data
+
+    def statements_for(snapshot_id: str, devices: int) -> int:
+        statements: list[str] = []
+        with session_factory() as session:
+            session._conn.set_trace_callback(statements.append)
+            ingest_snapshot(session, service="svc", category="identity", payload=payload(snapshot_id, devices))
+            session.commit()
+        return sum(1 for sql in statements if sql.lstrip().upper().startswith("SELECT"))
+
+    # executemany traces every row, so compare the number of lookups instead
+    assert statements_for("snap-small", 2) == statements_for("snap-large", 200)
+
+    with session_factory() as session:
+        devices = session.execute(select(Device)).scalars()
+        assert len(devices) == 200
+        assert len({device.segment_id for device in devices}) == 1
+
+
+def test_identical_resync_skips_writes_and_keeps_updated_at(tmp_path: Path):
+    import re
+    import sqlite3
+
+    from services.foundry_ingestor_common.database import (
+        create_db_engine,
+        create_session_factory,
+        initialize_database,
+    )
+    from services.foundry_ingestor_common.ingest import ingest_snapshot
+
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'hash.db'}")
+    # A database created before content_hash existed is migrated in place.
+    with sqlite3.connect(engine.path) as connection:
+        connection.execute(
+            "CREATE TABLE sites (id TEXT PRIMARY KEY, code TEXT UNIQUE NOT NULL, name TEXT NOT NULL,"
+            " description TEXT, metadata TEXT NOT NULL, created_at TEXT NOT NULL, updated_at TEXT NOT NULL)"
+        )
+    initialize_database(engine)
+    session_factory = create_session_factory(engine)
+
+    write = re.compile(r"^\s*(?:INSERT INTO|UPDATE)\s+(\w+)", re.IGNORECASE)
+
+    def sync(snapshot_id: str, payload: dict | None = None) -> list[str]:
+        """Return the tables written to, one entry per row statement."""
+
+        statements: list[str] = []
+        with session_factory() as session:
+            session._conn.set_trace_callback(statements.append)
+            ingest_snapshot(
+                session, service="svc", category="identity", payload=payload or build_payload(snapshot_id)
+            )
+            session.commit()
+        return [match.group(1) for match in map(write.match, statements) if match]
+
+    sync("snap-1")
+    with session_factory() as session:
+        before = {device.code: device.updated_at for device in session.execute(select(Device)).scalars()}
+        assert all(device.content_hash for device in session.execute(select(Device)).scalars())
+
+    assert sync("snap-2") == ["snapshots"]
+    with session_factory() as session:
+        after = {device.code: device.updated_at for device in session.execute(select(Device)).scalars()}
+    assert after == before
+
+    changed = build_payload("snap-3")
+    changed["devices"][0]["hostname"] = "renamed"
+    assert sync("snap-3", changed) == ["devices", "snapshots"]
+
+
+def test_concurrent_ingests_of_an_unchanged_site_get_distinct_versions(tmp_path: Path):
+    import sqlite3
+    import threading
+
+    from services.foundry_ingestor_common.database import (
+        create_db_engine,
+        create_session_factory,
+        initialize_database,
+    )
+    from services.foundry_ingestor_common.ingest import ingest_snapshot
+
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'race.db'}")
+    initialize_database(engine)
+    session_factory = create_session_factory(engine, pool_size=8)
+    with session_factory() as session:
+        ingest_snapshot(session, service="svc", category="identity", payload=build_payload("snap-0"))
+        session.commit()
+
+    start = threading.Barrier(6)
+    errors: list[BaseException] = []
+
+    def sync(index: int) -> None:
+        try:
+            with session_factory() as session:
+                start.wait()
+                ingest_snapshot(
+                    session, service="svc", category="identity", payload=build_payload(f"snap-{index}")
+                )
+                time.sleep(0.01)  # widen the window between reading and inserting
+                session.commit()
+        except BaseException as exc:  # pragma: no cover - surfaced below
+            errors.append(exc)
+
+    threads = [threading.Thread(target=sync, args=(index,)) for index in range(1, 7)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+
+    with session_factory() as session:
+        versions = sorted(snapshot.version for snapshot in session.execute(select(Snapshot)).scalars())
+        assert versions == list(range(1, 8))
+        # The invariant is also enforced by the schema.
+        with pytest.raises(sqlite3.IntegrityError):
+            session._conn.execute(
+                "INSERT INTO snapshots (id, external_id, source, category, version, site_id, ingested_at, payload)"
+                " SELECT 'dup', 'snap-dup', source, category, version, site_id, ingested_at, payload"
+                " FROM snapshots LIMIT 1"
+            )
+
+
+def test_session_factory_reuses_wal_configured_connections(tmp_path: Path):
+    from services.foundry_ingestor_common.database import (
+        create_db_engine,
+        create_session_factory,
+        initialize_database,
+    )
+
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'pool.db'}")
+    initialize_database(engine)
+    session_factory = create_session_factory(engine, pool_size=2, timeout=0.05)
+
+    first = session_factory()
+    connection = first._conn
+    assert connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert connection.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+    assert connection.execute("PRAGMA busy_timeout").fetchone()[0] == 5000
+    first._conn.execute("INSERT INTO sites VALUES ('s', 'HQ', 'HQ', NULL, '{}', 'now', 'now', NULL)")
+    first.close()  # uncommitted work is rolled back before reuse
+
+    second = session_factory()
+    assert second._conn is connection
+    assert second._conn.execute("SELECT COUNT(*) FROM sites").fetchone()[0] == 0
+    third = session_factory()
+    with pytest.raises(TimeoutError):
+        session_factory()
+    second.close()
+    third.close()
+    assert session_factory.pool.opened == 2
+
+    session_factory.close()
+    assert session_factory.pool.opened == 0
+
+
+def test_async_sync_queues_durably_and_reports_status(tmp_path: Path):
+    schema_path = Path("services/foundry-identity-ingestor/schemas/identity_snapshot.schema.json")
+
+    def make_app(publisher: LoggingEventPublisher):
+        return create_ingestor_app(
+            service_name="foundry-identity-ingestor",
+            schema_path=schema_path,
+            snapshot_category="identity",
+            database_url=f"sqlite:///{tmp_path / 'identity.db'}",
+            audit_log_path=tmp_path / "audit.jsonl",
+            event_publisher=publisher,
+            async_ingest=True,
+            ingest_workers=2,
+        )
+
+    # Without the lifespan running no worker picks the jobs up, like a crash
+    # right after acknowledging them.
+    client = TestClient(make_app(LoggingEventPublisher()))
+    for snapshot_id in ("snap-1", "snap-2"):
+        response = client.post("/sync", json=build_payload(snapshot_id))
+        assert response.status_code == 202
+        assert response.json()["status"] == "queued"
+    assert client.get("/sync/snap-1").json()["status"] == "queued"
+    assert client.post("/sync", json={"snapshot_id": "bad"}).status_code == 422
+    assert client.get("/sync/unknown").status_code == 404
+
+    publisher = LoggingEventPublisher()
+    app = make_app(publisher)
+    with TestClient(app) as client:
+        client.post("/sync", json=build_payload("snap-3"))
+        client.portal.call(app.state.worker_pool.drain, 5)
+        statuses = [client.get(f"/sync/snap-{i}").json() for i in (1, 2, 3)]
+
+    # jobs of one site run one at a time in arrival order
+    assert [(status["status"], status["version"]) for status in statuses] == [
+        ("ingested", 1),
+        ("ingested", 2),
+        ("ingested", 3),
+    ]
+    assert len(publisher.messages) == 6
+
+
+def test_sync_queue_claims_site_heads_without_loading_the_backlog(tmp_path: Path):
+    from services.foundry_ingestor_common.jobs import PROCESSING, SyncQueue
+
+    queue = SyncQueue(tmp_path / "jobs.queue.db")
+    for index in range(30):
+        payload = build_payload(f"snap-{index}")
+        payload["site"]["code"] = f"SITE-{index % 3}"
+        queue.enqueue(payload)
+
+    statements: list[str] = []
+    queue._conn.set_trace_callback(statements.append)
+    claimed = queue.claim({"SITE-0"}, limit=5)
+    queue._conn.set_trace_callback(None)
+
+    # the oldest job of every idle site, with payloads for those jobs only
+    assert [(job.snapshot_id, job.site_code) for job in claimed] == [("snap-1", "SITE-1"), ("snap-2", "SITE-2")]
+    assert all(job.status == PROCESSING and job.attempts == 1 and job.payload for job in claimed)
+    payload_reads = [sql for sql in statements if sql.lstrip().startswith("SELECT *")]
+    assert payload_reads and all("seq IN (" in sql for sql in payload_reads)
+
+    assert queue.claim({"SITE-0", "SITE-1", "SITE-2"}, limit=5) == []
+    queue.close()
+
+
+def test_sync_queue_drops_finished_payloads_and_purges_old_jobs(tmp_path: Path):
+    from datetime import datetime, timedelta, timezone
+
+    from services.foundry_ingestor_common.jobs import FAILED, SyncQueue
+
+    queue = SyncQueue(tmp_path / "jobs.queue.db")
+    for index in range(3):
+        queue.enqueue(build_payload(f"snap-{index}"))
+    queue.claim((), limit=1)
+    queue.finish("snap-0", "ingested", version=1)
+    queue.claim((), limit=1)
+    queue.finish("snap-1", FAILED, error="boom")
+
+    done = queue.get("snap-0")
+    assert (done.status, done.version, done.payload) == ("ingested", 1, None)
+    assert done.to_status()["version"] == 1
+    assert queue.get("snap-1").to_status()["error"] == "boom"
+    sizes = dict(queue._conn.execute("SELECT snapshot_id, length(payload) FROM sync_jobs").fetchall())
+    assert sizes["snap-0"] == sizes["snap-1"] == 0 and sizes["snap-2"] > 0
+
+    assert queue.purge(datetime.now(timezone.utc) - timedelta(hours=1)) == 0
+    assert queue.purge(datetime.now(timezone.utc) + timedelta(seconds=1)) == 2
+    assert queue.get("snap-0") is None and queue.get("snap-2").payload is not None
+    # a failed snapshot can still be re-posted after its job was purged
+    assert queue.enqueue(build_payload("snap-1"))[1] is True
+    queue.close()
+
+
+def test_snapshot_payloads_are_stored_as_keyframes_and_deltas(tmp_path: Path):
+    from services.foundry_ingestor_common.database import (
+        create_db_engine,
+        create_session_factory,
+        initialize_database,
+    )
+    from services.foundry_ingestor_common.ingest import ingest_snapshot
+    from services.foundry_ingestor_common.payloads import SnapshotPayloadStore, apply, diff
+
+    old = {"a": [1, {"b": "x/y"}, 3], "c": {"d": 1}}
+    new = {"a": [1, {"b": "z"}], "c": {"e": None}, "f": True}
+    assert apply(json.loads(json.dumps(old)), diff(old, new)) == new
+
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'delta.db'}")
+    initialize_database(engine)
+    session_factory = create_session_factory(engine, payload_store=SnapshotPayloadStore(keyframe_interval=5))
+
+    payloads = []
+    for index in range(12):
+        payload = build_payload(f"snap-{index}")
+        payload["devices"] = [
+            {"code": f"DEV-{i}", "hostname": f"host-{i}", "segment_code": "SEG-1", "metadata": {"seen": i}}
+            for i in range(300)
+        ]
+        payload["devices"][index]["hostname"] = f"renamed-{index}"
+        payloads.append(payload)
+        with session_factory() as session:
+            ingest_snapshot(session, service="svc", category="topology", payload=payload)
+            session.commit()
+
+    with session_factory() as session:
+        rows = session._conn.execute(
+            "SELECT payload_encoding, length(payload_blob) FROM snapshots ORDER BY version"
+        ).fetchall()
+    assert [row[0] for row in rows] == (["keyframe"] + ["delta"] * 4) * 2 + ["keyframe", "delta"]
+    stored = sum(row[1] for row in rows)
+    assert stored * 10 < sum(len(json.dumps(payload)) for payload in payloads)
+
+    # A cold reader rebuilds every version from its keyframe.
+    cold = create_session_factory(engine, pool_size=0, payload_store=SnapshotPayloadStore(cache_size=0))
+    with cold() as session:
+        snapshots = sorted(session.execute(select(Snapshot)).scalars(), key=lambda snapshot: snapshot.version)
+    assert [snapshot.payload for snapshot in snapshots] == payloads
+
+    # With more active sites than the read LRU holds, every write still diffs
+    # against its own site's last payload without reading the chain back.
+    store = SnapshotPayloadStore(keyframe_interval=5, cache_size=1)
+    interleaved = create_session_factory(engine, payload_store=store)
+    for index in range(20):
+        payload = build_payload(f"multi-{index}")
+        payload["site"]["code"] = f"SITE-{index % 10}"
+        with interleaved() as session:
+            statements: list[str] = []
+            session._conn.set_trace_callback(statements.append)
+            ingest_snapshot(session, service="svc", category="topology", payload=payload)
+            session.commit()
+        assert not any("payload_blob, payload, base_id" in sql for sql in statements)
+
+    # Heads are kept compressed, within a byte budget: the least recently
+    # written sites fall back to the chain, which still yields the right payload.
+    assert all(isinstance(blob, bytes) for _, blob in store._heads.values())
+    head_size = len(next(iter(store._heads.values()))[1])
+    tight = SnapshotPayloadStore(keyframe_interval=5, cache_size=0, head_cache_bytes=head_size * 3)
+    budgeted = create_session_factory(engine, payload_store=tight)
+    for index in range(20, 30):
+        payload = build_payload(f"multi-{index}")
+        payload["site"]["code"] = f"SITE-{index % 10}"
+        with budgeted() as session:
+            ingest_snapshot(session, service="svc", category="topology", payload=payload)
+            session.commit()
+        assert tight._head_bytes <= head_size * 3 and len(tight._heads) <= 3
+        with cold() as session:
+            stored = session.execute(select(Snapshot).filter_by(external_id=f"multi-{index}")).scalar_one()
+        assert stored.payload == payload
+
+
+def test_compiled_validator_enforces_schema_keywords_with_paths():
+    from services.foundry_ingestor_common.validation import SnapshotValidator, ValidationError
+
+    schema = json.loads(
+        Path("services/foundry-identity-ingestor/schemas/identity_snapshot.schema.json").read_text()
+    )
+    validator = SnapshotValidator(schema)
+    payload = build_payload()
+    payload["devices"] = payload["devices"] * 20000
+    validator.validate(payload)
+
+    def error_for(mutate) -> str:
+        broken = build_payload()
+        mutate(broken)
+        with pytest.raises(ValidationError) as excinfo:
+            validator.validate(broken)
+        return str(excinfo.value)
+
+    assert error_for(lambda p: p["devices"][0].update(hostname="")) == (
+        "devices[0].hostname must be at least 1 character(s) long"
+    )
+    assert error_for(lambda p: p["site"].update(owner="x")) == "site has unexpected property 'owner'"
+    assert error_for(lambda p: p.update(collected_at="yesterday")) == "collected_at must be an ISO-8601 timestamp"
+    assert error_for(lambda p: p["network_segments"][0].pop("name")) == (
+        "network_segments[0] missing required field(s): name"
+    )
+    assert error_for(lambda p: p["devices"][0].update(metadata=[])) == "devices[0].metadata must be of type object"
+
+    with pytest.raises(ValueError):
+        SnapshotValidator({"type": "object", "patternProperties": {}})
+
+
+def test_bulk_sync_ingests_ndjson_in_batches(identity_app: tuple):
+    app, publisher, audit_path = identity_app
+    client = TestClient(app)
+
+    orphan = build_payload("snap-orphan")
+    orphan["devices"][0]["segment_code"] = "SEG-404"  # passes the schema, fails ingestion
+    lines = [
+        json.dumps(build_payload("snap-1")),
+        "{not json",
+        json.dumps(orphan),
+        "",
+        json.dumps(build_payload("snap-2")),
+        json.dumps({"snapshot_id": "snap-bad"}),
+        json.dumps(build_payload("snap-1")),
+    ]
+
+    def body():
+        data = "\n".join(lines).encode("utf-8")
+        for start in range(0, len(data), 64):  # split lines across chunks
+            yield data[start:start + 64]
+
+    response = client.post("/sync/bulk", params={"batch_size": 2}, content=body())
+    assert response.status_code == 200
+    summary = response.json()
+    assert (summary["processed"], summary["ingested"], summary["duplicate"], summary["failed"]) == (6, 2, 1, 3)
+    assert [(r["line"], r["status"]) for r in summary["results"]] == [
+        (1, "ingested"),
+        (2, "failed"),
+        (3, "failed"),
+        (5, "ingested"),
+        (6, "failed"),
+        (7, "duplicate"),
+    ]
+    assert "SEG-404" in summary["results"][2]["error"]
+
+    with app.state.session_factory() as session:
+        snapshots = session.execute(select(Snapshot)).scalars()
+    assert sorted((s.external_id, s.version) for s in snapshots) == [("snap-1", 1), ("snap-2", 2)]
+    assert len(publisher.messages) == 4
+
+    entries = [json.loads(line) for line in audit_path.read_text(encoding="utf-8").splitlines()]
+    assert [entry["status"] for entry in entries] == [r["status"] for r in summary["results"]]
+
+
+def test_bulk_sync_rejects_lines_over_the_size_limit(tmp_path: Path):
+    app = create_ingestor_app(
+        service_name="foundry-identity-ingestor",
+        schema_path=Path("services/foundry-identity-ingestor/schemas/identity_snapshot.schema.json"),
+        snapshot_category="identity",
+        database_url=f"sqlite:///{tmp_path / 'identity.db'}",
+        audit_log_path=tmp_path / "audit.jsonl",
+        event_publisher=LoggingEventPublisher(),
+        bulk_max_line_bytes=2048,
+    )
+    client = TestClient(app)
+    huge = build_payload("snap-huge")
+    huge["site"]["description"] = "x" * 10_000
+    lines = [
+        json.dumps(build_payload("snap-1")),
+        json.dumps(huge),
+        json.dumps(build_payload("snap-2")),
+        json.dumps(huge),
+    ]
+
+    def body():
+        data = "\n".join(lines).encode("utf-8")
+        for start in range(0, len(data), 512):
+            yield data[start:start + 512]
+
+    response = client.post("/sync/bulk", content=body())
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [(r["line"], r["status"]) for r in results] == [
+        (1, "ingested"),
+        (2, "failed"),
+        (3, "ingested"),
+        (4, "failed"),
+    ]
+    assert "exceeds 2048 bytes" in results[1]["error"]
+
+
+def test_select_pushes_filters_and_keyset_pagination_into_sql(tmp_path: Path):
+    from services.foundry_ingestor_common.database import (
+        create_db_engine,
+        create_session_factory,
+        initialize_database,
+    )
+    from services.foundry_ingestor_common.ingest import ingest_snapshot
+    from services.foundry_ingestor_common.query import column
+
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'query.db'}")
+    initialize_database(engine)
+    session_factory = create_session_factory(engine)
+    with session_factory() as session:
+        for index in range(7):
+            ingest_snapshot(session, service="svc", category="identity", payload=build_payload(f"snap-{index}"))
+        session.commit()
+
+    with session_factory() as session:
+        site_id = session.execute(select(Site).filter_by(code="HQ")).scalar_one().id
+
+    query = (
+        select(Snapshot)
+        .where(column("source") == "svc", column("site_id") == site_id, column("version").between(2, 6))
+        .order_by(column("version").desc())
+        .limit(2)
+    )
+    pages, cursor = [], None
+    with session_factory() as session:
+        statements: list[str] = []
+        session._conn.set_trace_callback(statements.append)
+        while True:
+            result = session.execute(query.after(cursor))
+            pages.append([snapshot.version for snapshot in result.scalars()])
+            cursor = result.next_cursor
+            if cursor is None:
+                break
+        session._conn.set_trace_callback(None)
+        devices = session.execute(
+            select(Device).where(column("site_id") == site_id, column("segment_id").in_(["missing"]))
+        ).scalars()
+        sql, params = query.compile({"source", "site_id", "version", "id"})
+        plan = " ".join(row[3] for row in session._conn.execute("EXPLAIN QUERY PLAN " + sql, params))
+
+    assert pages == [[6, 5], [4, 3], [2]]
+    assert all(" WHERE " in sql for sql in statements if sql.startswith("SELECT * FROM snapshots"))
+    assert devices == []
+    assert "ux_snapshots_source_site_version" in plan
+    assert "TEMP B-TREE" not in plan
+
+    with pytest.raises(ValueError):
+        with session_factory() as session:
+            session.execute(select(Device).where(column("hostname; DROP TABLE devices") == "x"))
+
+
+
+def test_keyset_pagination_pages_through_nullable_order_columns(tmp_path: Path):
+    from services.foundry_ingestor_common.database import (
+        create_db_engine,
+        create_session_factory,
+        initialize_database,
+    )
+    from services.foundry_ingestor_common.ingest import ingest_snapshot
+    from services.foundry_ingestor_common.query import column
+
+    payload = build_payload()
+    payload["devices"] = [
+        {"code": f"DEV-{index}", "hostname": f"host-{index}", "metadata": {}}
+        | ({"segment_code": "SEG-1", "ip_address": f"10.0.0.{index % 2}"} if index % 3 == 0 else {})
+        for index in range(8)
+    ]
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'nulls.db'}")
+    initialize_database(engine)
+    session_factory = create_session_factory(engine)
+    with session_factory() as session:
+        ingest_snapshot(session, service="svc", category="identity", payload=payload)
+        session.commit()
+
+    for key in ("segment_id", "ip_address"):
+        for ordering in (column(key).asc(), column(key).desc()):
+            query = select(Device).order_by(ordering)
+            with session_factory() as session:
+                expected = [device.code for device in session.execute(query).scalars()]
+                seen, cursor = [], None
+                while True:
+                    result = session.execute(query.limit(2).after(cursor))
+                    seen.extend(device.code for device in result.scalars())
+                    cursor = result.next_cursor
+                    if cursor is None:
+                        break
+            assert seen == expected, (key, ordering)
+            assert len(seen) == 8
+
+
+def test_buffered_audit_logger_batches_rotates_and_flushes_on_close(tmp_path: Path):
+    import gzip
+
+    from services.foundry_ingestor_common.audit import AuditLogger
+
+    path = tmp_path / "audit" / "ingestor.jsonl"
+    logger = AuditLogger(path, flush_interval=60, max_buffer=3, fsync="batch", max_bytes=400, compress=True)
+    logger.log(service="svc", snapshot_id="snap-1", status="ingested")
+    assert not path.exists()  # still buffered
+
+    logger.log_many(service="svc", entries=[{"snapshot_id": f"snap-{i}", "status": "ingested"} for i in (2, 3)])
+    deadline = time.monotonic() + 5
+    while not path.exists() and time.monotonic() < deadline:  # max_buffer wakes the flusher
+        time.sleep(0.01)
+    assert len(path.read_text(encoding="utf-8").splitlines()) == 3
+
+    for index in range(4, 12):
+        logger.log(service="svc", snapshot_id=f"snap-{index}", status="ingested", details={"pad": "x" * 40})
+    logger.close()
+
+    rotated = logger.rotated_files()
+    assert rotated and all(file.suffix == ".gz" for file in rotated)
+    lines = [line for file in rotated for line in gzip.open(file, "rt", encoding="utf-8").read().splitlines()]
+    if path.exists():
+        lines += path.read_text(encoding="utf-8").splitlines()
+    assert sorted(int(json.loads(line)["snapshot_id"].split("-")[1]) for line in lines) == list(range(1, 12))
+
+    with pytest.raises(ValueError):
+        AuditLogger(path, fsync="sometimes")
+
+
+def test_audit_logger_keeps_failed_batches_and_follows_external_rotation(tmp_path: Path):
+    from services.foundry_ingestor_common.audit import AuditLogger
+
+    path = tmp_path / "ingestor.jsonl"
+    logger = AuditLogger(path, flush_interval=60)
+    write = logger._write
+
+    def failing_write(lines: list[str]) -> None:
+        raise OSError("disk full")
+
+    logger._write = failing_write  # type: ignore[method-assign]
+    logger.log(service="svc", snapshot_id="snap-1", status="ingested")
+    with pytest.raises(OSError):
+        logger.flush()
+    logger._write = write  # type: ignore[method-assign]
+    logger.log(service="svc", snapshot_id="snap-2", status="ingested")
+    logger.flush()
+    assert [json.loads(line)["snapshot_id"] for line in path.read_text(encoding="utf-8").splitlines()] == [
+        "snap-1",
+        "snap-2",
+    ]
+
+    path.rename(tmp_path / "ingestor.jsonl.1")  # logrotate without copytruncate
+    logger.log(service="svc", snapshot_id="snap-3", status="ingested")
+    logger.close()
+    assert [json.loads(line)["snapshot_id"] for line in path.read_text(encoding="utf-8").splitlines()] == ["snap-3"]
+
+
+
+@pytest.mark.parametrize("async_ingest", [False, True])
+def test_rejected_payloads_are_audited_off_the_event_loop(tmp_path: Path, async_ingest: bool):
+    import asyncio
+
+    app = create_ingestor_app(
+        service_name="foundry-identity-ingestor",
+        schema_path=Path("services/foundry-identity-ingestor/schemas/identity_snapshot.schema.json"),
+        snapshot_category="identity",
+        database_url=f"sqlite:///{tmp_path / 'identity.db'}",
+        audit_log_path=tmp_path / "audit.jsonl",
+        event_publisher=LoggingEventPublisher(),
+        async_ingest=async_ingest,
+    )
+    on_loop = []
+    log = app.state.audit_logger.log
+
+    def recording_log(**entry):
+        try:
+            asyncio.get_running_loop()
+            on_loop.append(True)
+        except RuntimeError:
+            on_loop.append(False)
+        log(**entry)
+
+    app.state.audit_logger.log = recording_log
+    response = TestClient(app).post("/sync", json={"snapshot_id": "bad"})
+    assert response.status_code == 422
+    assert on_loop == [False]
+
+def test_events_survive_publisher_outage_via_outbox(tmp_path: Path):
+    class FlakyPublisher(LoggingEventPublisher):
+        def __init__(self) -> None:
+            super().__init__()
+            self.down = True
+            self.batches: list[list[str]] = []
+
+        async def publish_many(self, messages, *, message_ids=None):
+            if self.down:
+                raise ConnectionError("broker unavailable")
+            self.batches.append(list(message_ids))
+            await super().publish_many(messages, message_ids=message_ids)
+
+    publisher = FlakyPublisher()
+    app = create_ingestor_app(
+        service_name="foundry-identity-ingestor",
+        schema_path=Path("services/foundry-identity-ingestor/schemas/identity_snapshot.schema.json"),
+        snapshot_category="identity",
+        database_url=f"sqlite:///{tmp_path / 'identity.db'}",
+        audit_log_path=tmp_path / "audit.jsonl",
+        event_publisher=publisher,
+    )
+    client = TestClient(app)
+
+    for snapshot_id in ("snap-1", "snap-2"):
+        assert client.post("/sync", json=build_payload(snapshot_id)).status_code == 202
+    orphan = build_payload("snap-3")
+    orphan["devices"][0]["segment_code"] = "SEG-404"
+    assert client.post("/sync", json=orphan).status_code == 400
+    assert publisher.messages == []
+
+    with app.state.session_factory() as session:
+        pending = session.pending_outbox_events(10)
+    assert [event["message_id"] for event in pending] == [
+        "foundry-identity-ingestor:snap-1:snapshot.synced",
+        "foundry-identity-ingestor:snap-1:snapshot.identity.synced",
+        "foundry-identity-ingestor:snap-2:snapshot.synced",
+        "foundry-identity-ingestor:snap-2:snapshot.identity.synced",
+    ]
+
+    publisher.down = False
+    with TestClient(app):  # the relay drains leftovers on startup
+        assert len(publisher.batches) == 1 and len(publisher.batches[0]) == 4
+        assert [payload["version"] for _, payload in publisher.messages] == [1, 1, 2, 2]
+        with app.state.session_factory() as session:
+            assert session.pending_outbox_events(10) == []
+
+
+def test_sync_relays_outside_its_connection_and_backs_off_a_down_broker(tmp_path: Path):
+    import sqlite3
+
+    from services.foundry_ingestor_common.database import ConnectionPool
+
+    class CountingPublisher(LoggingEventPublisher):
+        def __init__(self) -> None:
+            super().__init__()
+            self.down = False
+            self.attempts = 0
+
+        async def publish_many(self, messages, *, message_ids=None):
+            self.attempts += 1
+            if self.down:
+                raise ConnectionError("broker unavailable")
+            await super().publish_many(messages, message_ids=message_ids)
+
+    publisher = CountingPublisher()
+    app = create_ingestor_app(
+        service_name="foundry-identity-ingestor",
+        schema_path=Path("services/foundry-identity-ingestor/schemas/identity_snapshot.schema.json"),
+        snapshot_category="identity",
+        database_url=f"sqlite:///{tmp_path / 'identity.db'}",
+        audit_log_path=tmp_path / "audit.jsonl",
+        event_publisher=publisher,
+    )
+    session_factory = app.state.session_factory
+    session_factory.pool.close()
+    session_factory.pool = ConnectionPool(session_factory._engine, size=1, timeout=1.0)
+    relay = app.state.outbox_relay
+    relay.retry_backoff = 60.0
+    client = TestClient(app)
+
+    # One pooled connection: the relay only gets it once the handler lets go.
+    assert client.post("/sync", json=build_payload("snap-1")).status_code == 202
+    assert len(publisher.messages) == 2
+
+    publisher.down = True
+    for snapshot_id in ("snap-2", "snap-3"):
+        assert client.post("/sync", json=build_payload(snapshot_id)).status_code == 202
+    # snap-2's batch, then its first event alone and the next one as a probe;
+    # snap-3 left the retry to the background loop
+    assert publisher.attempts == 4
+
+    relay._backoff = relay._retry_at = 0.0
+    run = relay._run
+
+    def broken_run(method: str, *args):
+        raise sqlite3.OperationalError("database is locked")
+
+    relay._run = broken_run
+    assert client.post("/sync", json=build_payload("snap-4")).status_code == 202
+    relay._run = run
+
+    publisher.down = False
+    with TestClient(app):  # startup drains regardless of the backoff
+        assert len(publisher.messages) == 8
+
+
+def test_outbox_dead_letters_an_event_the_broker_keeps_rejecting(tmp_path: Path):
+    class PickyPublisher(LoggingEventPublisher):
+        async def publish_many(self, messages, *, message_ids=None):
+            if "foundry-identity-ingestor:snap-1:snapshot.identity.synced" in (message_ids or ()):
+                raise ValueError("message rejected by stream")
+            await super().publish_many(messages, message_ids=message_ids)
+
+    publisher = PickyPublisher()
+    app = create_ingestor_app(
+        service_name="foundry-identity-ingestor",
+        schema_path=Path("services/foundry-identity-ingestor/schemas/identity_snapshot.schema.json"),
+        snapshot_category="identity",
+        database_url=f"sqlite:///{tmp_path / 'identity.db'}",
+        audit_log_path=tmp_path / "audit.jsonl",
+        event_publisher=publisher,
+    )
+    relay = app.state.outbox_relay
+    relay.max_attempts = 2
+    client = TestClient(app)
+
+    for snapshot_id in ("snap-1", "snap-2", "snap-3"):
+        relay._backoff = relay._retry_at = 0.0
+        assert client.post("/sync", json=build_payload(snapshot_id)).status_code == 202
+
+    # every later event got through, and the rejected one stopped blocking them
+    assert [payload["version"] for _, payload in publisher.messages] == [1, 2, 2, 3, 3]
+    with app.state.session_factory() as session:
+        assert session.pending_outbox_events(10) == []
+        dead = session._conn.execute("SELECT message_id, attempts, last_error FROM event_outbox_dead").fetchall()
+        plan = " ".join(
+            row[3]
+            for row in session._conn.execute(
+                "EXPLAIN QUERY PLAN DELETE FROM event_outbox WHERE sent_at IS NOT NULL AND sent_at < ?", ("x",)
+            )
+        )
+    assert [tuple(row) for row in dead] == [
+        ("foundry-identity-ingestor:snap-1:snapshot.identity.synced", 2, "message rejected by stream")
+    ]
+    assert "ix_event_outbox_sent" in plan